@@ -0,0 +1,23 @@
+"""
+ASGI config for appointme_project project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'appointme_project.settings')
+
+application = get_asgi_application()
+
+# Préchauffage du worker (URLs, gabarits, traductions, connexion, caches),
+# voir appointments.warmup
+if os.environ.get('APPOINTME_WARMUP') == '1':
+    from appointments.warmup import warm_up
+
+    warm_up()
@@ -36,17 +36,24 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    # Avant staticfiles : sa commande « collectstatic » lance d'abord build_assets
     'appointments',
+    'django.contrib.staticfiles',
 ]
 
 MIDDLEWARE = [
+    'appointments.middleware.MetricsMiddleware',
+    'appointments.middleware.SlowQueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'appointments.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'appointments.tenancy.OrganizationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'appointments.middleware.DataVersionETagMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -66,9 +73,25 @@ TEMPLATES = [
             ],
         },
     },
+    {
+        # Pages à fort volume portées en Jinja2 (appointments/jinja2/), voir HOT_TEMPLATES_ENGINE
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'appointments.jinja2_env.environment',
+            'keep_trailing_newline': True,
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
 ]
 
 WSGI_APPLICATION = 'appointme_project.wsgi.application'
+ASGI_APPLICATION = 'appointme_project.asgi.application'
 
 
 # Database
@@ -82,6 +105,23 @@ DATABASES = {
 }
 
 
+# Cache
+# Cache partagé par les workers, dans une table de la base (créée par la
+# migration 0023). Une écriture est un INSERT indexé : le cache fichier
+# parcourait tout son répertoire à chaque écriture. Sur plusieurs machines,
+# utiliser un cache réseau (django.core.cache.backends.redis.RedisCache).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'appointme_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -121,6 +161,20 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic produit des noms hachés et des variantes .gz/.br ;
+# WhiteNoise les sert avec un Cache-Control longue durée (immutable).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Binaire autonome Tailwind CSS v3 utilisé par « manage.py build_assets »
+TAILWIND_CLI = os.environ.get('TAILWIND_CLI', 'tailwindcss')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -128,3 +182,119 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/login/'
+
+
+# Métriques (exposition Prometheus sur /metrics)
+# Chaque worker écrit dans son propre fichier mmap sous METRICS_DIR ;
+# le répertoire doit être partagé par tous les workers et vidé au déploiement.
+METRICS_DIR = os.environ.get('APPOINTME_METRICS_DIR', os.path.join(BASE_DIR, 'var', 'metrics'))
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Journal des requêtes lentes (résumé : python manage.py slow_queries)
+# None désactive la capture.
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'var', 'log', 'slow_queries.log')
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+
+# Cache de la recherche globale (par utilisateur)
+SEARCH_CACHE_TTL = 5 * 60
+SEARCH_CACHE_SIZE = 50
+
+# Compression des réponses HTML/JSON (octets)
+COMPRESSION_MIN_SIZE = 1024
+
+# Vues servies avec un ETag dérivé de la version de données de l'utilisateur
+ETAG_URL_NAMES = [
+    'appointments',
+    'calendar',
+    'customers',
+    'services',
+    'analytics',
+    'occupancy',
+    'api_appointments_by_date',
+    'api_analytics',
+    'global_search',
+    'api_v1_list',
+]
+
+# Photos de profil : taille maximale d'un envoi, au-delà le fichier est
+# abandonné pendant la réception (voir appointments.uploads)
+MAX_UPLOAD_SIZE = 2 * 1024 * 1024
+FILE_UPLOAD_HANDLERS = [
+    'appointments.uploads.SizeLimitUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+AVATAR_MAX_PIXELS = 40_000_000
+# Miniatures carrées générées (côté en pixels, 2x la taille affichée)
+AVATAR_SIZES = {'sm': 72, 'md': 128}
+
+# File de tâches différées (python manage.py run_tasks)
+TASK_POLL_INTERVAL = 2
+TASK_MAX_RETRY_DELAY = 60 * 60
+# Les tâches terminées sont supprimées au démarrage du worker au-delà de ce délai (secondes)
+TASK_KEEP_DONE = 7 * 24 * 60 * 60
+
+# Purge des clients/services supprimés : taille des lots de DELETE et pause
+# entre deux lots (secondes) pour laisser passer les autres écritures
+PURGE_BATCH_SIZE = 500
+PURGE_BATCH_PAUSE = 0.05
+
+# Archivage des rendez-vous terminés/annulés (python manage.py archive_appointments)
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 500
+
+# Liste des clients : taille des pages et seuil du filtre « inactifs » (jours sans visite)
+CUSTOMERS_PER_PAGE = 50
+CUSTOMER_INACTIVE_DAYS = 90
+
+# Doublons de clients : score minimal d'une paire (0 à 1), taille maximale d'un
+# bloc comparé (au-delà la clé est trop commune), paires affichées, paires
+# stockées par le worker et âge (secondes) au-delà duquel la recherche est relancée
+DUPLICATE_MIN_SCORE = 0.6
+DUPLICATE_MAX_BLOCK = 50
+DUPLICATE_PAGE_SIZE = 100
+DUPLICATE_STORED_PAIRS = 1000
+DUPLICATE_SCAN_MAX_AGE = 24 * 3600
+
+# Opérations groupées sur les rendez-vous : identifiants par UPDATE
+BULK_UPDATE_CHUNK_SIZE = 500
+
+# API v1 : taille de page par défaut et maximale (?limit=), sous-requêtes par lot
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_BATCH_MAX_REQUESTS = 20
+
+# Connexion par email (index unique insensible à la casse) ; utilisateurs et
+# organisations gardés en mémoire par processus pendant AUTH_USER_CACHE_TTL
+# secondes (délai maximal avant qu'un autre processus voie une désactivation)
+AUTHENTICATION_BACKENDS = ['appointments.auth.EmailBackend']
+AUTH_USER_CACHE_TTL = 30
+AUTH_PROCESS_CACHE_SIZE = 10000
+# Sessions lues dans le cache partagé, écrites aussi en base
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Préchauffage des workers (APPOINTME_WARMUP=1 ou python manage.py warmup) :
+# caches remplis pour les utilisateurs connectés dans les N derniers jours
+WARMUP_RECENT_DAYS = 7
+WARMUP_MAX_USERS = 200
+
+# Moteur des pages à fort volume (calendrier, rendez-vous, clients) :
+# 'jinja2' (gabarits de appointments/jinja2/) ou 'django' (appointments/templates/)
+HOT_TEMPLATES_ENGINE = os.environ.get('APPOINTME_HOT_TEMPLATES_ENGINE', 'jinja2')
+
+# Grille horaire du calendrier (semaine, jour) : placements en cache par
+# version de données, durée minimale affichée (minutes) et heures affichées
+# quand l'organisation n'a pas d'horaires d'ouverture
+TIMEGRID_CACHE_TTL = 10 * 60
+TIMEGRID_MIN_DURATION = 15
+TIMEGRID_DEFAULT_HOURS = (8, 19)
+
+# Historique des modifications de rendez-vous : taille des lots écrits en
+# différé, attente maximale d'une entrée en tampon (secondes), entrées gardées
+# au plus quand la base refuse l'écriture, et rétention (mois)
+AUDIT_BUFFER_SIZE = 100
+AUDIT_FLUSH_INTERVAL = 5
+AUDIT_BUFFER_MAX = 10000
+AUDIT_RETENTION_MONTHS = 24
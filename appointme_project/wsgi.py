@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'appointme_project.settings')
 
 application = get_wsgi_application()
+
+# Préchauffage du worker (URLs, gabarits, traductions, connexion, caches),
+# voir appointments.warmup
+if os.environ.get('APPOINTME_WARMUP') == '1':
+    from appointments.warmup import warm_up
+
+    warm_up()
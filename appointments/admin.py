@@ -1,59 +1,246 @@
+import calendar
+from datetime import datetime
+
 from django.contrib import admin
-from .models import Customer, Service, Appointment, AppointmentReminder, BusinessHours, Staff
+from django.core.paginator import Paginator
+from django.db import connection, DatabaseError
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import (
+    Customer, Service, Appointment, AppointmentChange, AppointmentReminder, ArchivedAppointment, BusinessHours, Membership,
+    Organization, Staff, Task, WaitlistEntry,
+)
+
+
+# Au-delà de ce nombre de lignes, les listes non filtrées affichent un total estimé
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+def estimate_row_count(model):
+    """Nombre de lignes estimé depuis les statistiques du SGBD (None si indisponible).
+
+    Sous SQLite, les statistiques proviennent de ``ANALYZE`` (table sqlite_stat1).
+    """
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table]),
+        'mysql': ('SELECT table_rows FROM information_schema.tables '
+                  'WHERE table_schema = DATABASE() AND table_name = %s', [table]),
+        'sqlite': ('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+    sql, params = queries[connection.vendor]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not row or row[0] is None:
+        return None
+    return int(str(row[0]).split()[0])
+
+
+def is_filtered(queryset):
+    """Vrai si la liste porte un filtre autre que celui du manager par défaut
+    (lignes supprimées logiquement ou orphelines)"""
+    where = queryset.query.where
+    return bool(where) and where != queryset.model._default_manager.all().query.where
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator qui évite le COUNT(*) exact sur les grosses tables non filtrées."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not is_filtered(queryset):
+            estimate = estimate_row_count(queryset.model)
+            if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class AllRowsAdmin(admin.ModelAdmin):
+    """L'administration voit aussi les lignes masquées par le manager par
+    défaut (suppression logique, rendez-vous orphelins)"""
+
+    def get_queryset(self, request):
+        queryset = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+
+class AppointmentMonthFilter(admin.SimpleListFilter):
+    """Navigation par mois sans requête DISTINCT sur les dates (contrairement à date_hierarchy)"""
+    title = 'mois du rendez-vous'
+    parameter_name = 'month'
+
+    def lookups(self, request, model_admin):
+        today = timezone.localdate()
+        choices = []
+        # 12 mois passés et 3 mois à venir, calculés sans interroger la base
+        for offset in range(3, -13, -1):
+            year, month = divmod(today.year * 12 + today.month - 1 + offset, 12)
+            month += 1
+            choices.append((f'{year:04d}-{month:02d}', f'{month:02d}/{year}'))
+        return choices
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            year, month = (int(part) for part in self.value().split('-'))
+            start = timezone.make_aware(datetime(year, month, 1))
+        except ValueError:
+            return queryset
+        _, last_day = calendar.monthrange(year, month)
+        end = timezone.make_aware(datetime(year, month, last_day, 23, 59, 59, 999999))
+        return queryset.filter(appointment_date__range=(start, end))
+
+
+class MembershipInline(admin.TabularInline):
+    model = Membership
+    extra = 1
+    autocomplete_fields = ['user']
+
+
+@admin.register(Organization)
+class OrganizationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'created_at']
+    search_fields = ['name']
+    ordering = ['name']
+    inlines = [MembershipInline]
 
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
-    list_display = ['full_name', 'email', 'phone', 'created_at']
+class CustomerAdmin(AllRowsAdmin):
+    list_display = ['full_name', 'email', 'phone', 'organization', 'created_at']
     list_filter = ['created_at']
+    list_select_related = ['organization']
     search_fields = ['first_name', 'last_name', 'email', 'phone']
     ordering = ['last_name', 'first_name']
+    autocomplete_fields = ['organization', 'created_by']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Service)
-class ServiceAdmin(admin.ModelAdmin):
-    list_display = ['name', 'duration', 'price', 'is_active', 'created_at']
+class ServiceAdmin(AllRowsAdmin):
+    list_display = ['name', 'duration', 'price', 'is_active', 'organization', 'created_at']
     list_filter = ['is_active', 'created_at']
+    list_select_related = ['organization']
     search_fields = ['name', 'description']
     ordering = ['name']
+    autocomplete_fields = ['organization', 'created_by']
 
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(AllRowsAdmin):
     list_display = ['customer', 'service', 'appointment_date', 'status', 'created_by', 'created_at']
-    list_filter = ['status', 'appointment_date', 'created_at']
+    list_filter = ['status', AppointmentMonthFilter, 'appointment_date', 'created_at']
+    list_select_related = ['customer', 'service', 'created_by']
     search_fields = ['customer__first_name', 'customer__last_name', 'customer__email', 'service__name']
     ordering = ['-appointment_date']
-    date_hierarchy = 'appointment_date'
-    
+    autocomplete_fields = ['organization', 'customer', 'service', 'created_by']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     fieldsets = (
         ('Informations générales', {
             'fields': ('customer', 'service', 'appointment_date', 'duration', 'status')
         }),
         ('Détails', {
-            'fields': ('notes', 'created_by')
+            'fields': ('notes', 'organization', 'created_by')
         }),
     )
 
 
+@admin.register(ArchivedAppointment)
+class ArchivedAppointmentAdmin(AllRowsAdmin):
+    list_display = ['customer', 'service', 'appointment_date', 'status', 'created_by', 'archived_at']
+    list_filter = ['status', 'archived_at']
+    list_select_related = ['customer', 'service', 'created_by']
+    search_fields = ['customer__first_name', 'customer__last_name', 'customer__email', 'service__name']
+    ordering = ['-appointment_date']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(AppointmentReminder)
 class AppointmentReminderAdmin(admin.ModelAdmin):
     list_display = ['appointment', 'reminder_date', 'reminder_type', 'sent', 'created_at']
     list_filter = ['sent', 'reminder_type', 'created_at']
+    list_select_related = ['appointment__customer', 'appointment__service']
     search_fields = ['appointment__customer__first_name', 'appointment__customer__last_name']
     ordering = ['-reminder_date']
+    autocomplete_fields = ['appointment']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(BusinessHours)
 class BusinessHoursAdmin(admin.ModelAdmin):
-    list_display = ['day', 'is_open', 'open_time', 'close_time', 'lunch_start', 'lunch_end']
+    list_display = ['day', 'organization', 'is_open', 'open_time', 'close_time', 'lunch_start', 'lunch_end']
     list_filter = ['is_open', 'day']
-    ordering = ['day']
+    list_select_related = ['organization']
+    ordering = ['organization', 'day']
+    autocomplete_fields = ['organization']
 
 
 @admin.register(Staff)
 class StaffAdmin(admin.ModelAdmin):
-    list_display = ['user', 'phone', 'is_active', 'created_at']
+    list_display = ['user', 'organization', 'phone', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
+    list_select_related = ['user', 'organization']
     search_fields = ['user__first_name', 'user__last_name', 'user__email', 'phone']
-    filter_horizontal = ['specializations']
\ No newline at end of file
+    autocomplete_fields = ['user', 'organization', 'specializations']
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'service', 'window_start', 'window_end', 'auto_book', 'status', 'offered_start', 'created_at']
+    list_filter = ['status', 'auto_book', 'created_at']
+    list_select_related = ['customer', 'service']
+    search_fields = ['customer__first_name', 'customer__last_name', 'customer__email']
+    ordering = ['-created_at']
+    autocomplete_fields = ['organization', 'customer', 'service', 'appointment']
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'queue', 'priority', 'status', 'attempts', 'run_at', 'locked_by', 'finished_at']
+    list_filter = ['status', 'queue']
+    search_fields = ['name', 'last_error']
+    ordering = ['-created_at']
+    readonly_fields = ['attempts', 'locked_by', 'locked_until', 'last_error', 'created_at', 'finished_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(AppointmentChange)
+class AppointmentChangeAdmin(admin.ModelAdmin):
+    list_display = ['appointment_id', 'changed_by', 'changed_at', 'source', 'changes']
+    list_filter = ['month', 'source']
+    list_select_related = ['changed_by']
+    search_fields = ['=appointment_id']
+    ordering = ['-changed_at']
+    readonly_fields = ['organization', 'appointment_id', 'changed_by', 'changed_at', 'month', 'source', 'changes']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
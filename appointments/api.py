@@ -0,0 +1,265 @@
+"""
+API JSON versionnée (``/api/v1/``) : rendez-vous, clients et services.
+
+Chaque ressource déclare ses champs publics : colonnes lues (projection
+``values_list``, sans instancier de modèles) et conversion JSON. Le client
+choisit ses champs avec ``?fields=`` : seules les colonnes nécessaires sont
+sélectionnées et les jointures ne sont faites que si un champ les demande.
+
+La pagination se fait par curseur (clé de tri + identifiant du dernier
+élément) : chaque page est une recherche dans l'index, quelle que soit sa
+profondeur, au lieu d'un OFFSET qui relit toutes les lignes précédentes.
+"""
+import base64
+import json
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment, Customer, Service
+
+
+class ApiError(ValueError):
+    """Paramètre invalide (réponse 400)"""
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _minutes(value):
+    return int(value.total_seconds()) // 60
+
+
+def _identity(value):
+    return value
+
+
+def _full_name(first_name, last_name):
+    return f'{first_name} {last_name}'
+
+
+def _labels(choices):
+    labels = dict(choices)
+    return lambda value: labels.get(value, value)
+
+
+class Resource:
+    """Ressource de l'API : queryset de l'organisation, champs publics et filtres.
+
+    ``fields`` associe chaque nom public à ``(colonnes, conversion)`` ; la
+    conversion reçoit les valeurs des colonnes dans l'ordre. ``ordering``
+    donne la clé du curseur (colonnes uniques ensemble, identifiant en dernier).
+    """
+
+    def __init__(self, model, fields, default_fields, ordering, filters=None):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.ordering = ordering
+        self.filters = filters or {}
+
+    def queryset(self, organization):
+        return self.model.objects.filter(organization=organization)
+
+    def select_fields(self, value):
+        """Champs demandés par ``?fields=a,b`` (tous les champs par défaut sinon)"""
+        if not value:
+            return self.default_fields
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f"Champ inconnu : {', '.join(unknown)}")
+        return names
+
+    def serialize(self, queryset, names):
+        """Lignes ``{champ: valeur}`` lues par projection"""
+        columns = list(self.ordering)
+        slices = []
+        for name in names:
+            lookups, convert = self.fields[name]
+            indexes = []
+            for lookup in lookups:
+                if lookup not in columns:
+                    columns.append(lookup)
+                indexes.append(columns.index(lookup))
+            slices.append((name, indexes, convert))
+        rows = list(queryset.values_list(*columns))
+        items = [
+            {name: convert(*[row[i] for i in indexes]) for name, indexes, convert in slices}
+            for row in rows
+        ]
+        return items, rows
+
+
+def _date_start(value):
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ApiError('Format de date invalide (AAAA-MM-JJ)')
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def _choice(choices, lookup):
+    allowed = {value for value, _ in choices}
+
+    def apply(queryset, value):
+        values = value.split(',')
+        if not set(values) <= allowed:
+            raise ApiError('Statut invalide')
+        return queryset.filter(**{f'{lookup}__in': values})
+    return apply
+
+
+def _integer(lookup):
+    def apply(queryset, value):
+        try:
+            return queryset.filter(**{lookup: int(value)})
+        except ValueError:
+            raise ApiError(f'Identifiant invalide : {value}')
+    return apply
+
+
+RESOURCES = {
+    'appointments': Resource(
+        Appointment,
+        fields={
+            'id': (('id',), _identity),
+            'date': (('appointment_date',), _iso),
+            'duration': (('duration',), _minutes),
+            'price': (('price',), int),
+            'status': (('status',), _identity),
+            'status_display': (('status',), _labels(Appointment.STATUS_CHOICES)),
+            'notes': (('notes',), lambda value: value or ''),
+            'customer_id': (('customer_id',), _identity),
+            'customer': (('customer__first_name', 'customer__last_name'), _full_name),
+            'service_id': (('service_id',), _identity),
+            'service': (('service__name',), _identity),
+            'updated_at': (('updated_at',), _iso),
+        },
+        default_fields=['id', 'date', 'duration', 'status', 'customer_id', 'service_id'],
+        ordering=('appointment_date', 'id'),
+        filters={
+            'start': lambda qs, value: qs.filter(appointment_date__gte=_date_start(value)),
+            'end': lambda qs, value: qs.filter(appointment_date__lt=_date_start(value) + timedelta(days=1)),
+            'status': _choice(Appointment.STATUS_CHOICES, 'status'),
+            'customer': _integer('customer_id'),
+            'service': _integer('service_id'),
+        },
+    ),
+    'customers': Resource(
+        Customer,
+        fields={
+            'id': (('id',), _identity),
+            'first_name': (('first_name',), _identity),
+            'last_name': (('last_name',), _identity),
+            'name': (('first_name', 'last_name'), _full_name),
+            'email': (('email',), _identity),
+            'phone': (('phone',), lambda value: value or ''),
+            'visit_count': (('visit_count',), _identity),
+            'last_visit': (('last_visit',), _iso),
+            'next_appointment': (('next_appointment',), _iso),
+            'updated_at': (('updated_at',), _iso),
+        },
+        default_fields=['id', 'first_name', 'last_name', 'email', 'phone'],
+        ordering=('last_name', 'first_name', 'id'),
+    ),
+    'services': Resource(
+        Service,
+        fields={
+            'id': (('id',), _identity),
+            'name': (('name',), _identity),
+            'description': (('description',), lambda value: value or ''),
+            'duration': (('duration',), _minutes),
+            'price': (('price',), int),
+            'is_active': (('is_active',), _identity),
+        },
+        default_fields=['id', 'name', 'duration', 'price', 'is_active'],
+        ordering=('name', 'id'),
+        filters={
+            'active': lambda qs, value: qs.filter(is_active=value not in ('0', 'false')),
+        },
+    ),
+}
+
+
+def _cursor_value(value):
+    return {'t': 'dt', 'v': value.isoformat()} if isinstance(value, datetime) else value
+
+
+def _cursor_load(value):
+    return datetime.fromisoformat(value['v']) if isinstance(value, dict) else value
+
+
+def encode_cursor(values):
+    data = json.dumps([_cursor_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Valeurs du curseur, converties par les champs de tri de ``model`` ; un
+    curseur falsifié ou périmé donne une ``ApiError`` (400), pas une erreur SQL"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError
+        values = [
+            model._meta.get_field(column).to_python(_cursor_load(value))
+            for column, value in zip(ordering, values)
+        ]
+        # Les colonnes de tri ne sont jamais nulles : « > NULL » ne sélectionnerait rien
+        if any(value is None for value in values):
+            raise ValueError
+        return values
+    except (ValueError, TypeError, KeyError, ValidationError):
+        raise ApiError('Curseur invalide')
+
+
+def _after(ordering, values):
+    """Condition « strictement après ``values`` » dans l'ordre ``ordering``"""
+    condition = Q()
+    for i in reversed(range(len(ordering))):
+        step = Q(**{f'{ordering[i]}__gt': values[i]})
+        if i < len(ordering) - 1:
+            step |= Q(**{ordering[i]: values[i]}) & condition
+        condition = step
+    return condition
+
+
+def page_size(value):
+    if not value:
+        return settings.API_PAGE_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        raise ApiError('Taille de page invalide')
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def list_resource(organization, name, params):
+    """Page ``{'results', 'next'}`` de la ressource ``name`` ; ``params`` est un
+    dictionnaire de paramètres de requête (``fields``, ``cursor``, ``limit``, filtres)"""
+    resource = RESOURCES.get(name)
+    if resource is None:
+        raise ApiError(f'Ressource inconnue : {name}')
+    names = resource.select_fields(params.get('fields'))
+    limit = page_size(params.get('limit'))
+
+    queryset = resource.queryset(organization)
+    for key, apply in resource.filters.items():
+        if params.get(key):
+            queryset = apply(queryset, params[key])
+    if params.get('cursor'):
+        values = decode_cursor(params['cursor'], resource.model, resource.ordering)
+        queryset = queryset.filter(_after(resource.ordering, values))
+    queryset = queryset.order_by(*resource.ordering)[:limit + 1]
+
+    items, rows = resource.serialize(queryset, names)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(rows[limit - 1][:len(resource.ordering)])
+    return {'results': items, 'next': next_cursor}
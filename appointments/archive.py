@@ -0,0 +1,110 @@
+"""
+Archivage des rendez-vous anciens.
+
+Les rendez-vous à l'état terminal (terminé, annulé, absent) plus anciens que
+``ARCHIVE_AFTER_DAYS`` sont déplacés, avec leurs rappels, vers les tables
+``ArchivedAppointment`` / ``ArchivedAppointmentReminder`` par lots
+``INSERT ... SELECT`` puis ``DELETE`` : la table courante reste petite.
+
+Les lectures qui portent sur une période ancienne passent par
+``appointments_with_archive`` qui ajoute les lignes archivées.
+"""
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache_versions import bump_data_version
+from .models import (
+    Appointment, AppointmentReminder, ArchivedAppointment, ArchivedAppointmentReminder, WaitlistEntry,
+)
+
+ARCHIVE_STATUSES = ('completed', 'cancelled', 'no_show')
+
+_APPOINTMENT_COLUMNS = [
+    'id', 'customer_id', 'service_id', 'appointment_date', 'duration', 'price', 'status',
+    'notes', 'organization_id', 'created_by_id', 'created_at', 'updated_at', 'orphaned',
+]
+_REMINDER_COLUMNS = ['id', 'appointment_id', 'reminder_date', 'sent', 'reminder_type', 'created_at']
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _columns(columns):
+    return ', '.join(connection.ops.quote_name(c) for c in columns)
+
+
+def archive_cutoff():
+    return timezone.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+
+
+def archive_batch(cutoff, batch_size):
+    """Déplace au plus ``batch_size`` rendez-vous antérieurs à ``cutoff``.
+
+    Retourne le nombre de rendez-vous déplacés (0 quand il n'y a plus rien).
+    """
+    with transaction.atomic():
+        rows = list(
+            Appointment.all_objects
+            .filter(status__in=ARCHIVE_STATUSES, appointment_date__lt=cutoff)
+            .order_by('appointment_date')
+            .values_list('pk', 'organization_id')[:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [pk for pk, _ in rows]
+        placeholders = ', '.join(['%s'] * len(ids))
+        now = timezone.now()
+        # Les entrées de liste d'attente servies ne pointent plus vers la table courante
+        WaitlistEntry.objects.filter(appointment_id__in=ids).update(appointment=None)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {_table(ArchivedAppointment)} ({_columns(_APPOINTMENT_COLUMNS)}, archived_at) '
+                f'SELECT {_columns(_APPOINTMENT_COLUMNS)}, %s FROM {_table(Appointment)} '
+                f'WHERE id IN ({placeholders})',
+                [now] + ids,
+            )
+            cursor.execute(
+                f'INSERT INTO {_table(ArchivedAppointmentReminder)} ({_columns(_REMINDER_COLUMNS)}) '
+                f'SELECT {_columns(_REMINDER_COLUMNS)} FROM {_table(AppointmentReminder)} '
+                f'WHERE appointment_id IN ({placeholders})',
+                ids,
+            )
+            cursor.execute(f'DELETE FROM {_table(AppointmentReminder)} WHERE appointment_id IN ({placeholders})', ids)
+            cursor.execute(f'DELETE FROM {_table(Appointment)} WHERE id IN ({placeholders})', ids)
+        # Les requêtes SQL directes ne déclenchent pas les signaux
+        for organization_id in {organization_id for _, organization_id in rows}:
+            transaction.on_commit(lambda organization_id=organization_id: bump_data_version(organization_id))
+    return len(ids)
+
+
+def archived_until():
+    """Date du rendez-vous archivé le plus récent (None si l'archive est vide)"""
+    return ArchivedAppointment.all_objects.aggregate(last=Max('appointment_date'))['last']
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return timezone.make_aware(datetime.combine(value, dt_time.min))
+
+
+def appointments_with_archive(start, *args, **filters):
+    """Rendez-vous filtrés, archive comprise si la période commence avant le
+    dernier rendez-vous archivé.
+
+    ``start`` (date ou datetime, None pour « depuis toujours ») sert
+    uniquement à décider s'il faut interroger l'archive ; les filtres
+    s'appliquent à l'identique aux deux tables, qui ont les mêmes champs.
+    Retourne une liste triée par date.
+    """
+    appointments = list(Appointment.objects.filter(*args, **filters).select_related('customer', 'service'))
+    last_archived = archived_until()
+    if last_archived is not None and (start is None or _as_datetime(start) <= last_archived):
+        appointments += ArchivedAppointment.objects.filter(*args, **filters).select_related('customer', 'service')
+        appointments.sort(key=lambda a: a.appointment_date)
+    return appointments
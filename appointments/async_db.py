@@ -0,0 +1,50 @@
+"""
+Exécution de requêtes ORM depuis des vues asynchrones.
+
+Chaque appel tourne dans un thread du pool avec sa propre connexion, ce qui
+permet de lancer plusieurs sous-requêtes en parallèle via ``asyncio.gather``.
+Si la tâche est annulée (client déconnecté, requête remplacée par une frappe
+plus récente), la requête SQL en cours est interrompue côté base au lieu de
+continuer à consommer du temps DB.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .slow_queries import capture_slow_queries
+
+
+def _interrupt(conn):
+    """Interrompt la requête en cours sur une connexion (appelable depuis un autre thread)."""
+    raw = conn.connection
+    if raw is None:
+        return
+    # sqlite3.Connection.interrupt() / psycopg Connection.cancel()
+    for name in ('interrupt', 'cancel'):
+        method = getattr(raw, name, None)
+        if method is not None:
+            method()
+            return
+
+
+async def run_query(func, *args, view=None):
+    """Exécute ``func(*args)`` dans un thread dédié et retourne son résultat"""
+    holder = {}
+
+    def target():
+        # Le wrapper propre à ce thread (et non le proxy django.db.connection)
+        conn = holder['connection'] = connections[DEFAULT_DB_ALIAS]
+        try:
+            with capture_slow_queries(view=view):
+                return func(*args)
+        finally:
+            conn.close()
+
+    try:
+        return await sync_to_async(target, thread_sensitive=False)()
+    except asyncio.CancelledError:
+        conn = holder.get('connection')
+        if conn is not None:
+            _interrupt(conn)
+        raise
@@ -0,0 +1,260 @@
+"""
+Historique des modifications de rendez-vous (qui a changé quoi, et quand).
+
+``snapshot()`` relève les champs suivis avant la modification, ``record()``
+calcule le diff champ par champ après l'enregistrement. Les actions groupées
+(``bulk.py``, ``snapshots()``/``record_many()``) et les réservations de la
+liste d'attente (``record_created()``) sont tracées de même, avec leur
+``source``.
+
+L'écriture est différée : les entrées s'accumulent dans un tampon en mémoire
+du processus et sont insérées par ``bulk_create``, en une requête par lot :
+
+- dès que le tampon atteint ``AUDIT_BUFFER_SIZE`` entrées ;
+- au plus tard ``AUDIT_FLUSH_INTERVAL`` secondes après la plus ancienne
+  entrée en attente, par un thread de fond propre au processus (ou en fin de
+  requête, signal ``request_finished``, si l'échéance est déjà passée) ;
+- à l'arrêt du processus.
+
+Si un lot est refusé par la base parce que son auteur ou son organisation a
+été supprimé entre-temps, il est réécrit une fois sans ces références ; une
+erreur passagère (base verrouillée) le remet en tampon, borné à
+``AUDIT_BUFFER_MAX`` entrées. Les entrées abandonnées sont journalisées.
+
+``history()`` vide d'abord le tampon du processus courant : les entrées
+encore en attente dans les autres processus (workers web, ``run_tasks``)
+n'y apparaissent qu'après au plus ``AUDIT_FLUSH_INTERVAL`` secondes. Un
+processus tué brutalement perd au plus son tampon. L'historique est
+découpé par mois (``AppointmentChange.month``) ; ``manage.py prune_audit``
+supprime les mois plus anciens que ``AUDIT_RETENTION_MONTHS``.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.utils import timezone
+
+from .catalog import get_catalog
+from .models import Appointment, AppointmentChange, Organization
+
+logger = logging.getLogger(__name__)
+
+FIELDS = tuple(AppointmentChange.FIELD_LABELS)
+STATUS_LABELS = dict(Appointment.STATUS_CHOICES)
+
+_buffer = []
+_first_at = None
+# Processus dans lequel le thread d'écriture tourne (les threads ne survivent pas à un fork)
+_flusher_pid = None
+_lock = threading.Lock()
+
+
+def month_key(value):
+    """Mois (AAAAMM, heure locale) d'une date"""
+    value = timezone.localtime(value)
+    return value.year * 100 + value.month
+
+
+def _values(catalog, status, appointment_date, service_id, customer_name, notes):
+    service = catalog.service(service_id)
+    return {
+        'status': STATUS_LABELS.get(status, status),
+        'appointment_date': timezone.localtime(appointment_date).strftime('%d/%m/%Y %H:%M'),
+        'service': service.name if service else str(service_id),
+        'customer': customer_name,
+        'notes': notes or '',
+    }
+
+
+def snapshot(appointment):
+    """Valeurs affichables des champs suivis"""
+    return _values(get_catalog(appointment.organization_id), appointment.status, appointment.appointment_date,
+                   appointment.service_id, appointment.customer.full_name, appointment.notes)
+
+
+def snapshots(appointments):
+    """``{pk: valeurs}`` des rendez-vous d'un queryset, en une requête"""
+    catalogs = {}
+    values = {}
+    for pk, organization_id, status, appointment_date, service_id, first_name, last_name, notes in (
+        appointments.values_list('pk', 'organization_id', 'status', 'appointment_date', 'service_id',
+                                 'customer__first_name', 'customer__last_name', 'notes')
+    ):
+        if organization_id not in catalogs:
+            catalogs[organization_id] = get_catalog(organization_id)
+        values[pk] = _values(catalogs[organization_id], status, appointment_date, service_id,
+                             f'{first_name} {last_name}', notes)
+    return values
+
+
+def _entry(organization_id, appointment_id, before, after, user, source):
+    changes = {field: [before[field], after[field]] for field in FIELDS if before[field] != after[field]}
+    if not changes:
+        return None
+    now = timezone.now()
+    return AppointmentChange(
+        organization_id=organization_id,
+        appointment_id=appointment_id,
+        # Identifiant seul : l'entrée ne retient pas l'instance de l'utilisateur
+        changed_by_id=user.pk if user is not None and user.is_authenticated else None,
+        changed_at=now,
+        month=month_key(now),
+        source=source,
+        changes=changes,
+    )
+
+
+def _push(entries):
+    global _first_at
+    if not entries:
+        return
+    with _lock:
+        if not _buffer:
+            _first_at = time.monotonic()
+        _buffer.extend(entries)
+        full = len(_buffer) >= settings.AUDIT_BUFFER_SIZE
+    if full:
+        flush()
+    _start_flusher()
+
+
+def record(appointment, before, user=None, source='edit'):
+    """Met en tampon les champs modifiés depuis ``before`` ; retourne l'entrée, ou None si rien n'a changé"""
+    entry = _entry(appointment.organization_id, appointment.pk, before, snapshot(appointment), user, source)
+    _push([entry] if entry else [])
+    return entry
+
+
+def record_created(appointment, user=None, source='waitlist'):
+    """Met en tampon la création d'un rendez-vous (valeurs initiales)"""
+    return record(appointment, dict.fromkeys(FIELDS, ''), user, source)
+
+
+def record_many(organization_id, before, after, user=None, source='bulk'):
+    """Met en tampon une entrée par rendez-vous modifié ; ``before``/``after`` : ``{pk: valeurs}``"""
+    entries = [
+        _entry(organization_id, pk, values, after[pk], user, source)
+        for pk, values in before.items() if pk in after
+    ]
+    entries = [entry for entry in entries if entry is not None]
+    _push(entries)
+    return len(entries)
+
+
+def _insert(entries):
+    # Sous SQLite, les clés étrangères sont vérifiées à la validation : une
+    # transaction propre rend l'échec immédiat et annule tout le lot
+    with transaction.atomic():
+        AppointmentChange.objects.bulk_create(entries, batch_size=settings.AUDIT_BUFFER_SIZE)
+
+
+def _repair(entries):
+    """Entrées encore insérables : auteur supprimé depuis la mise en tampon
+    remplacé par None, entrées d'une organisation supprimée abandonnées"""
+    users = set(User.objects.filter(pk__in={entry.changed_by_id for entry in entries if entry.changed_by_id})
+                .values_list('pk', flat=True))
+    organizations = set(Organization.objects.filter(pk__in={entry.organization_id for entry in entries})
+                        .values_list('pk', flat=True))
+    kept, dropped = [], []
+    for entry in entries:
+        # bulk_create a pu attribuer des clés avant l'annulation
+        entry.pk = None
+        entry._state.adding = True
+        if entry.changed_by_id is not None and entry.changed_by_id not in users:
+            entry.changed_by_id = None
+        (kept if entry.organization_id in organizations else dropped).append(entry)
+    _log_dropped(dropped, 'organisation supprimée')
+    return kept
+
+
+def _log_dropped(entries, reason):
+    if entries:
+        logger.error("%d entrées d'historique abandonnées (%s), rendez-vous : %s", len(entries), reason,
+                     sorted({entry.appointment_id for entry in entries}))
+
+
+def _requeue(entries):
+    """Remet des entrées en tête du tampon, borné à ``AUDIT_BUFFER_MAX`` (les plus anciennes sont abandonnées)"""
+    global _first_at
+    with _lock:
+        _buffer[:0] = entries
+        overflow = _buffer[:max(0, len(_buffer) - settings.AUDIT_BUFFER_MAX)]
+        del _buffer[:len(overflow)]
+        if _buffer and _first_at is None:
+            _first_at = time.monotonic()
+    _log_dropped(overflow, 'tampon plein')
+
+
+def flush():
+    """Écrit le tampon en base ; retourne le nombre d'entrées écrites"""
+    global _first_at
+    with _lock:
+        entries = _buffer[:]
+        _buffer.clear()
+        _first_at = None
+    if not entries:
+        return 0
+    try:
+        _insert(entries)
+    except IntegrityError:
+        # Un seul nouvel essai, sans les lignes fautives : sinon le lot
+        # bloquerait toutes les écritures suivantes du processus
+        entries = _repair(entries)
+        try:
+            _insert(entries)
+        except DatabaseError:
+            logger.exception("Écriture de l'historique impossible après correction du lot")
+            _log_dropped(entries, "échec d'écriture")
+            return 0
+    except DatabaseError:
+        logger.exception("Écriture de %d entrées d'historique impossible, nouvel essai au prochain lot", len(entries))
+        _requeue(entries)
+        return 0
+    return len(entries)
+
+
+def flush_if_due():
+    """Vide le tampon si sa plus ancienne entrée attend depuis ``AUDIT_FLUSH_INTERVAL``"""
+    first_at = _first_at
+    if first_at is not None and time.monotonic() - first_at >= settings.AUDIT_FLUSH_INTERVAL:
+        flush()
+
+
+def _start_flusher():
+    global _flusher_pid
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_periodically, name='audit-flush', daemon=True).start()
+
+
+def _flush_periodically():
+    """Boucle du thread de fond : écrit chaque entrée au plus ``AUDIT_FLUSH_INTERVAL`` secondes après son ajout"""
+    while True:
+        first_at = _first_at
+        interval = settings.AUDIT_FLUSH_INTERVAL
+        time.sleep(interval if first_at is None else max(0.0, first_at + interval - time.monotonic()))
+        try:
+            flush_if_due()
+        except Exception:
+            logger.exception("Écriture différée de l'historique en échec")
+        finally:
+            # Connexion propre à ce thread : pas de connexion ouverte entre deux écritures
+            connections.close_all()
+
+
+def history(appointment):
+    """Modifications d'un rendez-vous, de la plus récente à la plus ancienne"""
+    flush()
+    return (AppointmentChange.objects
+            .filter(organization_id=appointment.organization_id, appointment_id=appointment.pk)
+            .select_related('changed_by'))
+
+
+atexit.register(flush)
@@ -0,0 +1,110 @@
+"""
+Authentification par email et cache des utilisateurs par processus.
+
+L'email est recherché via ``LOWER(email)``, couvert par l'index unique
+insensible à la casse ``auth_user_email_ci`` (migration 0018) : la connexion
+et le contrôle d'unicité de l'inscription ne parcourent plus la table.
+
+Chaque requête authentifiée relit l'utilisateur de sa session
+(``get_user``). Le backend garde les utilisateurs en mémoire pendant
+``AUTH_USER_CACHE_TTL`` secondes : combiné aux sessions ``cached_db``, une
+requête authentifiée ne fait plus de requête SQL en régime établi. Un
+enregistrement de l'utilisateur vide l'entrée du processus courant (voir
+``signals.py``) ; les autres processus la voient expirer au bout du TTL
+(désactivation d'un compte, changement de mot de passe).
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+
+class ProcessCache:
+    """Petit cache clé → valeur local au processus, avec expiration"""
+
+    def __init__(self, ttl_setting):
+        self.ttl_setting = ttl_setting
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value):
+        ttl = getattr(settings, self.ttl_setting)
+        with self._lock:
+            if len(self._entries) >= settings.AUTH_PROCESS_CACHE_SIZE:
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[0] >= now}
+                if len(self._entries) >= settings.AUTH_PROCESS_CACHE_SIZE:
+                    self._entries.clear()
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+users = ProcessCache('AUTH_USER_CACHE_TTL')
+
+
+def users_with_email(email):
+    """Utilisateurs dont l'email correspond, sans tenir compte de la casse (via l'index)"""
+    # ``email > ''`` reprend la condition de l'index partiel pour qu'il soit utilisé
+    return get_user_model()._default_manager.alias(email_lower=Lower('email')).filter(
+        email_lower=(email or '').strip().lower(), email__gt='',
+    )
+
+
+class EmailBackend(ModelBackend):
+    """Connexion par email (ou par nom d'utilisateur pour l'admin), utilisateurs en cache"""
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        email = email or username
+        if not email or password is None:
+            return None
+        user = users_with_email(email).first()
+        if user is None:
+            if username is None:
+                # Même coût qu'un mot de passe vérifié : l'existence du compte ne fuit pas
+                get_user_model()().set_password(password)
+                return None
+            return super().authenticate(request, username=username, password=password, **kwargs)
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        user = users.get(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            users.set(user_id, user)
+        # Copie : les caches de permissions et attributs posés par une requête
+        # ne doivent pas passer aux suivantes
+        return _copy(user)
+
+
+# Caches posés par ModelBackend sur l'utilisateur
+PERM_CACHES = ('_perm_cache', '_user_perm_cache', '_group_perm_cache')
+
+
+def _copy(user):
+    # copy.copy passe par Model.__reduce__ (clé de version Django comprise)
+    clone = copy.copy(user)
+    clone._state.fields_cache = {}
+    for name in PERM_CACHES:
+        clone.__dict__.pop(name, None)
+    return clone
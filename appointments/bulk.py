@@ -0,0 +1,100 @@
+"""
+Opérations groupées sur les rendez-vous (fermeture imprévue, report...).
+
+Chaque opération s'exécute en quelques UPDATE SQL (par tranches de
+``BULK_UPDATE_CHUNK_SIZE`` identifiants) au lieu d'un ``save()`` par
+rendez-vous, avec un seul lot d'ajustement des rappels. Les UPDATE ne
+déclenchant pas les signaux, les agrégats quotidiens, les statistiques des
+clients et la version de cache de l'organisation sont mis à jour une fois
+à la fin.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import audit, customer_stats, rollups
+from .cache_versions import bump_data_version
+from .models import Appointment, AppointmentReminder
+
+# Statuts après lesquels les rappels non envoyés n'ont plus lieu d'être
+CLOSED_STATUSES = ('cancelled', 'no_show', 'completed')
+
+
+def select(organization, ids=None, start=None, end=None):
+    """Rendez-vous ciblés : identifiants cochés, ou rendez-vous à venir
+    (programmés/confirmés) des jours ``start`` à ``end`` inclus"""
+    appointments = Appointment.objects.filter(organization=organization)
+    if ids is not None:
+        return appointments.filter(pk__in=ids)
+    tz = timezone.get_current_timezone()
+    return appointments.filter(
+        status__in=customer_stats.UPCOMING_STATUSES,
+        appointment_date__gte=timezone.make_aware(datetime.combine(start, time.min), tz),
+        appointment_date__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def _chunks(ids):
+    size = settings.BULK_UPDATE_CHUNK_SIZE
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def _apply(organization, appointments, changes, reminders=None, shift=timedelta(0), user=None):
+    """Applique ``changes`` aux rendez-vous et ``reminders(ids)`` à leurs rappels ;
+    chaque rendez-vous modifié est tracé dans l'historique (audit.py)"""
+    rows = list(appointments.values_list('pk', 'customer_id', 'appointment_date'))
+    if not rows:
+        return 0
+    ids = [pk for pk, _, _ in rows]
+    changes['updated_at'] = timezone.now()
+    history = []
+    with transaction.atomic():
+        for chunk in _chunks(ids):
+            chunk_appointments = Appointment.all_objects.filter(pk__in=chunk)
+            before = audit.snapshots(chunk_appointments)
+            chunk_appointments.update(**changes)
+            if reminders is not None:
+                reminders(AppointmentReminder.objects.filter(appointment_id__in=chunk, sent=False))
+            history.append((before, audit.snapshots(chunk_appointments)))
+    # Mis en tampon après la validation : un lot annulé n'a pas d'historique
+    for before, after in history:
+        audit.record_many(organization.pk, before, after, user)
+
+    # Les UPDATE contournent les signaux : agrégats et statistiques une seule fois
+    dates = [appointment_date for _, _, appointment_date in rows]
+    first, last = min(dates), max(dates)
+    rollups.rebuild_range(
+        timezone.localdate(min(first, first + shift)),
+        timezone.localdate(max(last, last + shift)),
+        organization_id=organization.pk,
+    )
+    customer_stats.refresh({customer_id for _, customer_id, _ in rows})
+    bump_data_version(organization.pk)
+    return len(ids)
+
+
+def set_status(organization, appointments, status, user=None):
+    """Change le statut ; les rappels non envoyés d'un rendez-vous clos sont supprimés"""
+    reminders = (lambda qs: qs.delete()) if status in CLOSED_STATUSES else None
+    return _apply(organization, appointments, {'status': status}, reminders, user=user)
+
+
+def shift(organization, appointments, offset, user=None):
+    """Décale les rendez-vous et leurs rappels non envoyés de ``offset``"""
+    return _apply(
+        organization, appointments,
+        {'appointment_date': F('appointment_date') + offset},
+        lambda qs: qs.update(reminder_date=F('reminder_date') + offset),
+        shift=offset,
+        user=user,
+    )
+
+
+def reassign_service(organization, appointments, service, user=None):
+    """Attribue un autre service (avec sa durée et son prix) aux rendez-vous"""
+    return _apply(organization, appointments,
+                  {'service': service, 'duration': service.duration, 'price': service.price}, user=user)
@@ -0,0 +1,44 @@
+"""
+Versions de données par organisation, stockées dans le cache partagé.
+
+Chaque écriture sur les clients, services ou rendez-vous d'une organisation
+incrémente sa version (voir ``signals.py``). Les caches qui intègrent cette
+version dans leurs clés sont ainsi invalidés sans avoir à lister les entrées.
+
+Le catalogue (services, horaires) a sa propre version, ``catalog`` : les
+rendez-vous, modifiés en permanence, ne l'invalident pas.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(organization_id, kind='data'):
+    return f'appointme:{kind}-version:org:{organization_id}'
+
+
+def _fresh_version():
+    # Basée sur l'horloge : si la clé est évincée du cache, la nouvelle
+    # version ne peut pas retomber sur une ancienne valeur.
+    return int(time.time() * 1000)
+
+
+def get_data_version(organization_id, kind='data'):
+    """Version courante des données (ou du catalogue, ``kind='catalog'``) de l'organisation"""
+    key = _version_key(organization_id, kind)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(organization_id, kind='data'):
+    """Invalide toutes les entrées de cache dépendant des données de l'organisation"""
+    key = _version_key(organization_id, kind)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _fresh_version()
+        cache.set(key, version, timeout=None)
+        return version
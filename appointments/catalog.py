@@ -0,0 +1,134 @@
+"""
+Catalogue de l'organisation (services, heures d'ouverture) en mémoire.
+
+Ces tables ne changent que quelques fois par an mais sont lues par presque
+toutes les pages (formulaires de rendez-vous, liste des services, taux
+d'occupation). Chaque processus garde un instantané immuable par
+organisation, valable tant que la version ``catalog`` de l'organisation dans
+le cache partagé (``cache_versions``) n'a pas changé : toute écriture sur un
+service ou un horaire l'incrémente (voir ``signals.py``) et les autres
+processus rechargent l'instantané à leur requête suivante. En régime établi,
+lire le catalogue coûte une lecture du cache partagé et aucune requête SQL.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import time, timedelta
+from decimal import Decimal
+from types import MappingProxyType
+
+from django.utils import timezone
+
+from .cache_versions import bump_data_version, get_data_version
+from .models import BusinessHours, Service
+
+DAYS = tuple(day for day, _ in BusinessHours.DAY_CHOICES)
+
+
+@dataclass(frozen=True)
+class ServiceInfo:
+    id: int
+    name: str
+    description: str
+    duration: timedelta
+    price: Decimal
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class DayHours:
+    """Horaires d'un jour ; ``intervals`` : plages d'ouverture, pause déjeuner exclue"""
+    day: str
+    is_open: bool
+    open_time: time
+    close_time: time
+    lunch_start: time = None
+    lunch_end: time = None
+    intervals: tuple = ()
+
+
+@dataclass(frozen=True)
+class Catalog:
+    organization_id: int
+    version: int
+    # Tous les services, triés par nom
+    services: tuple
+    by_id: MappingProxyType
+    # Horaires indexés par jour de la semaine (0 = lundi), None si non renseigné
+    hours: tuple
+
+    @property
+    def active_services(self):
+        return tuple(service for service in self.services if service.is_active)
+
+    @property
+    def business_hours(self):
+        return tuple(hours for hours in self.hours if hours is not None)
+
+    def service(self, service_id):
+        """Service de l'organisation, ou None"""
+        try:
+            return self.by_id.get(int(service_id))
+        except (TypeError, ValueError):
+            return None
+
+    def is_open(self, start, end):
+        """Le créneau [start, end) tient-il dans une plage d'ouverture du jour ?"""
+        start, end = timezone.localtime(start), timezone.localtime(end)
+        hours = self.hours[start.weekday()]
+        if hours is None or (end.date() != start.date() and end.time() != time.min):
+            return False
+        end_time = end.time() if end.date() == start.date() else time.max
+        return any(opening <= start.time() and end_time <= closing for opening, closing in hours.intervals)
+
+
+def _day_hours(row):
+    if not row.is_open:
+        intervals = ()
+    elif row.lunch_start and row.lunch_end:
+        intervals = tuple((a, b) for a, b in ((row.open_time, row.lunch_start), (row.lunch_end, row.close_time)) if a < b)
+    else:
+        intervals = ((row.open_time, row.close_time),)
+    return DayHours(row.day, row.is_open, row.open_time, row.close_time, row.lunch_start, row.lunch_end, intervals)
+
+
+def _load(organization_id, version):
+    services = tuple(
+        ServiceInfo(pk, name, description or '', duration, price, is_active)
+        for pk, name, description, duration, price, is_active in Service.objects
+        .filter(organization_id=organization_id).order_by('name', 'pk')
+        .values_list('pk', 'name', 'description', 'duration', 'price', 'is_active')
+    )
+    hours = [None] * len(DAYS)
+    for row in BusinessHours.objects.filter(organization_id=organization_id):
+        if row.day in DAYS:
+            hours[DAYS.index(row.day)] = _day_hours(row)
+    return Catalog(
+        organization_id=organization_id,
+        version=version,
+        services=services,
+        by_id=MappingProxyType({service.id: service for service in services}),
+        hours=tuple(hours),
+    )
+
+
+_catalogs = {}
+_lock = threading.Lock()
+
+
+def get_catalog(organization):
+    """Instantané du catalogue de l'organisation (objet ou identifiant)"""
+    organization_id = getattr(organization, 'pk', organization)
+    # Version lue avant le chargement : une écriture concurrente rend l'instantané obsolète
+    version = get_data_version(organization_id, kind='catalog')
+    catalog = _catalogs.get(organization_id)
+    if catalog is None or catalog.version != version:
+        catalog = _load(organization_id, version)
+        with _lock:
+            _catalogs[organization_id] = catalog
+    return catalog
+
+
+def invalidate(organization_id):
+    """Périme le catalogue de l'organisation dans tous les processus"""
+    _catalogs.pop(organization_id, None)
+    bump_data_version(organization_id, kind='catalog')
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.checks import Error, Tags, register
+
+from .templatetags.assets import STYLESHEET
+
+
+@register(Tags.staticfiles)
+def check_stylesheet(app_configs, **kwargs):
+    """Hors DEBUG, la feuille de style compilée doit exister : il n'y a plus de repli sur le CDN Tailwind"""
+    if settings.DEBUG or finders.find(STYLESHEET) or staticfiles_storage.exists(STYLESHEET):
+        return []
+    return [Error(
+        f'Feuille de style {STYLESHEET} introuvable.',
+        hint='Lancer « python manage.py collectstatic » (qui exécute build_assets) avec TAILWIND_CLI renseigné.',
+        id='appointments.E001',
+    )]
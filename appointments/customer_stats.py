@@ -0,0 +1,68 @@
+"""
+Statistiques dénormalisées des clients (visites, dernière visite, prochain
+rendez-vous, total dépensé).
+
+Une visite est un rendez-vous terminé ; les rendez-vous archivés comptent.
+Les signaux des rendez-vous recalculent les statistiques du client concerné ;
+« manage.py reconcile_customer_stats » corrige les écarts (écritures SQL
+directes) et fait avancer ``next_appointment`` une fois la date passée.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from .cache_versions import bump_data_version
+from .models import Appointment, ArchivedAppointment, Customer
+
+STAT_FIELDS = ['visit_count', 'last_visit', 'next_appointment', 'lifetime_spend']
+UPCOMING_STATUSES = ('scheduled', 'confirmed')
+
+
+def compute(customer_ids):
+    """Statistiques des clients donnés, en une requête groupée par table"""
+    now = timezone.now()
+    completed = Q(status='completed')
+    stats = {pk: {'visit_count': 0, 'last_visit': None, 'next_appointment': None, 'lifetime_spend': Decimal(0)}
+             for pk in customer_ids}
+    for model in (Appointment, ArchivedAppointment):
+        rows = (
+            model.objects.filter(customer_id__in=customer_ids)
+            .values('customer_id')
+            .annotate(
+                visits=Count('pk', filter=completed),
+                last=Max('appointment_date', filter=completed),
+                next=Min('appointment_date', filter=Q(status__in=UPCOMING_STATUSES, appointment_date__gte=now)),
+                spend=Sum('price', filter=completed),
+            )
+            .order_by()
+        )
+        for row in rows:
+            entry = stats[row['customer_id']]
+            entry['visit_count'] += row['visits']
+            entry['lifetime_spend'] += row['spend'] or 0
+            if row['last'] and (entry['last_visit'] is None or row['last'] > entry['last_visit']):
+                entry['last_visit'] = row['last']
+            if row['next'] and (entry['next_appointment'] is None or row['next'] < entry['next_appointment']):
+                entry['next_appointment'] = row['next']
+    return stats
+
+
+def refresh(customer_ids):
+    """Recalcule et enregistre les statistiques ; retourne le nombre de clients modifiés"""
+    customer_ids = [pk for pk in set(customer_ids) if pk is not None]
+    if not customer_ids:
+        return 0
+    stats = compute(customer_ids)
+    changed = []
+    for customer in Customer.all_objects.filter(pk__in=customer_ids).only('pk', 'organization_id', *STAT_FIELDS):
+        values = stats[customer.pk]
+        if any(getattr(customer, field) != values[field] for field in STAT_FIELDS):
+            for field in STAT_FIELDS:
+                setattr(customer, field, values[field])
+            changed.append(customer)
+    Customer.all_objects.bulk_update(changed, STAT_FIELDS, batch_size=500)
+    # bulk_update ne déclenche pas post_save
+    for organization_id in {customer.organization_id for customer in changed}:
+        bump_data_version(organization_id)
+    return len(changed)
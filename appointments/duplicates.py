@@ -0,0 +1,225 @@
+"""
+Détection et fusion des clients en double.
+
+Comparer chaque client à tous les autres est quadratique : les clients sont
+d'abord répartis en blocs selon des clés simples (téléphone normalisé, code
+phonétique du nom, partie locale de l'email) et seules les paires d'un même
+bloc sont comparées puis notées. Les blocs trop gros (nom très courant,
+numéro de standard) sont ignorés : ``DUPLICATE_MAX_BLOCK``.
+
+Chaque client est normalisé une seule fois ; la similarité des noms
+(``SequenceMatcher``) n'est calculée que pour les paires qui peuvent encore
+atteindre ``DUPLICATE_MIN_SCORE``, après les bornes rapides
+``real_quick_ratio()``/``quick_ratio()``. La recherche tourne dans le worker
+(``scan_duplicates``) : la page lit les paires stockées dans ``DuplicateScan``.
+
+La fusion rattache tous les rendez-vous des doublons au client conservé en
+un seul UPDATE par table, puis supprime logiquement les doublons.
+"""
+import unicodedata
+from collections import defaultdict
+from datetime import timedelta
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import customer_stats
+from .cache_versions import bump_data_version
+from .models import Appointment, ArchivedAppointment, Customer, DuplicateScan, WaitlistEntry
+from .tasks import defer, task
+
+# Poids de chaque indice dans le score (plafonné à 1)
+PHONE_WEIGHT = 0.4
+EMAIL_WEIGHT = 0.3
+NAME_WEIGHT = 0.5
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'), 'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def normalize_name(value):
+    """Minuscules, sans accents ni caractères autres que des lettres"""
+    value = unicodedata.normalize('NFKD', value or '').encode('ascii', 'ignore').decode()
+    return ''.join(c for c in value.lower() if c.isalpha() or c == ' ').strip()
+
+
+def normalize_phone(value):
+    """Chiffres seuls ; les 8 derniers, pour ignorer l'indicatif pays"""
+    digits = ''.join(c for c in value or '' if c.isdigit())
+    return digits[-8:] if len(digits) >= 6 else ''
+
+
+def email_local_part(value):
+    """Partie locale de l'email, sans points ni suffixe « +... »"""
+    local = (value or '').lower().split('@')[0].split('+')[0]
+    return local.replace('.', '').replace('-', '').replace('_', '')
+
+
+def soundex(name):
+    """Code phonétique Soundex (lettre initiale + 3 chiffres) d'un nom normalisé (``normalize_name()``)"""
+    letters = name.replace(' ', '')
+    if not letters:
+        return ''
+    code = letters[0]
+    previous = _SOUNDEX_CODES.get(letters[0])
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES.get(c)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def normalize(first_name, last_name, email, phone):
+    """Champs comparés d'un client, normalisés une seule fois : ``(prénom, nom, email, téléphone)``"""
+    return normalize_name(first_name), normalize_name(last_name), email_local_part(email), normalize_phone(phone)
+
+
+def _blocking_keys(first_name, last_name, email, phone):
+    """Clés de blocage d'un client normalisé (``normalize()``)"""
+    keys = []
+    if phone:
+        keys.append(('phone', phone))
+    if len(email) >= 4:
+        keys.append(('email', email))
+    names = sorted(filter(None, (soundex(first_name), soundex(last_name))))
+    if names:
+        # Trié : prénom et nom inversés tombent dans le même bloc
+        keys.append(('name', tuple(names)))
+    return keys
+
+
+def _name_similarity(name, others, floor):
+    """Meilleur ratio entre ``name`` et ``others``, ou 0 s'il est sous ``floor``.
+
+    Les bornes supérieures ``real_quick_ratio()`` (longueurs) puis
+    ``quick_ratio()`` (lettres communes) écartent la plupart des paires avant
+    le calcul complet de ``ratio()``.
+    """
+    best = 0.0
+    for other in others:
+        matcher = SequenceMatcher(None, name, other)
+        if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+            continue
+        best = max(best, matcher.ratio())
+    return best if best >= floor else 0.0
+
+
+def score(a, b, min_score=0.0):
+    """Score (0 à 1) et raisons d'une paire de clients normalisés (``normalize()``).
+
+    Retourne None si la paire ne peut pas atteindre ``min_score`` : la
+    similarité des noms n'est calculée que si elle peut encore y suffire.
+    """
+    reasons = []
+    total = 0.0
+    if a[3] and a[3] == b[3]:
+        total += PHONE_WEIGHT
+        reasons.append('téléphone')
+    if a[2] and a[2] == b[2]:
+        total += EMAIL_WEIGHT
+        reasons.append('email')
+    # Similarité minimale utile : 0,5, ou ce qui manque pour atteindre min_score
+    floor = max(0.5, (min_score - total) / NAME_WEIGHT - 1e-9)
+    if floor <= 1:
+        similarity = _name_similarity(f'{a[0]} {a[1]}', (f'{b[0]} {b[1]}', f'{b[1]} {b[0]}'), floor)
+        if similarity:
+            total += NAME_WEIGHT * similarity
+            reasons.append('nom identique' if similarity == 1 else 'nom proche')
+    if total < min_score:
+        return None
+    return min(total, 1.0), reasons
+
+
+def find_pairs(rows, min_score):
+    """Paires probables ``(score, id_a, id_b, raisons)`` de ``rows`` (``{id: (prénom, nom, email, téléphone)}``)"""
+    rows = {pk: normalize(*fields) for pk, fields in rows.items()}
+    blocks = defaultdict(list)
+    for pk, fields in rows.items():
+        for key in _blocking_keys(*fields):
+            blocks[key].append(pk)
+
+    candidates = set()
+    for members in blocks.values():
+        if 1 < len(members) <= settings.DUPLICATE_MAX_BLOCK:
+            candidates.update(combinations(sorted(members), 2))
+
+    pairs = []
+    for a, b in candidates:
+        result = score(rows[a], rows[b], min_score)
+        if result is not None:
+            pairs.append((result[0], a, b, result[1]))
+    pairs.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+    return pairs
+
+
+def find_duplicates(organization, min_score=None):
+    """Paires probables ``(score, id_a, id_b, raisons)`` des clients de l'organisation, meilleures d'abord"""
+    if min_score is None:
+        min_score = settings.DUPLICATE_MIN_SCORE
+    rows = {
+        pk: fields for pk, *fields in Customer.objects.filter(organization=organization)
+        .values_list('pk', 'first_name', 'last_name', 'email', 'phone')
+        .order_by().iterator(chunk_size=5000)
+    }
+    return find_pairs(rows, min_score)
+
+
+@task(priority=-5, concurrency=1, timeout=15 * 60)
+def scan_duplicates(organization_id):
+    """Recherche les doublons d'une organisation et stocke les meilleures paires"""
+    DuplicateScan.objects.filter(organization_id=organization_id).update(started_at=timezone.now())
+    pairs = find_duplicates(organization_id)[:settings.DUPLICATE_STORED_PAIRS]
+    DuplicateScan.objects.filter(organization_id=organization_id).update(pairs=pairs, finished_at=timezone.now())
+
+
+def current_scan(organization, refresh=False):
+    """Dernière recherche de l'organisation. Une nouvelle est demandée au
+    worker s'il n'y en a pas encore, si ``refresh`` ou si la dernière date de
+    plus de ``DUPLICATE_SCAN_MAX_AGE`` secondes."""
+    now = timezone.now()
+    scan, created = DuplicateScan.objects.get_or_create(organization=organization, defaults={'requested_at': now})
+    stale = (not scan.is_pending
+             and scan.finished_at < now - timedelta(seconds=settings.DUPLICATE_SCAN_MAX_AGE))
+    if created or ((refresh or stale) and not scan.is_queued):
+        if not created:
+            scan.requested_at = now
+            scan.save(update_fields=['requested_at'])
+        defer(scan_duplicates, scan.organization_id)
+    return scan
+
+
+def merge(target, duplicates):
+    """Fusionne les doublons dans ``target`` ; retourne le nombre de rendez-vous rattachés"""
+    from .purge import purge_deleted
+
+    duplicates = [customer for customer in duplicates if customer.pk != target.pk]
+    ids = [customer.pk for customer in duplicates]
+    if not ids:
+        return 0
+    with transaction.atomic():
+        moved = Appointment.all_objects.filter(customer_id__in=ids).update(customer=target)
+        moved += ArchivedAppointment.all_objects.filter(customer_id__in=ids).update(customer=target)
+        # Les inscriptions en liste d'attente suivent le client (sinon supprimées par la purge)
+        WaitlistEntry.objects.filter(customer_id__in=ids).update(customer=target)
+        # Les coordonnées manquantes sont reprises des doublons
+        for field in ('phone', 'address'):
+            if not getattr(target, field):
+                setattr(target, field, next(
+                    (getattr(customer, field) for customer in duplicates if getattr(customer, field)), None
+                ))
+        target.save()
+        Customer.objects.filter(pk__in=ids).update(deleted_at=timezone.now())
+    # update() ne déclenche pas les signaux des rendez-vous
+    customer_stats.refresh([target.pk])
+    bump_data_version(target.organization_id)
+    defer(purge_deleted)
+    return moved
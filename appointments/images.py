@@ -0,0 +1,121 @@
+"""
+Traitement des photos de profil (Staff.photo).
+
+La validation se fait pendant la requête ; la réécriture de l'original sans
+métadonnées et la génération des miniatures WebP/JPEG sont différées
+(``defer(process_avatar, staff.pk)``, voir tasks.py).
+"""
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .cache_versions import bump_data_version
+from .tenancy import organization_ids
+from .tasks import task
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+# Côté maximal de l'original conservé après nettoyage
+ORIGINAL_MAX_SIDE = 1024
+
+
+def validate_avatar(uploaded_file):
+    """Vérifie qu'un fichier envoyé est une image exploitable"""
+    # Pillow est importé à la demande : il alourdit le démarrage des workers
+    from PIL import Image, UnidentifiedImageError
+
+    if uploaded_file.size > settings.MAX_UPLOAD_SIZE:
+        raise ValidationError('La photo dépasse la taille maximale autorisée.')
+    try:
+        with Image.open(uploaded_file) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ValidationError('Format de photo non pris en charge (JPG, PNG, WebP ou GIF).')
+            width, height = image.size
+            if width * height > settings.AVATAR_MAX_PIXELS:
+                raise ValidationError('La photo est trop grande.')
+            image.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValidationError('Le fichier envoyé n\'est pas une image valide.')
+    finally:
+        uploaded_file.seek(0)
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=80, method=4)
+    else:
+        image.save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _delete_variants(variants):
+    for formats in variants.values():
+        for name in formats.values():
+            if default_storage.exists(name):
+                default_storage.delete(name)
+
+
+@task(priority=5, max_attempts=3, timeout=120, concurrency=2)
+def process_avatar(staff_id):
+    """Nettoie la photo d'un membre du personnel et génère ses miniatures"""
+    from PIL import Image, ImageOps
+
+    from .models import Staff
+
+    staff = Staff.objects.filter(pk=staff_id).first()
+    if staff is None:
+        return
+    previous = staff.photo_thumbnails or {}
+    photo_name = staff.photo.name if staff.photo else ''
+
+    if not photo_name:
+        _delete_variants(previous)
+        Staff.objects.filter(pk=staff_id, photo__in=['', None]).update(photo_thumbnails={})
+        return
+
+    with staff.photo.open('rb') as f:
+        source = Image.open(f)
+        source.load()
+    # Applique l'orientation EXIF puis repart d'une image sans métadonnées
+    image = ImageOps.exif_transpose(source).convert('RGB')
+    image = Image.frombytes('RGB', image.size, image.tobytes())
+
+    # Original réécrit sans EXIF/GPS et borné en taille
+    original = image.copy()
+    original.thumbnail((ORIGINAL_MAX_SIDE, ORIGINAL_MAX_SIDE))
+    cleaned_name = default_storage.save(
+        f'avatars/{staff_id}-{os.path.splitext(os.path.basename(photo_name))[0]}.jpg',
+        ContentFile(_encode(original, 'jpeg')),
+    )
+
+    digest = hashlib.md5(cleaned_name.encode('utf-8')).hexdigest()[:8]
+    variants = {}
+    for size_name, side in settings.AVATAR_SIZES.items():
+        thumb = ImageOps.fit(image, (side, side), Image.LANCZOS)
+        variants[size_name] = {}
+        for fmt, ext in (('webp', 'webp'), ('jpeg', 'jpg')):
+            name = default_storage.save(
+                f'avatars/thumbs/{staff_id}-{digest}-{size_name}.{ext}',
+                ContentFile(_encode(thumb, fmt)),
+            )
+            variants[size_name][fmt] = name
+
+    # N'enregistre que si la photo n'a pas changé entre-temps
+    updated = Staff.objects.filter(pk=staff_id, photo=photo_name).update(
+        photo=cleaned_name, photo_thumbnails=variants,
+    )
+    if updated:
+        if cleaned_name != photo_name:
+            default_storage.delete(photo_name)
+        _delete_variants(previous)
+        for organization_id in organization_ids(staff.user_id):
+            bump_data_version(organization_id)
+    else:
+        default_storage.delete(cleaned_name)
+        _delete_variants(variants)
+
@@ -0,0 +1,70 @@
+"""
+Environnement Jinja2 des pages à fort volume (calendrier, rendez-vous, clients).
+
+Ces pages bouclent sur des centaines de lignes ; Jinja2 compile les gabarits
+en code Python et les rend plusieurs fois plus vite que le moteur Django.
+Les gabarits portés vivent dans ``appointments/jinja2/`` et reprennent la mise
+en page de ``base.html``. Le moteur utilisé est choisi par
+``HOT_TEMPLATES_ENGINE`` (``'jinja2'`` ou ``'django'``), voir ``render_hot``.
+
+Les filtres reprennent ceux de Django (dates localisées dans le fuseau
+courant, ``floatformat``, ``pluralize``, ``urlencode``) pour un rendu identique.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.shortcuts import render
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import timezone
+from jinja2 import Environment
+
+from .templatetags.assets import app_stylesheet
+from .templatetags.avatars import avatar_img
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+# Identifiant factice reconnu par les convertisseurs <int:...>
+URL_MARKER = 987654321
+
+
+def url_builder(name):
+    """``reverse()`` une seule fois pour les liens répétés à chaque ligne :
+    retourne ``build(pk)``, qui remplace l'identifiant dans l'URL obtenue"""
+    prefix, _, suffix = reverse(name, args=[URL_MARKER]).rpartition(str(URL_MARKER))
+    return lambda pk: f'{prefix}{pk}{suffix}'
+
+
+def date(value, arg=None):
+    """Filtre ``date`` de Django, dans le fuseau courant comme dans ses gabarits"""
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return defaultfilters.date(value, arg)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'url': url,
+        'url_builder': url_builder,
+        'static': static,
+        'now': timezone.now,
+        'app_stylesheet': app_stylesheet,
+        'avatar_img': avatar_img,
+    })
+    env.filters.update({
+        'date': date,
+        'floatformat': defaultfilters.floatformat,
+        'pluralize': defaultfilters.pluralize,
+        'urlencode': defaultfilters.urlencode,
+    })
+    return env
+
+
+def render_hot(request, template_name, context):
+    """Rend une page à fort volume avec le moteur choisi par ``HOT_TEMPLATES_ENGINE``"""
+    return render(request, template_name, context, using=settings.HOT_TEMPLATES_ENGINE)
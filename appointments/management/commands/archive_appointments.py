@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appointments.archive import archive_batch, archive_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Déplace les rendez-vous terminés, annulés ou absents de plus d\'un an vers l\'archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+                            help='Rendez-vous déplacés par transaction')
+        parser.add_argument('--pause', type=float, default=settings.PURGE_BATCH_PAUSE,
+                            help='Pause entre deux lots (secondes)')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff()
+        total = 0
+        while True:
+            moved = archive_batch(cutoff, options['batch_size'])
+            total += moved
+            if moved < options['batch_size']:
+                break
+            self.stdout.write(f'{total} rendez-vous archivés...')
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} rendez-vous antérieurs au {cutoff:%d/%m/%Y} archivés'
+        ))
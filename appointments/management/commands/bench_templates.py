@@ -0,0 +1,106 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import engines
+from django.test import RequestFactory
+from django.urls import resolve
+from django.utils import timezone
+
+from appointments.models import Appointment, Customer, Service
+
+STATUSES = [status for status, _ in Appointment.STATUS_CHOICES]
+
+
+def sample_rows(rows):
+    """Clients et rendez-vous en mémoire (aucune écriture en base)"""
+    now = timezone.now()
+    services = [
+        Service(pk=i + 1, name=f'Service {i + 1}', duration=timedelta(minutes=30 + 15 * i), price=Decimal('45.00'))
+        for i in range(5)
+    ]
+    customers = [
+        Customer(pk=i + 1, first_name=f'Prénom{i}', last_name=f"D'Nom{i}", email=f'client{i}@example.com',
+                 phone='06 12 34 56 78' if i % 3 else None, visit_count=i % 7,
+                 lifetime_spend=Decimal(i % 400), last_visit=now - timedelta(days=i % 90),
+                 next_appointment=now + timedelta(days=i % 30) if i % 2 else None, created_at=now)
+        for i in range(rows)
+    ]
+    appointments = [
+        Appointment(pk=i + 1, customer=customers[i], service=services[i % len(services)],
+                    appointment_date=now + timedelta(minutes=37 * i), duration=services[i % len(services)].duration,
+                    status=STATUSES[i % len(STATUSES)], notes='Note' if i % 4 == 0 else '')
+        for i in range(rows)
+    ]
+    return services, customers, appointments
+
+
+def contexts(rows):
+    """``(gabarit, chemin, contexte)`` des pages à fort volume pour ``rows`` lignes"""
+    services, customers, appointments = sample_rows(rows)
+    now = timezone.localtime()
+    by_date = {}
+    for appointment in appointments:
+        by_date.setdefault(timezone.localtime(appointment.appointment_date).date(), []).append(appointment)
+    days = sorted(by_date)
+    page = Paginator(customers, rows).get_page(1)
+    return [
+        ('appointments/calendar.html', '/calendar/', {
+            'mode': 'month', 'ref_date': now.date(),
+            'days_data': [{'date': day, 'appointments': by_date[day]} for day in days],
+            'current_month_label': now.strftime('%B %Y'), 'current_year': now.year,
+            'current_month': now.strftime('%B'), 'prev_date': '', 'next_date': '',
+            'today_date': now.strftime('%Y-%m-%d'),
+        }),
+        ('appointments/appointments.html', '/appointments/', {
+            'appointments': appointments, 'status_choices': Appointment.STATUS_CHOICES, 'services': services,
+        }),
+        ('appointments/customers.html', '/customers/', {
+            'customers': page, 'page': page, 'sort': 'name', 'segment': '', 'query_string': '',
+        }),
+    ]
+
+
+def render_ms(engine, name, request, context, repeat):
+    """Meilleur temps de rendu (ms) sur ``repeat`` rendus, gabarit déjà compilé"""
+    template = engines[engine].get_template(name)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        template.render(context, request)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = 'Compare le temps de rendu des pages à fort volume avec les moteurs Django et Jinja2'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[500, 5000], help='Nombres de lignes rendues')
+        parser.add_argument('--repeat', type=int, default=5, help='Rendus par mesure (le plus rapide est gardé)')
+        parser.add_argument('--output', help='Écrit le rapport dans ce fichier (ex. benchmarks/templates.txt)')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        user = get_user_model()(username='bench', first_name='Bench')
+        lines = [f"{'gabarit':<32} {'lignes':>6} {'django':>10} {'jinja2':>10} {'gain':>6}"]
+        for rows in options['rows']:
+            for name, path, context in contexts(rows):
+                request = factory.get(path)
+                request.user = user
+                request.resolver_match = resolve(path)
+                django_ms = render_ms('django', name, request, context, options['repeat'])
+                jinja2_ms = render_ms('jinja2', name, request, context, options['repeat'])
+                lines.append(
+                    f'{name.split("/")[-1]:<32} {rows:>6} {django_ms:>8.1f}ms {jinja2_ms:>8.1f}ms '
+                    f'{django_ms / jinja2_ms:>5.1f}x'
+                )
+        text = '\n'.join(lines) + '\n'
+        self.stdout.write(text)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(text)
@@ -0,0 +1,126 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+from zipfile import ZipFile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Gabarits Django et Jinja2, comme le « content » de tailwind.config.js
+TEMPLATE_DIRS = (os.path.join(APP_DIR, 'templates'), os.path.join(APP_DIR, 'jinja2'))
+STATIC_DIR = os.path.join(APP_DIR, 'static', 'appointments')
+CSS_OUTPUT = os.path.join(STATIC_DIR, 'css', 'app.css')
+ICONS_OUTPUT = os.path.join(STATIC_DIR, 'js', 'icons.js')
+
+ICON_RE = re.compile(r'data-lucide="([a-z0-9-]+)"')
+
+# Anciens noms lucide encore utilisés dans les templates -> nom actuel
+ICON_ALIASES = {
+    'alert-circle': 'circle-alert',
+    'alert-triangle': 'triangle-alert',
+    'check-circle': 'circle-check-big',
+    'edit': 'square-pen',
+    'loader-2': 'loader-circle',
+}
+
+ICONS_RUNTIME = """(function () {
+    var icons = %s;
+    function createIcons() {
+        document.querySelectorAll('i[data-lucide]').forEach(function (el) {
+            var name = el.getAttribute('data-lucide');
+            var svg = icons[name];
+            if (!svg) {
+                return;
+            }
+            var tpl = document.createElement('template');
+            tpl.innerHTML = svg;
+            var node = tpl.content.firstChild;
+            Array.prototype.forEach.call(el.attributes, function (attr) {
+                if (attr.name !== 'class') {
+                    node.setAttribute(attr.name, attr.value);
+                }
+            });
+            node.setAttribute('class', ('lucide lucide-' + name + ' ' + (el.getAttribute('class') || '')).trim());
+            el.parentNode.replaceChild(node, el);
+        });
+    }
+    window.lucide = {icons: icons, createIcons: createIcons};
+})();
+"""
+
+
+class Command(BaseCommand):
+    help = 'Génère la feuille de style Tailwind purgée et le sous-ensemble d\'icônes lucide'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-css', action='store_true', help='Ne pas recompiler la feuille de style')
+        parser.add_argument('--skip-icons', action='store_true', help='Ne pas régénérer les icônes')
+
+    def handle(self, *args, **options):
+        if not options['skip_icons']:
+            self.build_icons()
+        if not options['skip_css']:
+            self.build_css()
+        self.stdout.write(self.style.SUCCESS(
+            'Assets générés. Lancer « python manage.py collectstatic » pour les versions hachées et compressées.'
+        ))
+
+    def build_css(self):
+        cli = shutil.which(settings.TAILWIND_CLI) or settings.TAILWIND_CLI
+        if not os.path.exists(cli):
+            raise CommandError(
+                f'Exécutable Tailwind introuvable ({settings.TAILWIND_CLI}). Télécharger le binaire '
+                'autonome tailwindcss v3.4 et renseigner TAILWIND_CLI, ou utiliser --skip-css.'
+            )
+        os.makedirs(os.path.dirname(CSS_OUTPUT), exist_ok=True)
+        subprocess.run([
+            cli,
+            '-c', os.path.join(settings.BASE_DIR, 'tailwind.config.js'),
+            '-i', os.path.join(settings.BASE_DIR, 'assets', 'tailwind.css'),
+            '-o', CSS_OUTPUT,
+            '--minify',
+        ], cwd=settings.BASE_DIR, check=True)
+        self.stdout.write(f'CSS : {os.path.relpath(CSS_OUTPUT, settings.BASE_DIR)} '
+                          f'({os.path.getsize(CSS_OUTPUT) // 1024} Ko)')
+
+    def used_icons(self):
+        names = set()
+        for templates_dir in TEMPLATE_DIRS:
+            for root, _, files in os.walk(templates_dir):
+                for filename in files:
+                    if filename.endswith('.html'):
+                        with open(os.path.join(root, filename), encoding='utf-8') as f:
+                            names.update(ICON_RE.findall(f.read()))
+        return sorted(names)
+
+    def build_icons(self):
+        try:
+            import lucide
+        except ImportError:
+            raise CommandError('Le paquet « lucide » (requirements.txt) est requis pour générer les icônes.')
+
+        archive = os.path.join(os.path.dirname(lucide.__file__), 'lucide.zip')
+        icons = {}
+        missing = []
+        with ZipFile(archive) as zip_file:
+            available = set(zip_file.namelist())
+            for name in self.used_icons():
+                filename = ICON_ALIASES.get(name, name) + '.svg'
+                if filename not in available:
+                    missing.append(name)
+                    continue
+                svg = zip_file.read(filename).decode('utf-8')
+                svg = svg.replace(' xmlns="http://www.w3.org/2000/svg"', '')
+                icons[name] = re.sub(r'\s+', ' ', svg).replace('> <', '><').replace(' />', '/>').replace(' >', '>').strip()
+        if missing:
+            raise CommandError(f"Icônes inconnues : {', '.join(missing)} (compléter ICON_ALIASES)")
+
+        os.makedirs(os.path.dirname(ICONS_OUTPUT), exist_ok=True)
+        with open(ICONS_OUTPUT, 'w', encoding='utf-8') as f:
+            f.write(f'/* Généré par « python manage.py build_assets » - ne pas modifier. {len(icons)} icônes lucide. */\n')
+            f.write(ICONS_RUNTIME % json.dumps(icons, separators=(',', ':'), sort_keys=True))
+        self.stdout.write(f'Icônes : {len(icons)} -> {os.path.relpath(ICONS_OUTPUT, settings.BASE_DIR)} '
+                          f'({os.path.getsize(ICONS_OUTPUT) // 1024} Ko)')
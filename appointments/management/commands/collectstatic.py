@@ -0,0 +1,18 @@
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+from django.core.management import call_command
+
+
+class Command(CollectStaticCommand):
+    """« collectstatic » précédé de « build_assets » : la feuille de style
+    compilée fait toujours partie des fichiers collectés"""
+    help = CollectStaticCommand.help + ' Génère d\'abord les assets (build_assets).'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--skip-build', action='store_true',
+                            help='Collecter les assets déjà générés sans relancer build_assets')
+
+    def handle(self, **options):
+        if not options['skip_build'] and not options['dry_run']:
+            call_command('build_assets', stdout=self.stdout, stderr=self.stderr)
+        return super().handle(**options)
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from appointments.models import Customer, Service, Appointment, BusinessHours, Staff
+from appointments.tenancy import organization_for
 from datetime import datetime, timedelta
 import random
 
@@ -26,6 +27,7 @@ class Command(BaseCommand):
 
         # Créer des services
         admin_user = User.objects.get(username='admin')
+        organization = organization_for(admin_user)
         services_data = [
             {'name': 'Consultation générale', 'duration': timedelta(minutes=30), 'price': 5000},
             {'name': 'Consultation spécialisée', 'duration': timedelta(minutes=45), 'price': 8000},
@@ -37,6 +39,7 @@ class Command(BaseCommand):
         for service_data in services_data:
             service, created = Service.objects.get_or_create(
                 name=service_data['name'],
+                organization=organization,
                 defaults={
                     'description': f"Service de {service_data['name'].lower()}",
                     'duration': service_data['duration'],
@@ -62,6 +65,7 @@ class Command(BaseCommand):
         for customer_data in customers_data:
             customer, created = Customer.objects.get_or_create(
                 email=customer_data['email'],
+                organization=organization,
                 defaults={
                     **customer_data,
                     'created_by': admin_user
@@ -92,8 +96,10 @@ class Command(BaseCommand):
                 service=service,
                 appointment_date=appointment_time,
                 duration=service.duration,
+                price=service.price,
                 status=status,
                 notes=f"Rendez-vous de {service.name} pour {customer.full_name}",
+                organization=organization,
                 created_by=admin_user
             )
             
@@ -108,6 +114,7 @@ class Command(BaseCommand):
             is_open = i < 5  # Ouvert du lundi au vendredi
             BusinessHours.objects.get_or_create(
                 day=day,
+                organization=organization,
                 defaults={
                     'is_open': is_open,
                     'open_time': '09:00' if is_open else '09:00',
@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Démarrage d'un worker : application WSGI (réglages, applications,
+# middlewares) puis URLconf et vues, importés à la première requête
+STARTUP = (
+    "import appointme_project.wsgi\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+
+def measure():
+    """Lignes ``(module, self_us, cumulative_us, profondeur)`` de ``-X importtime``"""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'appointme_project.settings')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def report(rows, limit):
+    """Rapport texte : total, temps propre par paquet, modules les plus coûteux"""
+    total = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    packages = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split('.')[0]] += self_us
+
+    lines = [f'Total : {total / 1000:.1f} ms, {len(rows)} modules', '', 'Temps propre par paquet (ms)']
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:limit]:
+        lines.append(f'{self_us / 1000:9.1f}  {package}')
+    lines += ['', 'Modules, temps cumulé (ms)']
+    for name, _, cumulative, _ in sorted(rows, key=lambda row: -row[2])[:limit]:
+        lines.append(f'{cumulative / 1000:9.1f}  {name}')
+    return total, '\n'.join(lines) + '\n'
+
+
+def _baseline_total(path):
+    with open(path, encoding='utf-8') as f:
+        first = f.readline()
+    return float(first.split(':')[1].split('ms')[0]) * 1000
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps d'import au démarrage d'un worker (python -X importtime)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25, help='Lignes par section')
+        parser.add_argument('--runs', type=int, default=3, help='Mesures (la plus rapide est gardée)')
+        parser.add_argument('--output', help='Écrit le rapport dans ce fichier (ex. benchmarks/importtime.txt)')
+        parser.add_argument('--compare', help='Rapport de référence : échoue si le total dépasse la tolérance')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Hausse relative admise par rapport à la référence')
+
+    def handle(self, *args, **options):
+        # La plus rapide des mesures : les suivantes profitent du cache disque (.pyc, système)
+        runs = [measure() for _ in range(max(1, options['runs']))]
+        total, text = min((report(rows, options['limit']) for rows in runs), key=lambda item: item[0])
+        self.stdout.write(text)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(text)
+        if options['compare']:
+            baseline = _baseline_total(options['compare'])
+            if total > baseline * (1 + options['tolerance']):
+                raise CommandError(
+                    f"Démarrage plus lent : {total / 1000:.1f} ms contre {baseline / 1000:.1f} ms en référence"
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f"{total / 1000:.1f} ms (référence {baseline / 1000:.1f} ms)"
+            ))
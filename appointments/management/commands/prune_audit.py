@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from appointments import audit
+from appointments.models import AppointmentChange
+
+
+def cutoff_month(months):
+    """Premier mois (AAAAMM) conservé : le mois courant et les ``months - 1`` précédents"""
+    today = timezone.localdate()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return (index // 12) * 100 + index % 12 + 1
+
+
+def prune_month(month, batch_size, pause):
+    """Supprime un mois d'historique par lots, en suivant l'index (month, id)"""
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(AppointmentChange.objects.filter(month=month)
+                       .order_by('id').values_list('id', flat=True)[:batch_size])
+            deleted = AppointmentChange.objects.filter(id__in=ids).delete()[0] if ids else 0
+        total += deleted
+        if deleted < batch_size:
+            return total
+        time.sleep(pause)
+
+
+class Command(BaseCommand):
+    help = "Supprime l'historique des rendez-vous plus ancien que la rétention, mois par mois"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=settings.AUDIT_RETENTION_MONTHS,
+                            help='Mois conservés, mois courant compris')
+        parser.add_argument('--batch-size', type=int, default=settings.PURGE_BATCH_SIZE,
+                            help='Entrées supprimées par transaction')
+        parser.add_argument('--pause', type=float, default=settings.PURGE_BATCH_PAUSE,
+                            help='Pause entre deux lots (secondes)')
+
+    def handle(self, *args, **options):
+        audit.flush()
+        cutoff = cutoff_month(max(1, options['months']))
+        months = (AppointmentChange.objects.filter(month__lt=cutoff)
+                  .order_by('month').values_list('month', flat=True).distinct())
+        total = 0
+        for month in list(months):
+            deleted = prune_month(month, options['batch_size'], options['pause'])
+            total += deleted
+            self.stdout.write(f'{month // 100}-{month % 100:02d} : {deleted} entrées supprimées')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} entrées antérieures à {cutoff // 100}-{cutoff % 100:02d} supprimées'
+        ))
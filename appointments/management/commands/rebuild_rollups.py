@@ -0,0 +1,81 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from appointments.models import Appointment, ArchivedAppointment
+from appointments.rollups import rebuild_range
+
+
+def _rebuild_chunk(start, end):
+    # Chaque processus ouvre sa propre connexion
+    try:
+        return start, end, rebuild_range(start, end)
+    finally:
+        connections.close_all()
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Date invalide : {value} (format AAAA-MM-JJ)')
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les agrégats quotidiens des rendez-vous, par tranches en parallèle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=_parse_date, help='Premier jour (AAAA-MM-JJ), défaut : plus ancien rendez-vous')
+        parser.add_argument('--end', type=_parse_date, help='Dernier jour inclus, défaut : plus récent rendez-vous')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Nombre de jours par tranche')
+        parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                            help='Processus en parallèle (1 pour tout faire ici)')
+
+    def _bounds(self):
+        starts, ends = [], []
+        for model in (Appointment, ArchivedAppointment):
+            bounds = model.objects.aggregate(start=Min('appointment_date'), end=Max('appointment_date'))
+            if bounds['start']:
+                starts.append(timezone.localdate(bounds['start']))
+                ends.append(timezone.localdate(bounds['end']))
+        return (min(starts), max(ends)) if starts else (None, None)
+
+    def handle(self, *args, **options):
+        first, last = self._bounds()
+        start = options['start'] or first
+        end = options['end'] or last
+        if start is None:
+            self.stdout.write('Aucun rendez-vous : rien à recalculer')
+            return
+        if start > end:
+            raise CommandError('--start doit précéder --end')
+
+        chunks = []
+        cursor = start
+        while cursor <= end:
+            chunk_end = min(cursor + timedelta(days=options['chunk_days'] - 1), end)
+            chunks.append((cursor, chunk_end))
+            cursor = chunk_end + timedelta(days=1)
+
+        total = 0
+        if options['workers'] <= 1:
+            for chunk_start, chunk_end in chunks:
+                total += rebuild_range(chunk_start, chunk_end)
+        else:
+            # Les connexions héritées ne doivent pas être partagées avec les processus fils
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as executor:
+                futures = [executor.submit(_rebuild_chunk, s, e) for s, e in chunks]
+                for future in as_completed(futures):
+                    chunk_start, chunk_end, rows = future.result()
+                    total += rows
+                    self.stdout.write(f'{chunk_start} → {chunk_end} : {rows} ligne(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} agrégat(s) recalculé(s) du {start:%d/%m/%Y} au {end:%d/%m/%Y} ({len(chunks)} tranche(s))'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from appointments.customer_stats import refresh
+from appointments.models import Customer
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les statistiques dénormalisées des clients (visites, prochain rendez-vous...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-only', action='store_true',
+                            help='Seulement les clients dont le prochain rendez-vous est passé')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Clients recalculés par lot')
+
+    def handle(self, *args, **options):
+        customers = Customer.objects.order_by('pk')
+        if options['stale_only']:
+            customers = customers.filter(next_appointment__lt=timezone.now())
+        batch_size = options['batch_size']
+        last_pk = 0
+        checked = changed = 0
+        while True:
+            ids = list(customers.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            changed += refresh(ids)
+            checked += len(ids)
+            last_pk = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f'{checked} client(s) vérifié(s), {changed} corrigé(s)'))
@@ -0,0 +1,67 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+
+from appointments import tasks
+
+
+class Command(BaseCommand):
+    help = 'Exécute les tâches différées (file stockée en base)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help='File à traiter (répétable, « default » par défaut)')
+        parser.add_argument('--threads', type=int, default=1, help='Nombre de tâches exécutées en parallèle')
+        parser.add_argument('--sleep', type=float, default=settings.TASK_POLL_INTERVAL,
+                            help='Attente en secondes quand la file est vide')
+        parser.add_argument('--burst', action='store_true', help='S\'arrête dès que la file est vide')
+
+    def handle(self, *args, **options):
+        queues = options['queues'] or ['default']
+        self.stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.stop.set())
+
+        purged = tasks.purge_finished()
+        if purged:
+            self.stdout.write(f'{purged} tâche(s) terminée(s) supprimée(s)')
+
+        threads = [
+            threading.Thread(target=self.work, args=(tasks.worker_id(f':{i}'), queues, options), daemon=True)
+            for i in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f'Worker démarré ({len(threads)} thread(s), files : {", ".join(queues)})')
+        # Le thread principal reste disponible pour les signaux
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+        self.stdout.write(self.style.SUCCESS('Worker arrêté'))
+
+    def work(self, worker, queues, options):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    task_obj = tasks.claim(worker, queues)
+                except OperationalError:
+                    # Base verrouillée par un autre écrivain (SQLite) : on réessaie plus tard
+                    task_obj = None
+                if task_obj is None:
+                    if options['burst']:
+                        return
+                    self.stop.wait(options['sleep'])
+                    continue
+                start = time.perf_counter()
+                ok = tasks.run(task_obj, worker)
+                self.stdout.write(
+                    f'[{worker}] {task_obj.name}#{task_obj.pk} '
+                    f'{"ok" if ok else "échec"} en {time.perf_counter() - start:.2f}s'
+                )
+        finally:
+            connection.close()
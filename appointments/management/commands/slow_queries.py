@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from appointments.slow_queries import normalize, read_entries
+
+
+class Command(BaseCommand):
+    help = 'Résume le journal des requêtes lentes par forme de requête'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10, help='Nombre de formes à afficher')
+        parser.add_argument('--sort', choices=['total', 'max', 'count'], default='total',
+                            help='Critère de tri (temps cumulé, pire temps, occurrences)')
+        parser.add_argument('--log', help='Chemin du journal (SLOW_QUERY_LOG par défaut)')
+
+    def handle(self, *args, **options):
+        shapes = {}
+        for entry in read_entries(options['log']):
+            shape = normalize(entry['sql'])
+            stats = shapes.setdefault(shape, {
+                'count': 0, 'total': 0.0, 'max': 0.0, 'views': set(), 'callers': set(), 'plan': [],
+            })
+            stats['count'] += 1
+            stats['total'] += entry['duration_ms']
+            if entry['duration_ms'] >= stats['max']:
+                stats['max'] = entry['duration_ms']
+                stats['plan'] = entry.get('plan') or []
+            if entry.get('view'):
+                stats['views'].add(entry['view'])
+            if entry.get('caller'):
+                stats['callers'].add(entry['caller'])
+
+        if not shapes:
+            self.stdout.write('Aucune requête lente enregistrée.')
+            return
+
+        ranked = sorted(shapes.items(), key=lambda item: item[1][options['sort']], reverse=True)
+        for rank, (shape, stats) in enumerate(ranked[:options['limit']], start=1):
+            self.stdout.write(self.style.WARNING(
+                f"#{rank} {stats['count']} fois, total {stats['total']:.0f} ms, "
+                f"max {stats['max']:.0f} ms, moyenne {stats['total'] / stats['count']:.0f} ms"
+            ))
+            self.stdout.write(f'  {shape}')
+            if stats['views']:
+                self.stdout.write(f"  Vues : {', '.join(sorted(stats['views']))}")
+            for caller in sorted(stats['callers']):
+                self.stdout.write(f'  Appel : {caller}')
+            for line in stats['plan']:
+                self.stdout.write(f'  Plan : {line}')
+                if line.startswith('SCAN '):
+                    self.stdout.write(self.style.ERROR('    -> parcours complet de table'))
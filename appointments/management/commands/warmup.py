@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from appointments.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = 'Préchauffe le processus (URLs, gabarits, traductions, connexions, caches) et affiche les durées'
+
+    def handle(self, *args, **options):
+        total = 0.0
+        for name, count, seconds in warm_up():
+            total += seconds
+            self.stdout.write(f'{name:<12} {count:>5}  {seconds * 1000:8.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Préchauffage terminé en {total * 1000:.1f} ms'))
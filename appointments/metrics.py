@@ -0,0 +1,308 @@
+"""
+Registre de métriques au format d'exposition texte Prometheus.
+
+Chaque processus (worker gunicorn/uwsgi, commande de gestion...) écrit ses
+compteurs dans son propre fichier mmap sous ``settings.METRICS_DIR``. La vue
+``/metrics`` additionne tous les fichiers du répertoire, ce qui donne une
+vue agrégée correcte quel que soit le nombre de workers.
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_INITIAL_SIZE = 64 * 1024
+_HEADER = struct.Struct('i')
+_VALUE = struct.Struct('d')
+
+
+class MmapedValues:
+    """Dictionnaire clé -> float64 stocké dans un fichier mmap.
+
+    Format : un entier (octets utilisés) puis des entrées
+    ``[longueur clé][clé alignée sur 8 octets][valeur double]``.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(_INITIAL_SIZE)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        self._positions = {}
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0]
+        if self._used == 0:
+            self._used = 8
+            _HEADER.pack_into(self._mmap, 0, self._used)
+        else:
+            for key, _, pos in _iter_entries(self._mmap, self._used):
+                self._positions[key] = pos
+
+    def _init_key(self, key):
+        encoded = key.encode('utf-8')
+        padded = encoded + b' ' * (8 - (len(encoded) + _HEADER.size) % 8)
+        entry = _HEADER.pack(len(encoded)) + padded + _VALUE.pack(0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._mmap.close()
+            self._file.truncate(self._capacity)
+            self._mmap = mmap.mmap(self._file.fileno(), self._capacity)
+        self._mmap[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        _HEADER.pack_into(self._mmap, 0, self._used)
+        pos = self._used - _VALUE.size
+        self._positions[key] = pos
+        return pos
+
+    def inc(self, key, amount):
+        with self._lock:
+            pos = self._positions.get(key)
+            if pos is None:
+                pos = self._init_key(key)
+            value = _VALUE.unpack_from(self._mmap, pos)[0]
+            _VALUE.pack_into(self._mmap, pos, value + amount)
+
+
+def _iter_entries(data, used):
+    pos = 8
+    while pos < used:
+        length = _HEADER.unpack_from(data, pos)[0]
+        pos += _HEADER.size
+        key = bytes(data[pos:pos + length]).decode('utf-8')
+        pos += length + (8 - (length + _HEADER.size) % 8)
+        value = _VALUE.unpack_from(data, pos)[0]
+        yield key, value, pos
+        pos += _VALUE.size
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < 8:
+        return
+    used = _HEADER.unpack_from(data, 0)[0]
+    for key, value, _ in _iter_entries(data, used):
+        yield key, value
+
+
+class _ProcessStore:
+    """Ouvre paresseusement le fichier du processus courant (sûr après fork)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._values = None
+
+    def values(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    directory = settings.METRICS_DIR
+                    os.makedirs(directory, exist_ok=True)
+                    self._values = MmapedValues(os.path.join(directory, f'{pid}.db'))
+                    self._pid = pid
+        return self._values
+
+    def inc(self, key, amount=1.0):
+        self.values().inc(key, amount)
+
+
+_store = _ProcessStore()
+_metrics = {}
+_collectors = []
+
+
+def _key(name, labels):
+    return json.dumps([name, labels], sort_keys=True, separators=(',', ':'))
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _metrics[name] = self
+
+    def _labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'Labels attendus pour {self.name} : {self.labelnames}')
+        return {k: str(v) for k, v in labels.items()}
+
+
+class Counter(_Metric):
+    """Compteur monotone."""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        _store.inc(_key(self.name + '_total', self._labels(labels)), amount)
+
+
+class Histogram(_Metric):
+    """Histogramme à buckets fixes (les comptes sont cumulés à l'exposition)."""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        for bound in self.buckets:
+            if value <= bound:
+                le = repr(bound)
+                break
+        else:
+            le = '+Inf'
+        _store.inc(_key(self.name + '_bucket', dict(labels, le=le)))
+        _store.inc(_key(self.name + '_sum', labels), value)
+        _store.inc(_key(self.name + '_count', labels))
+
+
+def register_collector(func):
+    """Enregistre une fonction appelée à chaque collecte.
+
+    Elle retourne une liste de ``(nom, aide, type, [(labels, valeur), ...])``,
+    typiquement des jauges calculées depuis la base (profondeur de file...).
+    """
+    _collectors.append(func)
+    return func
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in sorted(labels.items()):
+        value = value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _aggregate():
+    """Additionne les fichiers de tous les processus."""
+    totals = {}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.db')):
+        try:
+            for key, value in _read_file(path):
+                totals[key] = totals.get(key, 0.0) + value
+        except (OSError, ValueError, struct.error):
+            # Fichier en cours de création par un autre worker
+            continue
+    samples = {}
+    for key, value in totals.items():
+        name, labels = json.loads(key)
+        samples.setdefault(name, []).append((labels, value))
+    return samples
+
+
+def _cumulate_buckets(metric, bucket_samples):
+    """Transforme les comptes par bucket en comptes cumulés ``le``."""
+    bounds = [repr(b) for b in metric.buckets] + ['+Inf']
+    series = {}
+    for labels, value in bucket_samples:
+        base = tuple(sorted((k, v) for k, v in labels.items() if k != 'le'))
+        series.setdefault(base, {})[labels['le']] = value
+    result = []
+    for base, counts in sorted(series.items()):
+        running = 0.0
+        for le in bounds:
+            running += counts.get(le, 0.0)
+            result.append((dict(base, le=le), running))
+    return result
+
+
+def generate_latest():
+    """Retourne le texte d'exposition de toutes les métriques."""
+    samples = _aggregate()
+    lines = []
+    for name in sorted(_metrics):
+        metric = _metrics[name]
+        exposed = name + '_total' if metric.type == 'counter' else name
+        lines.append(f'# HELP {exposed} {metric.documentation}')
+        lines.append(f'# TYPE {exposed} {metric.type}')
+        if metric.type == 'histogram':
+            series = [
+                (name + '_bucket', _cumulate_buckets(metric, samples.get(name + '_bucket', []))),
+                (name + '_sum', sorted(samples.get(name + '_sum', []), key=lambda s: sorted(s[0].items()))),
+                (name + '_count', sorted(samples.get(name + '_count', []), key=lambda s: sorted(s[0].items()))),
+            ]
+        else:
+            series = [(name + '_total', sorted(samples.get(name + '_total', []), key=lambda s: sorted(s[0].items())))]
+        for sample_name, values in series:
+            for labels, value in values:
+                lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+    for collector in _collectors:
+        for name, documentation, metric_type, values in collector():
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in values:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Métriques applicatives
+REQUEST_LATENCY = Histogram(
+    'appointme_request_duration_seconds',
+    'Durée des requêtes HTTP par nom d\'URL.',
+    ['view', 'method'],
+)
+DB_QUERIES = Counter(
+    'appointme_db_queries',
+    'Requêtes SQL exécutées par nom d\'URL.',
+    ['view'],
+)
+CACHE_REQUESTS = Counter(
+    'appointme_cache_requests',
+    'Accès aux caches applicatifs (result=hit|miss).',
+    ['cache', 'result'],
+)
+BOOKINGS_CREATED = Counter(
+    'appointme_bookings_created',
+    'Rendez-vous créés.',
+)
+TASKS_PROCESSED = Counter(
+    'appointme_tasks_processed',
+    'Tâches différées exécutées (result=done|retry|failed).',
+    ['task', 'result'],
+)
+
+
+def record_cache(cache, hit):
+    """Comptabilise un accès à un cache applicatif."""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+@register_collector
+def _domain_gauges():
+    from django.utils import timezone
+    from datetime import timedelta
+    from .models import Appointment, AppointmentReminder
+
+    now = timezone.now()
+    queue_depth = AppointmentReminder.objects.filter(sent=False, reminder_date__lte=now).count()
+    last_minute = Appointment.objects.filter(created_at__gte=now - timedelta(minutes=1)).count()
+    return [
+        ('appointme_reminder_queue_depth', 'Rappels non envoyés dont la date est passée.', 'gauge',
+         [({}, queue_depth)]),
+        ('appointme_bookings_last_minute', 'Rendez-vous créés durant la dernière minute.', 'gauge',
+         [({}, last_minute)]),
+    ]
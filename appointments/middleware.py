@@ -0,0 +1,184 @@
+import hashlib
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.http import HttpResponseNotModified
+from django.middleware.gzip import GZipMiddleware
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import parse_etags
+
+from . import metrics
+from .cache_versions import get_data_version
+from .slow_queries import capture_slow_queries
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli est optionnel
+    brotli = None
+
+
+def _url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.url_name if match else None) or 'unresolved'
+
+
+class MetricsMiddleware:
+    """Mesure la latence et le nombre de requêtes SQL par nom d'URL.
+
+    En mode asynchrone (ASGI), seules les latences sont mesurées : les requêtes
+    SQL s'exécutent alors dans les threads de ``async_db.run_query``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        queries = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        view = _url_name(request)
+        metrics.REQUEST_LATENCY.observe(duration, view=view, method=request.method)
+        metrics.DB_QUERIES.inc(queries[0], view=view)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        duration = time.perf_counter() - start
+        metrics.REQUEST_LATENCY.observe(duration, view=_url_name(request), method=request.method)
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """Journalise les requêtes SQL lentes avec la vue appelante.
+
+    Les vues asynchrones journalisent elles-mêmes via ``async_db.run_query``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+
+        def view():
+            match = getattr(request, 'resolver_match', None)
+            return match.view_name if match else request.path
+
+        with capture_slow_queries(view=view):
+            return self.get_response(request)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compresse les réponses au-delà de ``COMPRESSION_MIN_SIZE`` (brotli ou gzip).
+
+    Protection BREACH : une page dont le rendu a utilisé le jeton CSRF est
+    toujours compressée en gzip avec un bourrage aléatoire (« Heal The
+    Breach », voir ``GZipMiddleware.max_random_bytes``), le jeton étant par
+    ailleurs masqué différemment à chaque réponse. Brotli, qui ne permet pas
+    ce bourrage, est réservé aux réponses sans jeton (JSON, listes...).
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return super().process_response(request, response)
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(('text/', 'application/json', 'application/javascript')):
+            return response
+
+        # CsrfViewMiddleware renvoie le cookie dès que get_token() a servi au rendu
+        has_csrf_token = (
+            settings.CSRF_COOKIE_NAME in response.cookies
+            or request.META.get('CSRF_COOKIE_NEEDS_UPDATE', False)
+        )
+        accepts = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or has_csrf_token or 'br' not in accepts:
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=5)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class DataVersionETagMiddleware(MiddlewareMixin):
+    """GET conditionnels (304) pour les vues listées dans ``ETAG_URL_NAMES``.
+
+    L'ETag est dérivé de l'utilisateur, de la version de données de son
+    organisation (``cache_versions``), de l'URL et du secret CSRF : il se calcule avant la
+    vue, sans rendre ni hacher le corps de la réponse.
+    """
+
+    def _etag(self, request):
+        parts = [
+            str(request.user.pk),
+            str(get_data_version(request.organization.pk)),
+            request.get_full_path(),
+            request.META.get('CSRF_COOKIE', ''),
+            # Certaines pages dépendent du jour courant (calendrier)
+            timezone.localdate().isoformat(),
+        ]
+        digest = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if request.resolver_match.url_name not in settings.ETAG_URL_NAMES:
+            return None
+        if not request.user.is_authenticated:
+            return None
+        # Les messages en attente seraient perdus avec une réponse 304
+        if len(get_messages(request)):
+            return None
+
+        etag = request._data_version_etag = self._etag(request)
+        client_etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in client_etags or etag[2:] in client_etags or '*' in client_etags:
+            response = HttpResponseNotModified()
+            response.headers['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return None
+
+    def process_response(self, request, response):
+        etag = getattr(request, '_data_version_etag', None)
+        if etag and response.status_code == 200 and not response.has_header('ETag'):
+            response.headers['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staff',
+            name='photo_thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
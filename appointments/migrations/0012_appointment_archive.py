@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:21
+
+import appointments.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0011_soft_delete'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('appointment_date', models.DateTimeField()),
+                ('duration', models.DurationField()),
+                ('status', models.CharField(choices=[('scheduled', 'Programmé'), ('confirmed', 'Confirmé'), ('completed', 'Terminé'), ('cancelled', 'Annulé'), ('no_show', 'Absent')], max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to=settings.AUTH_USER_MODEL)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to='appointments.customer')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to='appointments.service')),
+            ],
+            options={
+                'ordering': ['appointment_date'],
+            },
+            bases=(appointments.models.AppointmentDisplayMixin, models.Model),
+        ),
+        migrations.CreateModel(
+            name='ArchivedAppointmentReminder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('reminder_date', models.DateTimeField()),
+                ('sent', models.BooleanField(default=False)),
+                ('reminder_type', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField()),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='appointments.archivedappointment')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['created_by', 'appointment_date'], name='appointment_created_2d263d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['appointment_date'], name='appointment_appoint_32b077_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def fill_customer_stats(apps, schema_editor):
+    # next_appointment est renseigné par « manage.py reconcile_customer_stats »
+    Customer = apps.get_model('appointments', 'Customer')
+    completed = Q(status='completed')
+    stats = {}
+    for model_name in ('Appointment', 'ArchivedAppointment'):
+        rows = (
+            apps.get_model('appointments', model_name).objects
+            .filter(completed)
+            .values('customer_id')
+            .annotate(visits=Count('pk'), last=Max('appointment_date'), spend=Sum('service__price'))
+            .order_by()
+        )
+        for row in rows:
+            visits, last, spend = stats.get(row['customer_id'], (0, None, 0))
+            stats[row['customer_id']] = (
+                visits + row['visits'],
+                max(filter(None, [last, row['last']]), default=None),
+                spend + (row['spend'] or 0),
+            )
+    customers = list(Customer.objects.filter(pk__in=stats))
+    for customer in customers:
+        customer.visit_count, customer.last_visit, customer.lifetime_spend = stats[customer.pk]
+    Customer.objects.bulk_update(customers, ['visit_count', 'last_visit', 'lifetime_spend'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0013_daily_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_visit',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='lifetime_spend',
+            field=models.DecimalField(decimal_places=0, default=0, help_text='Francs CFA', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='next_appointment',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='visit_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_by', 'last_name', 'first_name'], name='appointment_created_dccf33_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_by', 'last_visit'], name='appointment_created_11c738_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_by', 'next_appointment'], name='appointment_created_03fb6a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_by', 'visit_count'], name='appointment_created_34655c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_by', 'lifetime_spend'], name='appointment_created_3f6ac4_idx'),
+        ),
+        migrations.RunPython(fill_customer_stats, migrations.RunPython.noop),
+    ]
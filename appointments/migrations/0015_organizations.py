@@ -0,0 +1,91 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+OWNED_MODELS = ['Customer', 'Service', 'Appointment', 'ArchivedAppointment', 'BusinessHours']
+
+
+def create_personal_organizations(apps, schema_editor):
+    # Une organisation par utilisateur existant : les données restent visibles
+    # par leur créateur, qui peut ensuite inviter ses collègues
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Organization = apps.get_model('appointments', 'Organization')
+    Membership = apps.get_model('appointments', 'Membership')
+    for user in User.objects.order_by('pk').iterator():
+        full_name = f'{user.first_name} {user.last_name}'.strip()
+        organization = Organization.objects.create(name=full_name or user.username)
+        Membership.objects.create(organization=organization, user=user, role='owner')
+        for model_name in OWNED_MODELS:
+            apps.get_model('appointments', model_name).objects.filter(created_by=user).update(organization=organization)
+        apps.get_model('appointments', 'DailyRollup').objects.filter(user=user).update(organization=organization)
+        apps.get_model('appointments', 'Staff').objects.filter(user=user).update(organization=organization)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0014_customer_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Organization',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='organization',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='appointments.organization'),
+        ),
+        migrations.AddField(
+            model_name='archivedappointment',
+            name='organization',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to='appointments.organization'),
+        ),
+        migrations.AddField(
+            model_name='businesshours',
+            name='organization',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='business_hours', to='appointments.organization'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='organization',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='customers', to='appointments.organization'),
+        ),
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='organization',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='appointments.organization'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='organization',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='services', to='appointments.organization'),
+        ),
+        migrations.AddField(
+            model_name='staff',
+            name='organization',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='staff', to='appointments.organization'),
+        ),
+        migrations.CreateModel(
+            name='Membership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Propriétaire'), ('member', 'Membre')], default='member', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='appointments.organization')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'organization'), name='membership_unique')],
+            },
+        ),
+        migrations.RunPython(create_personal_organizations, migrations.RunPython.noop),
+    ]
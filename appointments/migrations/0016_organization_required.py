@@ -0,0 +1,135 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0015_organizations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='customer',
+            name='customer_email_unique_active',
+        ),
+        migrations.RemoveConstraint(
+            model_name='dailyrollup',
+            name='daily_rollup_key',
+        ),
+        migrations.RemoveIndex(
+            model_name='archivedappointment',
+            name='appointment_created_2d263d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='appointment_created_dccf33_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='appointment_created_11c738_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='appointment_created_03fb6a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='appointment_created_34655c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='appointment_created_3f6ac4_idx',
+        ),
+        migrations.RemoveField(
+            model_name='dailyrollup',
+            name='user',
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointments', to='appointments.organization'),
+        ),
+        migrations.AlterField(
+            model_name='archivedappointment',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to='appointments.organization'),
+        ),
+        migrations.AlterField(
+            model_name='businesshours',
+            name='day',
+            field=models.CharField(choices=[('monday', 'Lundi'), ('tuesday', 'Mardi'), ('wednesday', 'Mercredi'), ('thursday', 'Jeudi'), ('friday', 'Vendredi'), ('saturday', 'Samedi'), ('sunday', 'Dimanche')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='businesshours',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='business_hours', to='appointments.organization'),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customers', to='appointments.organization'),
+        ),
+        migrations.AlterField(
+            model_name='dailyrollup',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='appointments.organization'),
+        ),
+        migrations.AlterField(
+            model_name='service',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='services', to='appointments.organization'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['organization', 'appointment_date'], name='appointment_organiz_ddc8d8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['organization', 'status', 'appointment_date'], name='appointment_organiz_a1ee7f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['organization', 'appointment_date'], name='appointment_organiz_e4ff34_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['organization', 'last_name', 'first_name'], name='appointment_organiz_ab6d5f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['organization', 'last_visit'], name='appointment_organiz_68501c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['organization', 'next_appointment'], name='appointment_organiz_b8ce75_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['organization', 'visit_count'], name='appointment_organiz_adae35_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['organization', 'lifetime_spend'], name='appointment_organiz_82ab80_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['organization', 'name'], name='appointment_organiz_dbe35e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='businesshours',
+            constraint=models.UniqueConstraint(fields=('organization', 'day'), name='business_hours_unique_day'),
+        ),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.UniqueConstraint(condition=models.Q(('deleted_at__isnull', True)), fields=('organization', 'email'), name='customer_email_unique_active'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(fields=('organization', 'day', 'service', 'status'), name='daily_rollup_key'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+# Index unique sur LOWER(email) de auth_user (modèle d'une autre application :
+# ajouté par l'éditeur de schéma plutôt que par Meta.constraints)
+EMAIL_CONSTRAINT = models.UniqueConstraint(
+    Lower('email'),
+    condition=models.Q(email__gt=''),
+    name='auth_user_email_ci',
+)
+
+
+def add_email_index(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    duplicates = (User.objects.filter(email__gt='')
+                  .values(email_lower=Lower('email'))
+                  .annotate(count=models.Count('id'))
+                  .filter(count__gt=1)
+                  .values_list('email_lower', flat=True))
+    if duplicates:
+        raise RuntimeError(
+            "Emails utilisés par plusieurs comptes (à corriger avant la migration) : "
+            + ', '.join(duplicates)
+        )
+    schema_editor.add_constraint(User, EMAIL_CONSTRAINT)
+
+
+def remove_email_index(apps, schema_editor):
+    schema_editor.remove_constraint(apps.get_model('auth', 'User'), EMAIL_CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('appointments', '0017_waitlist'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0018_user_email_ci'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_id', models.IntegerField()),
+                ('changed_at', models.DateTimeField()),
+                ('month', models.PositiveIntegerField()),
+                ('changes', models.JSONField(help_text='{champ: [ancienne valeur, nouvelle valeur]}')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointment_changes', to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_changes', to='appointments.organization')),
+            ],
+            options={
+                'ordering': ['-changed_at'],
+                'indexes': [models.Index(fields=['month', 'id'], name='appointment_change_month'), models.Index(fields=['organization', 'appointment_id', 'changed_at'], name='appointment_organiz_e673bc_idx')],
+            },
+        ),
+    ]
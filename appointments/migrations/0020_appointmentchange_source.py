@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0019_appointment_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmentchange',
+            name='source',
+            field=models.CharField(choices=[('edit', 'Modification'), ('bulk', 'Action groupée'), ('waitlist', "Liste d'attente")], default='edit', max_length=20),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:23
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+def mark_orphaned(apps, schema_editor):
+    deleted = Q(customer__deleted_at__isnull=False) | Q(service__deleted_at__isnull=False)
+    for model_name in ('Appointment', 'ArchivedAppointment'):
+        model = apps.get_model('appointments', model_name)
+        model.objects.filter(deleted).update(orphaned=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0020_appointmentchange_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='orphaned',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='archivedappointment',
+            name='orphaned',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_orphaned, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0021_appointment_orphaned'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateScan',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('requested_at', models.DateTimeField()),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('pairs', models.JSONField(blank=True, default=list)),
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_scan', to='appointments.organization')),
+            ],
+        ),
+    ]
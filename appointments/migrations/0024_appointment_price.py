@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 19:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_service_price(apps, schema_editor):
+    Service = apps.get_model('appointments', 'Service')
+    price = Service.objects.filter(pk=OuterRef('service_id')).values('price')[:1]
+    for model_name in ('Appointment', 'ArchivedAppointment'):
+        model = apps.get_model('appointments', model_name)
+        model.objects.update(price=Subquery(price))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0023_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='price',
+            field=models.DecimalField(decimal_places=0, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedappointment',
+            name='price',
+            field=models.DecimalField(decimal_places=0, max_digits=10, null=True),
+        ),
+        migrations.RunPython(copy_service_price, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='price',
+            field=models.DecimalField(decimal_places=0, help_text='Prix du service au moment de la réservation (Francs CFA)', max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='archivedappointment',
+            name='price',
+            field=models.DecimalField(decimal_places=0, max_digits=10),
+        ),
+    ]
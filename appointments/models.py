@@ -1,21 +1,125 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 
-class Customer(models.Model):
+class ActiveManager(models.Manager):
+    """Manager par défaut : masque les lignes supprimées logiquement"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class VisibleAppointmentManager(models.Manager):
+    """Manager par défaut des rendez-vous : masque ceux d'un client ou d'un
+    service supprimé logiquement (``orphaned``), sans attendre la purge"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(orphaned=False)
+
+
+class Organization(models.Model):
+    """Cabinet (espace de travail) : propriétaire des clients, services,
+    rendez-vous et horaires, partagés entre ses membres"""
+    name = models.CharField(max_length=200)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Membership(models.Model):
+    """Appartenance d'un utilisateur à une organisation"""
+    ROLE_CHOICES = [
+        ('owner', 'Propriétaire'),
+        ('member', 'Membre'),
+    ]
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='memberships')
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='member')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'organization'], name='membership_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.organization.name}"
+
+
+class SoftDeleteModel(models.Model):
+    """Suppression logique : la ligne est masquée tout de suite, puis ses
+    dépendances (rendez-vous, rappels) sont effacées par lots par la tâche
+    ``purge.purge_deleted``.
+    """
+    deleted_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    objects = ActiveManager()
+    all_objects = models.Manager()
+
+    # Clé étrangère des rendez-vous vers ce modèle
+    appointment_field = None
+
+    class Meta:
+        abstract = True
+
+    def soft_delete(self):
+        from .cache_versions import bump_data_version
+        from .purge import purge_deleted
+        from .tasks import defer
+
+        self.deleted_at = timezone.now()
+        with transaction.atomic():
+            type(self).all_objects.filter(pk=self.pk).update(deleted_at=self.deleted_at)
+            # Rendez-vous masqués tout de suite : un drapeau plutôt qu'une jointure à chaque lecture
+            for model in (Appointment, ArchivedAppointment):
+                model.all_objects.filter(**{self.appointment_field: self.pk}).update(orphaned=True)
+        # update() ne déclenche pas post_save
+        bump_data_version(self.organization_id)
+        defer(purge_deleted)
+
+
+class Customer(SoftDeleteModel):
     """Modèle pour les clients"""
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
-    email = models.EmailField(unique=True)
+    email = models.EmailField()
     phone = models.CharField(max_length=20, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='customers')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_customers')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Statistiques dénormalisées (voir customer_stats.py)
+    visit_count = models.PositiveIntegerField(default=0)
+    last_visit = models.DateTimeField(blank=True, null=True)
+    next_appointment = models.DateTimeField(blank=True, null=True)
+    lifetime_spend = models.DecimalField(max_digits=14, decimal_places=0, default=0, help_text="Francs CFA")
+
+    appointment_field = 'customer'
 
     class Meta:
         ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(fields=['last_name', 'first_name']),
+            # Tris et filtres de la liste des clients, par organisation
+            models.Index(fields=['organization', 'last_name', 'first_name']),
+            models.Index(fields=['organization', 'last_visit']),
+            models.Index(fields=['organization', 'next_appointment']),
+            models.Index(fields=['organization', 'visit_count']),
+            models.Index(fields=['organization', 'lifetime_spend']),
+        ]
+        constraints = [
+            # Email unique par organisation ; un client supprimé ne bloque pas
+            # la recréation avec le même email
+            models.UniqueConstraint(
+                fields=['organization', 'email'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='customer_email_unique_active',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -25,21 +129,55 @@ class Customer(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 
-class Service(models.Model):
+class Service(SoftDeleteModel):
     """Modèle pour les services proposés"""
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     duration = models.DurationField(help_text="Durée du service en minutes")
     price = models.DecimalField(max_digits=10, decimal_places=0, help_text="Prix en Francs CFA")
     is_active = models.BooleanField(default=True)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='services')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_services')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    appointment_field = 'service'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'name']),
+        ]
+
     def __str__(self):
         return self.name
 
+    def soft_delete(self):
+        from .catalog import invalidate
 
-class Appointment(models.Model):
+        super().soft_delete()
+        # update() ne déclenche pas post_save
+        invalidate(self.organization_id)
+
+
+class AppointmentDisplayMixin:
+    """Affichage commun aux rendez-vous courants et archivés"""
+
+    def __str__(self):
+        return f"{self.customer.full_name} - {self.service.name} - {self.appointment_date.strftime('%d/%m/%Y %H:%M')}"
+
+    @property
+    def is_today(self):
+        return self.appointment_date.date() == timezone.now().date()
+
+    @property
+    def is_past(self):
+        return self.appointment_date < timezone.now()
+
+    @property
+    def is_upcoming(self):
+        return self.appointment_date > timezone.now()
+
+
+class Appointment(AppointmentDisplayMixin, models.Model):
     """Modèle pour les rendez-vous"""
     STATUS_CHOICES = [
         ('scheduled', 'Programmé'),
@@ -53,29 +191,36 @@ class Appointment(models.Model):
     service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='appointments')
     appointment_date = models.DateTimeField()
     duration = models.DurationField(help_text="Durée du rendez-vous")
+    price = models.DecimalField(max_digits=10, decimal_places=0,
+                                help_text="Prix du service au moment de la réservation (Francs CFA)")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
     notes = models.TextField(blank=True, null=True)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='appointments')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_appointments')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Client ou service supprimé logiquement, en attente de la purge
+    orphaned = models.BooleanField(default=False)
 
-    class Meta:
-        ordering = ['appointment_date']
-
-    def __str__(self):
-        return f"{self.customer.full_name} - {self.service.name} - {self.appointment_date.strftime('%d/%m/%Y %H:%M')}"
+    objects = VisibleAppointmentManager()
+    all_objects = models.Manager()
 
-    @property
-    def is_today(self):
-        return self.appointment_date.date() == timezone.now().date()
+    is_archived = False
 
-    @property
-    def is_past(self):
-        return self.appointment_date < timezone.now()
+    class Meta:
+        ordering = ['appointment_date']
+        indexes = [
+            models.Index(fields=['appointment_date']),
+            models.Index(fields=['organization', 'appointment_date']),
+            models.Index(fields=['organization', 'status', 'appointment_date']),
+        ]
 
-    @property
-    def is_upcoming(self):
-        return self.appointment_date > timezone.now()
+    def save(self, *args, **kwargs):
+        # Prix figé à la réservation : un changement de tarif ne touche pas
+        # le chiffre d'affaires déjà enregistré
+        if self.price is None:
+            self.price = self.service.price
+        super().save(*args, **kwargs)
 
 
 class AppointmentReminder(models.Model):
@@ -90,6 +235,11 @@ class AppointmentReminder(models.Model):
     ], default='email')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['sent', 'reminder_date']),
+        ]
+
     def __str__(self):
         return f"Rappel pour {self.appointment} - {self.reminder_date}"
 
@@ -106,14 +256,20 @@ class BusinessHours(models.Model):
         ('sunday', 'Dimanche'),
     ]
 
-    day = models.CharField(max_length=10, choices=DAY_CHOICES, unique=True)
+    day = models.CharField(max_length=10, choices=DAY_CHOICES)
     is_open = models.BooleanField(default=True)
     open_time = models.TimeField()
     close_time = models.TimeField()
     lunch_start = models.TimeField(blank=True, null=True)
     lunch_end = models.TimeField(blank=True, null=True)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='business_hours')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_business_hours')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'day'], name='business_hours_unique_day'),
+        ]
+
     def __str__(self):
         return f"{self.get_day_display()} - {'Ouvert' if self.is_open else 'Fermé'}"
 
@@ -121,11 +277,223 @@ class BusinessHours(models.Model):
 class Staff(models.Model):
     """Modèle pour le personnel"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='staff_profile')
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='staff', null=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
     specializations = models.ManyToManyField(Service, blank=True, related_name='staff')
     is_active = models.BooleanField(default=True)
     photo = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Miniatures générées hors requête : {taille: {'webp': chemin, 'jpeg': chemin}}
+    photo_thumbnails = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.user.get_full_name()} ({self.user.username})"
\ No newline at end of file
+        return f"{self.user.get_full_name()} ({self.user.username})"
+
+class Task(models.Model):
+    """Tâche différée, exécutée par « manage.py run_tasks » (voir tasks.py)"""
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminée'),
+        ('failed', 'Échouée'),
+    ]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    queue = models.CharField(max_length=50, default='default')
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['queue', 'status', 'priority', 'run_at']),
+            models.Index(fields=['status', 'locked_until']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+class ArchivedAppointment(AppointmentDisplayMixin, models.Model):
+    """Rendez-vous terminés/annulés de plus d'un an, déplacés hors de la table
+    courante par « manage.py archive_appointments » (même identifiant)"""
+    id = models.IntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_appointments')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='archived_appointments')
+    appointment_date = models.DateTimeField()
+    duration = models.DurationField()
+    price = models.DecimalField(max_digits=10, decimal_places=0)
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    notes = models.TextField(blank=True, null=True)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='archived_appointments')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_appointments')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    orphaned = models.BooleanField(default=False)
+
+    objects = VisibleAppointmentManager()
+    all_objects = models.Manager()
+
+    is_archived = True
+
+    class Meta:
+        ordering = ['appointment_date']
+        indexes = [
+            models.Index(fields=['organization', 'appointment_date']),
+            models.Index(fields=['appointment_date']),
+        ]
+
+
+class ArchivedAppointmentReminder(models.Model):
+    """Rappels des rendez-vous archivés"""
+    id = models.IntegerField(primary_key=True)
+    appointment = models.ForeignKey(ArchivedAppointment, on_delete=models.CASCADE, related_name='reminders')
+    reminder_date = models.DateTimeField()
+    sent = models.BooleanField(default=False)
+    reminder_type = models.CharField(max_length=50)
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Rappel archivé pour {self.appointment} - {self.reminder_date}"
+
+
+class DailyRollup(models.Model):
+    """Agrégats quotidiens des rendez-vous par organisation, service et statut.
+
+    Tenus à jour par les signaux (voir rollups.py) et recalculables par
+    « manage.py rebuild_rollups ».
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='daily_rollups')
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0, help_text="Francs CFA")
+    minutes = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'day', 'service', 'status'], name='daily_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.service_id} - {self.status} : {self.count}"
+
+
+class WaitlistEntry(models.Model):
+    """Client en attente d'un créneau pour un service, dans une fenêtre
+    horaire acceptable. Les créneaux libérés par une annulation sont proposés
+    ou réservés automatiquement (voir waitlist.py)."""
+    STATUS_CHOICES = [
+        ('waiting', 'En attente'),
+        ('offered', 'Créneau proposé'),
+        ('booked', 'Réservé'),
+        ('cancelled', 'Retiré'),
+    ]
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='waitlist_entries')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='waitlist_entries')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='waitlist_entries')
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    auto_book = models.BooleanField(default=False, help_text="Réserver sans confirmation")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    offered_start = models.DateTimeField(blank=True, null=True)
+    appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, blank=True, null=True,
+                                    related_name='waitlist_entries')
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_waitlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Recherche des entrées compatibles avec un créneau libéré : seules
+            # les entrées en attente sont indexées
+            models.Index(fields=['service', 'window_start', 'window_end'],
+                         condition=models.Q(status='waiting'), name='waitlist_waiting_windows'),
+            models.Index(fields=['organization', 'status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.customer.full_name} - {self.service.name} ({self.get_status_display()})"
+
+
+class DuplicateScan(models.Model):
+    """Dernière recherche de clients en double d'une organisation, calculée
+    par le worker (voir duplicates.py) : la page lit les paires stockées."""
+    organization = models.OneToOneField(Organization, on_delete=models.CASCADE, related_name='duplicate_scan')
+    requested_at = models.DateTimeField()
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # [[score, id_a, id_b, [raisons]], ...], meilleures d'abord
+    pairs = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f"Doublons - {self.organization}"
+
+    @property
+    def is_queued(self):
+        """La dernière demande n'a pas encore été prise par un worker"""
+        return self.started_at is None or self.started_at < self.requested_at
+
+    @property
+    def is_pending(self):
+        """La dernière demande n'est pas encore terminée"""
+        return self.is_queued or self.finished_at is None or self.finished_at < self.started_at
+
+
+class AppointmentChange(models.Model):
+    """Modification d'un rendez-vous : champs changés (ancienne et nouvelle
+    valeur), auteur et date. Écrite en différé par lots (voir audit.py).
+
+    ``month`` (AAAAMM) découpe l'historique par mois : la rétention supprime
+    des mois entiers en parcourant l'index qui commence par cette clé.
+    ``appointment_id`` n'est pas une clé étrangère : l'historique survit à
+    l'archivage et à la suppression du rendez-vous."""
+    FIELD_LABELS = {
+        'status': 'Statut',
+        'appointment_date': 'Date et heure',
+        'service': 'Service',
+        'customer': 'Client',
+        'notes': 'Notes',
+    }
+    SOURCE_CHOICES = [
+        ('edit', 'Modification'),
+        ('bulk', 'Action groupée'),
+        ('waitlist', "Liste d'attente"),
+    ]
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='appointment_changes')
+    appointment_id = models.IntegerField()
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True,
+                                   related_name='appointment_changes')
+    changed_at = models.DateTimeField()
+    month = models.PositiveIntegerField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='edit')
+    changes = models.JSONField(help_text="{champ: [ancienne valeur, nouvelle valeur]}")
+
+    class Meta:
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['month', 'id'], name='appointment_change_month'),
+            models.Index(fields=['organization', 'appointment_id', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"Rendez-vous {self.appointment_id} modifié le {self.changed_at:%d/%m/%Y %H:%M}"
+
+    @property
+    def diff(self):
+        """``[(libellé, ancienne valeur, nouvelle valeur), ...]``"""
+        return [(self.FIELD_LABELS.get(field, field), old, new) for field, (old, new) in self.changes.items()]
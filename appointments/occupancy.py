@@ -0,0 +1,156 @@
+"""
+Taux d'occupation par jour de la semaine et par heure.
+
+Pour chaque case (jour × heure) : minutes réservées / minutes d'ouverture
+(heures d'ouverture ``BusinessHours`` moins la pause déjeuner) sur la
+période demandée.
+
+Les rendez-vous sont projetés en couples ``(début, durée)`` puis placés sur
+une « semaine » de 10 080 minutes par un tableau de différences : +1 à la
+minute de début, -1 à la minute de fin, puis somme cumulée. Avec NumPy le
+calcul est entièrement vectorisé (``bincount``/``cumsum``) ; sans NumPy, le
+même calcul est fait sur des ``array`` Python.
+"""
+from array import array
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+from django.utils import timezone
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+# Le 1er janvier 1970 (origine des timestamps) était un jeudi
+_EPOCH_WEEKDAY = 3
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """NumPy s'il est installé, importé au premier calcul et non au démarrage"""
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - NumPy est optionnel
+        return None
+    return numpy
+
+
+def _minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def _open_intervals(business_hours):
+    """Intervalles d'ouverture (en minutes) de chaque jour, pause déjeuner exclue"""
+    intervals = [[] for _ in DAYS]
+    for hours in business_hours:
+        if not hours.is_open or hours.day not in DAYS:
+            continue
+        day = DAYS.index(hours.day)
+        opening, closing = _minute_of_day(hours.open_time), _minute_of_day(hours.close_time)
+        if hours.lunch_start and hours.lunch_end:
+            lunch_start, lunch_end = _minute_of_day(hours.lunch_start), _minute_of_day(hours.lunch_end)
+            intervals[day] += [(opening, max(opening, min(lunch_start, closing))),
+                               (min(closing, max(lunch_end, opening)), closing)]
+        else:
+            intervals[day].append((opening, closing))
+    return intervals
+
+
+def _weekday_counts(start, end):
+    """Nombre d'occurrences de chaque jour de la semaine entre start et end inclus"""
+    days = (end - start).days + 1
+    weeks, remainder = divmod(days, 7)
+    counts = [weeks] * 7
+    for i in range(remainder):
+        counts[(start.weekday() + i) % 7] += 1
+    return counts
+
+
+def _utc_offsets(start, end):
+    """Décalage UTC (minutes) du fuseau courant pour chaque jour de la période"""
+    tz = timezone.get_current_timezone()
+    return [
+        int(tz.utcoffset(datetime.combine(start + timedelta(days=i), time(12))).total_seconds() // 60)
+        for i in range((end - start).days + 1)
+    ]
+
+
+def _booked_numpy(np, starts, durations, origin, offsets):
+    starts = np.asarray(starts, dtype=np.int64)
+    durations = np.minimum(np.asarray(durations, dtype=np.int64), MINUTES_PER_WEEK)
+    day_index = np.clip((starts - origin) // MINUTES_PER_DAY, 0, len(offsets) - 1)
+    local = starts + np.asarray(offsets, dtype=np.int64)[day_index]
+    begin = (local + _EPOCH_WEEKDAY * MINUTES_PER_DAY) % MINUTES_PER_WEEK
+    # Semaine doublée : un rendez-vous qui déborde sur le lundi suivant est replié
+    size = 2 * MINUTES_PER_WEEK + 1
+    diff = np.bincount(begin, minlength=size) - np.bincount(begin + durations, minlength=size)
+    coverage = np.cumsum(diff)[:2 * MINUTES_PER_WEEK]
+    coverage = coverage[:MINUTES_PER_WEEK] + coverage[MINUTES_PER_WEEK:]
+    return coverage.reshape(7 * 24, 60).sum(axis=1).tolist()
+
+
+def _booked_python(starts, durations, origin, offsets):
+    size = 2 * MINUTES_PER_WEEK + 1
+    diff = array('q', bytes(8 * size))
+    last = len(offsets) - 1
+    for start, duration in zip(starts, durations):
+        day_index = min(max((start - origin) // MINUTES_PER_DAY, 0), last)
+        begin = (start + offsets[day_index] + _EPOCH_WEEKDAY * MINUTES_PER_DAY) % MINUTES_PER_WEEK
+        diff[begin] += 1
+        diff[begin + min(duration, MINUTES_PER_WEEK)] -= 1
+    booked = array('q', bytes(8 * 7 * 24))
+    running = 0
+    for minute in range(2 * MINUTES_PER_WEEK):
+        running += diff[minute]
+        booked[(minute % MINUTES_PER_WEEK) // 60] += running
+    return booked.tolist()
+
+
+def _open_minutes(intervals, counts):
+    """Minutes d'ouverture par case jour × heure sur la période"""
+    open_minutes = [0] * (7 * 24)
+    for day, day_intervals in enumerate(intervals):
+        for opening, closing in day_intervals:
+            for hour in range(opening // 60, (closing + 59) // 60):
+                overlap = min(closing, (hour + 1) * 60) - max(opening, hour * 60)
+                if overlap > 0:
+                    open_minutes[day * 24 + hour] += overlap * counts[day]
+    return open_minutes
+
+
+def occupancy(appointments, business_hours, start, end):
+    """Grille 7 × 24 de ``{'booked', 'open', 'ratio'}`` pour les dates start..end.
+
+    ``appointments`` est un queryset de rendez-vous déjà filtré (utilisateur,
+    membre du personnel...) ; seuls leurs couples (début, durée) sont lus.
+    """
+    tz = timezone.get_current_timezone()
+    range_start = timezone.make_aware(datetime.combine(start, time.min), tz)
+    range_end = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+    rows = list(appointments
+                .filter(appointment_date__gte=range_start, appointment_date__lt=range_end)
+                .exclude(status='cancelled')
+                .values_list('appointment_date', 'duration'))
+    starts = [int(value.timestamp()) // 60 for value, _ in rows]
+    durations = [int(duration.total_seconds()) // 60 for _, duration in rows]
+    origin = int(range_start.timestamp()) // 60
+    offsets = _utc_offsets(start, end)
+
+    np = _numpy()
+    if np is not None:
+        booked = _booked_numpy(np, starts, durations, origin, offsets)
+    else:
+        booked = _booked_python(starts, durations, origin, offsets)
+    open_minutes = _open_minutes(_open_intervals(business_hours), _weekday_counts(start, end))
+
+    return [
+        [
+            {
+                'booked': booked[day * 24 + hour],
+                'open': open_minutes[day * 24 + hour],
+                'ratio': (booked[day * 24 + hour] / open_minutes[day * 24 + hour]
+                          if open_minutes[day * 24 + hour] else None),
+            }
+            for hour in range(24)
+        ]
+        for day in range(7)
+    ]
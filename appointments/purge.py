@@ -0,0 +1,123 @@
+"""
+Purge des clients et services supprimés logiquement.
+
+Au lieu du collecteur de ``Model.delete()``, qui charge puis supprime en une
+transaction tous les rendez-vous et rappels liés, les dépendances sont
+effacées par des DELETE SQL bornés à ``PURGE_BATCH_SIZE`` lignes. Chaque lot
+est validé séparément et suivi d'une courte pause : le verrou d'écriture
+(SQLite) n'est jamais tenu longtemps.
+"""
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from . import customer_stats, rollups
+from .cache_versions import bump_data_version
+from .models import (
+    Appointment, AppointmentReminder, ArchivedAppointment, ArchivedAppointmentReminder,
+    Customer, DailyRollup, Service, Staff, WaitlistEntry,
+)
+from .tasks import task
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _delete_batches(sql, params):
+    """Répète un DELETE borné jusqu'à ce qu'il ne supprime plus rien"""
+    total = 0
+    while True:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params + [settings.PURGE_BATCH_SIZE])
+                deleted = cursor.rowcount
+        total += deleted
+        if deleted < settings.PURGE_BATCH_SIZE:
+            return total
+        time.sleep(settings.PURGE_BATCH_PAUSE)
+
+
+def _purge_appointments(column, value):
+    """Supprime les rendez-vous (courants et archivés) et leurs rappels dont ``column`` vaut ``value``"""
+    column = connection.ops.quote_name(column)
+    deleted = 0
+    for appointment_model, reminder_model in (
+        (Appointment, AppointmentReminder),
+        (ArchivedAppointment, ArchivedAppointmentReminder),
+    ):
+        appointments = _table(appointment_model)
+        reminders = _table(reminder_model)
+        deleted += _delete_batches(
+            f'DELETE FROM {reminders} WHERE id IN ('
+            f'SELECT r.id FROM {reminders} r INNER JOIN {appointments} a ON r.appointment_id = a.id '
+            f'WHERE a.{column} = %s LIMIT %s)',
+            [value],
+        )
+        deleted += _delete_batches(
+            f'DELETE FROM {appointments} WHERE id IN ('
+            f'SELECT id FROM {appointments} WHERE {column} = %s LIMIT %s)',
+            [value],
+        )
+    return deleted
+
+
+def _date_range(**filters):
+    bounds = [
+        model.all_objects.filter(**filters).aggregate(start=Min('appointment_date'), end=Max('appointment_date'))
+        for model in (Appointment, ArchivedAppointment)
+    ]
+    starts = [b['start'] for b in bounds if b['start']]
+    ends = [b['end'] for b in bounds if b['end']]
+    if not starts:
+        return None
+    return timezone.localdate(min(starts)), timezone.localdate(max(ends))
+
+
+def purge_customer(customer_id, organization_id):
+    # Les DELETE SQL contournent les signaux : les agrégats de la période sont recalculés
+    period = _date_range(customer_id=customer_id)
+    WaitlistEntry.objects.filter(customer_id=customer_id).delete()
+    deleted = _purge_appointments('customer_id', customer_id)
+    if period:
+        rollups.rebuild_range(*period, organization_id=organization_id)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {_table(Customer)} WHERE id = %s', [customer_id])
+        deleted += cursor.rowcount
+    return deleted
+
+
+def purge_service(service_id, organization_id):
+    customer_ids = set()
+    for model in (Appointment, ArchivedAppointment):
+        customer_ids.update(model.all_objects.filter(service_id=service_id).values_list('customer_id', flat=True))
+    WaitlistEntry.objects.filter(service_id=service_id).delete()
+    deleted = _purge_appointments('service_id', service_id)
+    customer_stats.refresh(customer_ids)
+    DailyRollup.objects.filter(service_id=service_id).delete()
+    through = Staff.specializations.through
+    deleted += _delete_batches(
+        f'DELETE FROM {_table(through)} WHERE id IN ('
+        f'SELECT id FROM {_table(through)} WHERE service_id = %s LIMIT %s)',
+        [service_id],
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {_table(Service)} WHERE id = %s', [service_id])
+        deleted += cursor.rowcount
+    return deleted
+
+
+@task(priority=-5, concurrency=1, timeout=30 * 60)
+def purge_deleted():
+    """Efface définitivement les clients et services supprimés logiquement"""
+    deleted = 0
+    for model, purge in ((Customer, purge_customer), (Service, purge_service)):
+        rows = model.all_objects.filter(deleted_at__isnull=False).values_list('pk', 'organization_id')
+        for pk, organization_id in rows:
+            deleted += purge(pk, organization_id)
+            # Les DELETE SQL ne déclenchent pas post_delete
+            bump_data_version(organization_id)
+    return deleted
@@ -0,0 +1,132 @@
+"""
+Agrégats quotidiens des rendez-vous (table ``DailyRollup``).
+
+Chaque rendez-vous contribue une ligne clé ``(organisation, jour, service,
+statut)`` : +1 rendez-vous, +prix enregistré à la réservation, +durée en
+minutes. Les signaux retirent l'ancienne contribution et ajoutent la
+nouvelle à chaque écriture ; ``rebuild_range`` recalcule une période depuis
+les tables de rendez-vous (courante et archive). Le prix étant porté par le
+rendez-vous, un changement de tarif du service ne modifie pas le chiffre
+d'affaires passé ni les agrégats existants.
+
+Les rapports ne lisent que les agrégats : trois ans d'historique tiennent
+en quelques milliers de lignes.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import Appointment, ArchivedAppointment, DailyRollup
+
+GROUPS = ('day', 'month', 'service', 'status')
+
+
+def contribution(organization_id, appointment_date, service_id, status, duration, price):
+    """Clé et valeurs apportées par un rendez-vous"""
+    key = (organization_id, timezone.localdate(appointment_date), service_id, status)
+    return key, (price or Decimal(0), int(duration.total_seconds() // 60))
+
+
+def stored_contribution(appointment_id):
+    """Contribution d'un rendez-vous tel qu'enregistré en base (None s'il n'existe pas)"""
+    row = (Appointment.all_objects.filter(pk=appointment_id)
+           .values_list('organization_id', 'appointment_date', 'service_id', 'status', 'duration', 'price')
+           .first())
+    return contribution(*row) if row else None
+
+
+def apply(key, values, sign):
+    """Ajoute (sign=1) ou retire (sign=-1) une contribution"""
+    organization_id, day, service_id, status = key
+    revenue, minutes = values
+    rollup = DailyRollup.objects.filter(organization_id=organization_id, day=day, service_id=service_id, status=status)
+    changes = {
+        'count': F('count') + sign,
+        'revenue': F('revenue') + sign * revenue,
+        'minutes': F('minutes') + sign * minutes,
+    }
+    if rollup.update(**changes) or sign < 0:
+        return
+    try:
+        with transaction.atomic():
+            DailyRollup.objects.create(organization_id=organization_id, day=day, service_id=service_id, status=status,
+                                       count=1, revenue=revenue, minutes=minutes)
+    except IntegrityError:
+        # Ligne créée entre-temps par une autre requête
+        rollup.update(**changes)
+
+
+def rebuild_range(start, end, organization_id=None, service_id=None):
+    """Recalcule les agrégats des jours ``start`` à ``end`` inclus"""
+    rows = {}
+    for model in (Appointment, ArchivedAppointment):
+        appointments = model.all_objects.filter(appointment_date__date__range=(start, end))
+        if organization_id is not None:
+            appointments = appointments.filter(organization_id=organization_id)
+        if service_id is not None:
+            appointments = appointments.filter(service_id=service_id)
+        aggregates = (
+            appointments
+            .annotate(day=TruncDate('appointment_date'))
+            .values('organization_id', 'day', 'service_id', 'status')
+            .annotate(n=Count('pk'), revenue=Sum('price'), total_duration=Sum('duration'))
+            .order_by()
+        )
+        for agg in aggregates:
+            key = (agg['organization_id'], agg['day'], agg['service_id'], agg['status'])
+            count, revenue, minutes = rows.get(key, (0, Decimal(0), 0))
+            rows[key] = (
+                count + agg['n'],
+                revenue + (agg['revenue'] or 0),
+                minutes + int(agg['total_duration'].total_seconds() // 60),
+            )
+
+    with transaction.atomic():
+        existing = DailyRollup.objects.filter(day__range=(start, end))
+        if organization_id is not None:
+            existing = existing.filter(organization_id=organization_id)
+        if service_id is not None:
+            existing = existing.filter(service_id=service_id)
+        existing.delete()
+        DailyRollup.objects.bulk_create(
+            [
+                DailyRollup(organization_id=key[0], day=key[1], service_id=key[2], status=key[3],
+                            count=count, revenue=revenue, minutes=minutes)
+                for key, (count, revenue, minutes) in rows.items()
+            ],
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def report(organization, start, end, group='month'):
+    """Totaux par période, service ou statut, lus uniquement dans les agrégats"""
+    rollups = DailyRollup.objects.filter(organization=organization, day__range=(start, end))
+    if group == 'month':
+        rollups = rollups.annotate(period=TruncMonth('day')).values('period', 'status')
+        ordering = ['period', 'status']
+    elif group == 'day':
+        rollups = rollups.annotate(period=F('day')).values('period', 'status')
+        ordering = ['period', 'status']
+    elif group == 'service':
+        rollups = rollups.values('service_id', 'service__name', 'status')
+        ordering = ['service__name', 'status']
+    else:
+        rollups = rollups.values('status')
+        ordering = ['status']
+    rows = rollups.annotate(
+        total_count=Sum('count'), total_revenue=Sum('revenue'), total_minutes=Sum('minutes'),
+    ).order_by(*ordering)
+    return [
+        {
+            **{k: v for k, v in row.items() if not k.startswith('total_')},
+            'count': row['total_count'],
+            'revenue': int(row['total_revenue'] or 0),
+            'minutes': row['total_minutes'],
+        }
+        for row in rows
+        if row['total_count']
+    ]
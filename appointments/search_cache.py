@@ -0,0 +1,98 @@
+"""
+Cache des résultats de la recherche globale, par organisation.
+
+Les entrées vivent dans le cache partagé avec un TTL, et un index par
+organisation (ordre d'insertion) borne leur nombre : les plus anciennes sont
+évincées. Les clés incluent la version de données de l'organisation
+(``cache_versions``) : toute écriture les rend obsolètes.
+
+Raffinement : si une recherche déjà en cache (« du ») n'a été tronquée dans
+aucune section, toute recherche qui la contient (« dup », « dupo ») est un
+sous-ensemble de ses résultats et se calcule en mémoire, sans requête SQL.
+
+Une recherche trouvée en cache, exacte ou raffinée, ne fait que des lectures :
+seul ``store()`` écrit (l'entrée et l'index).
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache_versions import get_data_version
+from .metrics import record_cache
+
+
+SEARCH_LIMIT = 10
+SECTIONS = ('appointments', 'customers', 'services')
+
+
+def cache_prefix(organization_id):
+    """Préfixe des clés de l'organisation pour sa version de données courante"""
+    return f'appointme:search:{organization_id}:{get_data_version(organization_id)}'
+
+
+def _entry_key(prefix, query):
+    return f"{prefix}:{hashlib.md5(query.encode('utf-8')).hexdigest()}"
+
+
+def _public(entry):
+    return {name: [item for item, _ in entry['sections'][name]] for name in SECTIONS}
+
+
+def _remember(prefix, index, query):
+    """Ajoute ``query`` à l'index et évince les plus anciennes"""
+    if query in index:
+        index.remove(query)
+    index.append(query)
+    while len(index) > settings.SEARCH_CACHE_SIZE:
+        cache.delete(_entry_key(prefix, index.pop(0)))
+    cache.set(prefix + ':index', index, settings.SEARCH_CACHE_TTL)
+
+
+def _refine(entry, query):
+    sections = {}
+    for name in SECTIONS:
+        sections[name] = [
+            [item, haystack] for item, haystack in entry['sections'][name]
+            if any(query in text for text in haystack)
+        ]
+    return {'truncated': False, 'sections': sections}
+
+
+def lookup(prefix, query):
+    """Résultats en cache pour ``query`` (exacts ou raffinés), ou None"""
+    query = query.lower()
+    index = cache.get(prefix + ':index') or []
+
+    if query in index:
+        entry = cache.get(_entry_key(prefix, query))
+        if entry is not None:
+            record_cache('search', True)
+            return _public(entry)
+
+    # Recherches plus courtes contenues dans celle-ci, de la plus précise à la
+    # moins précise ; le raffinement, calculé en mémoire, n'est pas stocké
+    candidates = sorted((q for q in index if q != query and q in query), key=len, reverse=True)
+    for candidate in candidates:
+        entry = cache.get(_entry_key(prefix, candidate))
+        if entry is None or entry['truncated']:
+            continue
+        record_cache('search', True)
+        return _public(_refine(entry, query))
+
+    record_cache('search', False)
+    return None
+
+
+def store(prefix, query, sections):
+    """Met en cache des résultats ``{section: [(item, champs_recherchés), ...]}``"""
+    query = query.lower()
+    entry = {
+        'truncated': any(len(sections[name]) >= SEARCH_LIMIT for name in SECTIONS),
+        'sections': {
+            name: [[item, [text.lower() for text in haystack]] for item, haystack in sections[name]]
+            for name in SECTIONS
+        },
+    }
+    cache.set(_entry_key(prefix, query), entry, settings.SEARCH_CACHE_TTL)
+    _remember(prefix, cache.get(prefix + ':index') or [], query)
@@ -0,0 +1,138 @@
+from django.contrib.auth.models import User
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import audit, auth, catalog, customer_stats, metrics, rollups, tenancy, waitlist
+from .cache_versions import bump_data_version
+from .models import Appointment, BusinessHours, Customer, Membership, Service, Staff
+from .tenancy import organization_ids
+
+
+@receiver(post_save, sender=Appointment)
+def count_booking(sender, instance, created, **kwargs):
+    """Comptabilise chaque nouveau rendez-vous pour les métriques"""
+    if created:
+        metrics.BOOKINGS_CREATED.inc()
+
+
+def bump_owner_version(sender, instance, **kwargs):
+    """Invalide les caches de l'organisation propriétaire de l'objet modifié"""
+    bump_data_version(instance.organization_id)
+
+
+for model in (Customer, Service, Appointment):
+    post_save.connect(bump_owner_version, sender=model, dispatch_uid=f'bump_version_save_{model.__name__}')
+    post_delete.connect(bump_owner_version, sender=model, dispatch_uid=f'bump_version_delete_{model.__name__}')
+
+
+def invalidate_catalog(sender, instance, **kwargs):
+    """Services et horaires : les instantanés du catalogue sont rechargés"""
+    catalog.invalidate(instance.organization_id)
+
+
+for model in (Service, BusinessHours):
+    post_save.connect(invalidate_catalog, sender=model, dispatch_uid=f'catalog_save_{model.__name__}')
+    post_delete.connect(invalidate_catalog, sender=model, dispatch_uid=f'catalog_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=User)
+def bump_user_version(sender, instance, **kwargs):
+    """Le nom de l'utilisateur apparaît dans l'en-tête de chaque page"""
+    for organization_id in organization_ids(instance.pk):
+        bump_data_version(organization_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """Vide l'utilisateur du cache du processus (les autres le voient expirer)"""
+    auth.users.discard(instance.pk)
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def forget_cached_organization(sender, instance, **kwargs):
+    tenancy.organizations.discard(instance.user_id)
+
+
+@receiver(post_save, sender=Staff)
+def bump_staff_version(sender, instance, **kwargs):
+    """La photo du profil apparaît dans l'en-tête de chaque page"""
+    for organization_id in organization_ids(instance.user_id):
+        bump_data_version(organization_id)
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_rollup_contribution(sender, instance, raw=False, **kwargs):
+    """Mémorise la contribution aux agrégats quotidiens avant modification"""
+    if raw:
+        return
+    instance._rollup_before = rollups.stored_contribution(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Appointment)
+def update_rollups(sender, instance, raw=False, **kwargs):
+    """Retire l'ancienne contribution aux agrégats et ajoute la nouvelle"""
+    if raw:
+        return
+    before = getattr(instance, '_rollup_before', None)
+    # Relu en base : valeurs normalisées (identifiants reçus en texte, dates naïves...)
+    after = rollups.stored_contribution(instance.pk)
+    if before == after:
+        return
+    if before is not None:
+        rollups.apply(*before, sign=-1)
+    rollups.apply(*after, sign=1)
+
+
+@receiver(pre_delete, sender=Appointment)
+def remember_deleted_contribution(sender, instance, **kwargs):
+    instance._rollup_before = rollups.stored_contribution(instance.pk)
+
+
+@receiver(post_delete, sender=Appointment)
+def remove_from_rollups(sender, instance, **kwargs):
+    before = getattr(instance, '_rollup_before', None)
+    if before is not None:
+        rollups.apply(*before, sign=-1)
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_customer(sender, instance, raw=False, **kwargs):
+    """Mémorise le client (dont les statistiques changent aussi si le rendez-vous
+    est déplacé) et le statut d'origine"""
+    instance._customer_before = instance._status_before = None
+    if raw or not instance.pk:
+        return
+    previous = Appointment.all_objects.filter(pk=instance.pk).values_list('customer_id', 'status').first()
+    if previous:
+        instance._customer_before, instance._status_before = previous
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def refresh_customer_stats(sender, instance, raw=False, **kwargs):
+    """Recalcule les statistiques dénormalisées du ou des clients concernés"""
+    if raw:
+        return
+    customer_stats.refresh([instance.customer_id, getattr(instance, '_customer_before', None)])
+
+
+@receiver(post_save, sender=Appointment)
+def release_cancelled_slot(sender, instance, raw=False, **kwargs):
+    """Propose le créneau d'un rendez-vous qui vient d'être annulé à la liste d'attente"""
+    if not raw and instance.status == 'cancelled' and getattr(instance, '_status_before', None) != 'cancelled':
+        waitlist.release_slot(instance)
+
+
+@receiver(post_delete, sender=Appointment)
+def release_deleted_slot(sender, instance, **kwargs):
+    if instance.status != 'cancelled':
+        waitlist.release_slot(instance)
+
+
+@receiver(request_finished)
+def flush_audit(sender, **kwargs):
+    """Écrit l'historique des rendez-vous en attente, une fois la réponse envoyée"""
+    audit.flush_if_due()
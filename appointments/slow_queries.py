@@ -0,0 +1,137 @@
+"""
+Journal des requêtes SQL lentes.
+
+Toute requête dépassant ``settings.SLOW_QUERY_THRESHOLD_MS`` est écrite, une
+ligne JSON par requête, dans ``settings.SLOW_QUERY_LOG`` (fichier rotatif)
+avec ses paramètres, la vue et la ligne de code appelantes et le plan
+d'exécution (``EXPLAIN QUERY PLAN`` sous SQLite).
+"""
+import json
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger('appointments.slow_queries')
+_handler_lock = threading.Lock()
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Fichiers d'instrumentation à ignorer lors de la recherche de l'appelant
+_SKIPPED_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(_APP_DIR, 'middleware.py'),
+}
+
+
+def _get_logger():
+    if not logger.handlers:
+        with _handler_lock:
+            if not logger.handlers:
+                path = settings.SLOW_QUERY_LOG
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    path,
+                    maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                    backupCount=settings.SLOW_QUERY_LOG_BACKUP_COUNT,
+                    encoding='utf-8',
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+    return logger
+
+
+def _caller():
+    """Retourne la frame la plus proche dans le code de l'application."""
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(_APP_DIR) and filename not in _SKIPPED_FILES:
+            return f'{os.path.relpath(filename, settings.BASE_DIR)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(sql, params):
+    """Exécute le plan d'exécution de ``sql`` sans repasser par les wrappers."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return []
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    saved = connection.execute_wrappers
+    connection.execute_wrappers = []
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN impossible: {e}']
+    finally:
+        connection.execute_wrappers = saved
+
+
+@contextmanager
+def capture_slow_queries(view=None):
+    """Journalise les requêtes lentes exécutées dans le bloc"""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None:
+        yield
+        return
+
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= threshold:
+                entry = {
+                    'ts': time.time(),
+                    'duration_ms': round(duration_ms, 2),
+                    'sql': sql,
+                    'params': None if many else params,
+                    'view': view() if callable(view) else view,
+                    'caller': _caller(),
+                    'plan': [] if many else explain(sql, params),
+                }
+                _get_logger().info(json.dumps(entry, default=str, ensure_ascii=False))
+
+    with connection.execute_wrapper(wrapper):
+        yield
+
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'IN \((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Réduit une requête à sa forme (littéraux et listes IN remplacés)."""
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _PLACEHOLDER_RE.sub('?', shape)
+    shape = _IN_LIST_RE.sub('IN (...)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+def read_entries(path=None):
+    """Lit le journal courant et ses fichiers de rotation."""
+    path = path or settings.SLOW_QUERY_LOG
+    paths = [path] + [f'{path}.{i}' for i in range(1, settings.SLOW_QUERY_LOG_BACKUP_COUNT + 1)]
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        with open(p, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
@@ -0,0 +1,217 @@
+"""
+File de tâches durable stockée dans la base du projet (sans broker externe).
+
+Une fonction décorée par ``@task`` peut être différée depuis une vue::
+
+    defer(process_avatar, staff.pk)
+
+La tâche est une ligne ``Task`` créée dans la transaction courante : elle
+n'est visible des workers (``manage.py run_tasks``) qu'une fois celle-ci
+validée. Un worker réserve une tâche avec un bail (``locked_until``) par un
+UPDATE conditionnel ; si le worker meurt, la tâche redevient réservable à
+l'expiration du bail. Les échecs sont réessayés avec un délai exponentiel
+jusqu'à ``max_attempts``.
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Nombre de candidates examinées à chaque tentative de réservation
+CLAIM_BATCH = 20
+
+
+@dataclass(frozen=True)
+class TaskSpec:
+    name: str
+    func: object
+    queue: str
+    priority: int
+    max_attempts: int
+    timeout: int
+    retry_delay: int
+    concurrency: int = None
+
+
+_registry = {}
+
+
+def task(func=None, *, queue='default', priority=0, max_attempts=5, timeout=300,
+         retry_delay=10, concurrency=None):
+    """Déclare une fonction exécutable par les workers.
+
+    ``priority`` : les plus grandes valeurs passent en premier.
+    ``timeout`` : durée du bail en secondes, au-delà la tâche est reprise.
+    ``concurrency`` : nombre maximal d'exécutions simultanées, tous workers confondus.
+    Les arguments doivent être sérialisables en JSON (identifiants plutôt qu'objets).
+    """
+    def decorator(f):
+        name = f'{f.__module__}.{f.__qualname__}'
+        _registry[name] = TaskSpec(name, f, queue, priority, max_attempts, timeout, retry_delay, concurrency)
+        f.task_name = name
+        return f
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def get_spec(name):
+    """Retourne la déclaration d'une tâche, en important son module si besoin"""
+    if name not in _registry:
+        try:
+            import_module(name.rsplit('.', 1)[0])
+        except ImportError:
+            return None
+    return _registry.get(name)
+
+
+def defer(func, *args, priority=None, delay=None, **kwargs):
+    """Enregistre l'exécution différée de ``func(*args, **kwargs)``.
+
+    ``priority`` remplace la priorité déclarée ; ``delay`` (secondes ou
+    timedelta) repousse la première exécution.
+    """
+    from .models import Task
+
+    name = getattr(func, 'task_name', None)
+    if name is None:
+        raise ValueError(f'{func!r} n\'est pas déclarée avec @task')
+    spec = _registry[name]
+    run_at = timezone.now()
+    if delay:
+        run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+    return Task.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        queue=spec.queue,
+        priority=spec.priority if priority is None else priority,
+        max_attempts=spec.max_attempts,
+        run_at=run_at,
+    )
+
+
+def worker_id(suffix=''):
+    return f'{socket.gethostname()}:{os.getpid()}{suffix}'
+
+
+def _busy_names(now):
+    """Exécutions en cours des tâches à concurrence limitée"""
+    from .models import Task
+
+    limited = [spec.name for spec in _registry.values() if spec.concurrency]
+    if not limited:
+        return {}
+    rows = (Task.objects.filter(status='running', locked_until__gt=now, name__in=limited)
+            .values('name').annotate(n=Count('pk')))
+    return {row['name']: row['n'] for row in rows}
+
+
+def claim(worker, queues=('default',)):
+    """Réserve la prochaine tâche exécutable, ou retourne None"""
+    from .models import Task
+
+    now = timezone.now()
+    busy = _busy_names(now)
+    candidates = (
+        Task.objects
+        .filter(queue__in=queues)
+        .filter(Q(status='pending', run_at__lte=now) | Q(status='running', locked_until__lt=now))
+        .order_by('-priority', 'run_at')
+        .values_list('pk', 'name', 'status', 'locked_until')[:CLAIM_BATCH]
+    )
+    for pk, name, status, locked_until in candidates:
+        spec = get_spec(name)
+        limit = spec.concurrency if spec else None
+        if limit and busy.get(name, 0) >= limit:
+            continue
+        lease = now + timedelta(seconds=spec.timeout if spec else 60)
+        # UPDATE conditionnel : un seul worker peut passer de l'état observé à « running »
+        claimed = Task.objects.filter(pk=pk, status=status, locked_until=locked_until).update(
+            status='running', locked_by=worker, locked_until=lease, attempts=F('attempts') + 1,
+        )
+        if not claimed:
+            continue
+        if limit:
+            running = Task.objects.filter(status='running', locked_until__gt=now, name=name).count()
+            if running > limit:
+                # Un autre worker a réservé la même tâche limitée en même temps : on rend la main
+                Task.objects.filter(pk=pk, locked_by=worker).update(
+                    status='pending', locked_by='', locked_until=None, attempts=F('attempts') - 1,
+                )
+                busy[name] = running - 1
+                continue
+        return Task.objects.get(pk=pk)
+    return None
+
+
+def _retry_delay(spec, attempts):
+    base = spec.retry_delay if spec else 10
+    delay = min(base * 2 ** (attempts - 1), settings.TASK_MAX_RETRY_DELAY)
+    return timedelta(seconds=delay * random.uniform(1.0, 1.1))
+
+
+def run(task_obj, worker):
+    """Exécute une tâche réservée et enregistre son résultat"""
+    from .models import Task
+
+    spec = get_spec(task_obj.name)
+    # Le bail n'est mis à jour que si ce worker le détient toujours
+    owned = Task.objects.filter(pk=task_obj.pk, locked_by=worker, status='running')
+    try:
+        if spec is None:
+            raise LookupError(f'Tâche inconnue : {task_obj.name}')
+        if task_obj.attempts > task_obj.max_attempts:
+            raise RuntimeError('Bail expiré lors de la dernière tentative')
+        spec.func(*task_obj.args, **task_obj.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if spec is None or task_obj.attempts >= task_obj.max_attempts:
+            logger.error('Tâche %s (%s) abandonnée après %s tentatives\n%s',
+                         task_obj.pk, task_obj.name, task_obj.attempts, error)
+            owned.update(status='failed', last_error=error, locked_until=None, finished_at=now)
+            metrics.TASKS_PROCESSED.inc(task=task_obj.name, result='failed')
+        else:
+            logger.warning('Tâche %s (%s) en échec, nouvel essai prévu', task_obj.pk, task_obj.name)
+            owned.update(status='pending', last_error=error, locked_by='', locked_until=None,
+                         run_at=now + _retry_delay(spec, task_obj.attempts))
+            metrics.TASKS_PROCESSED.inc(task=task_obj.name, result='retry')
+        return False
+    owned.update(status='done', locked_until=None, finished_at=timezone.now())
+    metrics.TASKS_PROCESSED.inc(task=task_obj.name, result='done')
+    return True
+
+
+def purge_finished():
+    """Supprime les tâches terminées depuis plus de ``TASK_KEEP_DONE`` secondes"""
+    from .models import Task
+
+    limit = timezone.now() - timedelta(seconds=settings.TASK_KEEP_DONE)
+    deleted, _ = Task.objects.filter(status='done', finished_at__lt=limit).delete()
+    return deleted
+
+
+@metrics.register_collector
+def _queue_gauges():
+    from .models import Task
+
+    rows = (Task.objects.filter(status__in=['pending', 'running', 'failed'])
+            .values('queue', 'status').annotate(n=Count('pk')))
+    return [
+        ('appointme_task_queue_depth', 'Tâches différées par file et par état.', 'gauge',
+         [({'queue': row['queue'], 'status': row['status']}, row['n']) for row in rows]),
+    ]
@@ -0,0 +1,29 @@
+from functools import lru_cache
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+STYLESHEET = 'appointments/css/app.css'
+TAILWIND_CDN = 'https://cdn.tailwindcss.com/3.4.17'
+
+
+@lru_cache(maxsize=None)
+def _is_built(path):
+    """Vrai si le fichier a été généré par « manage.py build_assets »"""
+    return finders.find(path) is not None or staticfiles_storage.exists(path)
+
+
+@register.simple_tag
+def app_stylesheet():
+    """Feuille de style compilée ; en développement (DEBUG), Tailwind CDN tant
+    que le bundle n'est pas généré. Hors DEBUG, le check appointments.E001
+    signale un bundle manquant"""
+    if settings.DEBUG and not _is_built(STYLESHEET):
+        return format_html('<script src="{}"></script>', TAILWIND_CDN)
+    return format_html('<link rel="stylesheet" href="{}">', static(STYLESHEET))
@@ -0,0 +1,24 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar_img(staff, size='sm', css_class='', alt=''):
+    """Photo d'un membre du personnel : miniature WebP, repli JPEG puis original"""
+    if not getattr(staff, 'photo', None):
+        return ''
+    variant = (staff.photo_thumbnails or {}).get(size)
+    if not variant:
+        # Miniatures pas encore générées
+        return format_html('<img src="{}" alt="{}" class="{}" decoding="async">', staff.photo.url, alt, css_class)
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp">'
+        '<img src="{}" alt="{}" class="{}" decoding="async"></picture>',
+        default_storage.url(variant['webp']),
+        default_storage.url(variant['jpeg']),
+        alt,
+        css_class,
+    )
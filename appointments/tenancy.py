@@ -0,0 +1,63 @@
+"""
+Organisations (cabinets) et organisation courante de la requête.
+
+Clients, services, rendez-vous et horaires appartiennent à une organisation
+et sont partagés par tous ses membres : les vues filtrent sur
+``request.organization``, les index composites et les versions de cache
+(``cache_versions``) sont indexés par organisation.
+"""
+from django.db import transaction
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .auth import ProcessCache
+from .models import Membership, Organization
+
+# Organisation de chaque utilisateur, gardée en mémoire comme l'utilisateur
+# lui-même (voir auth.py) ; vidée par les signaux de Membership
+organizations = ProcessCache('AUTH_USER_CACHE_TTL')
+
+
+def create_organization(user, name=None):
+    """Crée une organisation dont ``user`` est propriétaire"""
+    with transaction.atomic():
+        organization = Organization.objects.create(name=name or user.get_full_name() or user.username)
+        Membership.objects.create(organization=organization, user=user, role='owner')
+    return organization
+
+
+def organization_for(user):
+    """Organisation de l'utilisateur (la plus ancienne adhésion) ; une
+    organisation à son nom est créée s'il n'en a aucune"""
+    membership = (Membership.objects.filter(user=user).select_related('organization')
+                  .order_by('created_at', 'pk').first())
+    return membership.organization if membership else create_organization(user)
+
+
+def organization_ids(user_id):
+    """Identifiants des organisations dont l'utilisateur est membre"""
+    return list(Membership.objects.filter(user_id=user_id).values_list('organization_id', flat=True))
+
+
+def current_organization(request):
+    """Organisation de la requête (None pour un visiteur anonyme), mémorisée sur la requête"""
+    if not hasattr(request, '_cached_organization'):
+        user = request.user
+        organization = None
+        if user.is_authenticated:
+            organization = organizations.get(user.pk)
+            if organization is None:
+                organization = organization_for(user)
+                organizations.set(user.pk, organization)
+        request._cached_organization = organization
+    return request._cached_organization
+
+
+class OrganizationMiddleware(MiddlewareMixin):
+    """Ajoute ``request.organization``, résolue au premier accès.
+
+    Les vues asynchrones utilisent ``await sync_to_async(current_organization)(request)``.
+    """
+
+    def process_request(self, request):
+        request.organization = SimpleLazyObject(lambda: current_organization(request))
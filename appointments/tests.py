@@ -1,3 +1,362 @@
-from django.test import TestCase
+import base64
+import json
+import warnings
+from datetime import timedelta
+from decimal import Decimal
+from itertools import combinations
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import api, audit, bulk, checks, duplicates, search_cache, waitlist
+from .models import Appointment, AppointmentChange, Customer, DailyRollup, Service, Task, WaitlistEntry
+from .templatetags.assets import app_stylesheet
+from .tenancy import create_organization
+
+# Les pages rendues dans les tests n'ont pas de manifeste collectstatic
+PLAIN_STATIC = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class RollupPriceChangeTests(TestCase):
+    """Agrégats quotidiens après un changement de prix du service : le prix réservé est conservé"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'secret')
+        self.organization = create_organization(self.user)
+        self.customer = Customer.objects.create(
+            first_name='Awa', last_name='Diallo', email='awa@example.com',
+            organization=self.organization, created_by=self.user,
+        )
+        self.service = Service.objects.create(
+            name='Coupe', duration=timedelta(minutes=30), price=Decimal(1000),
+            organization=self.organization, created_by=self.user,
+        )
+        self.appointments = [
+            Appointment.objects.create(
+                customer=self.customer, service=self.service, organization=self.organization,
+                created_by=self.user, appointment_date=timezone.now() - timedelta(days=3, hours=i),
+                duration=self.service.duration, status='completed',
+            )
+            for i in range(3)
+        ]
+
+    def revenue(self):
+        return DailyRollup.objects.filter(organization=self.organization).aggregate(total=Sum('revenue'))['total'] or 0
+
+    def raise_price(self):
+        self.service.price = Decimal(5000)
+        self.service.save()
+
+    def test_price_change_keeps_booked_revenue(self):
+        self.raise_price()
+        self.assertEqual(self.revenue(), 3000)
+        self.assertEqual(set(Appointment.objects.values_list('price', flat=True)), {1000})
+
+    def test_delete_after_price_change(self):
+        self.raise_price()
+        self.appointments[0].delete()
+        self.assertEqual(self.revenue(), 2000)
+
+    def test_edit_after_price_change(self):
+        self.raise_price()
+        appointment = self.appointments[0]
+        appointment.status = 'cancelled'
+        appointment.save()
+        completed = DailyRollup.objects.filter(organization=self.organization, status='completed')
+        self.assertEqual(completed.aggregate(total=Sum('revenue'))['total'], 2000)
+        self.assertEqual(self.revenue(), 3000)
+        self.assertFalse(DailyRollup.objects.filter(revenue__lt=0).exists())
+
+    def test_new_booking_uses_current_price(self):
+        self.raise_price()
+        Appointment.objects.create(
+            customer=self.customer, service=self.service, organization=self.organization,
+            created_by=self.user, appointment_date=timezone.now() - timedelta(days=3),
+            duration=self.service.duration, status='completed',
+        )
+        self.assertEqual(self.revenue(), 8000)
+
+
+@patch('appointments.checks.staticfiles_storage', **{'exists.return_value': False})
+@patch('appointments.checks.finders.find', return_value=None)
+class StylesheetCheckTests(TestCase):
+    """Bundle Tailwind absent : erreur de check hors DEBUG, jamais de repli CDN silencieux"""
+
+    @override_settings(DEBUG=False)
+    def test_missing_bundle_is_an_error(self, find, storage):
+        self.assertEqual([error.id for error in checks.check_stylesheet(None)], ['appointments.E001'])
+
+    @override_settings(DEBUG=True)
+    def test_debug_allows_missing_bundle(self, find, storage):
+        self.assertEqual(checks.check_stylesheet(None), [])
+
+    @override_settings(DEBUG=False, STORAGES=PLAIN_STATIC)
+    def test_tag_never_falls_back_to_cdn(self, find, storage):
+        self.assertIn('appointments/css/app.css', app_stylesheet())
+
+
+class MergeCustomersTests(TestCase):
+    def test_merge_keeps_waitlist_entries(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'secret')
+        organization = create_organization(user)
+        target, duplicate = [
+            Customer.objects.create(first_name='Awa', last_name='Diallo', email=email,
+                                    organization=organization, created_by=user)
+            for email in ('awa@example.com', 'awa.diallo@example.com')
+        ]
+        service = Service.objects.create(name='Coupe', duration=timedelta(minutes=30), price=Decimal(1000),
+                                         organization=organization, created_by=user)
+        now = timezone.now()
+        entry = WaitlistEntry.objects.create(organization=organization, customer=duplicate, service=service,
+                                             window_start=now, window_end=now + timedelta(days=7), created_by=user)
+        duplicates.merge(target, [duplicate])
+        entry.refresh_from_db()
+        self.assertEqual(entry.customer_id, target.pk)
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class DuplicateScanTests(TestCase):
+    ROWS = {
+        1: ('Awa', 'Diallo', 'awa.diallo@example.com', '+221 77 123 45 67'),
+        2: ('DIALLO', 'Awa', 'awadiallo@example.com', ''),
+        3: ('Awa', 'Dialo', 'contact@example.com', '77 123 45 67'),
+        4: ('Moussa', 'Ndiaye', 'moussa@example.com', '+221 76 000 00 00'),
+        5: ('Mousa', 'Ndiaye', 'm.ndiaye@example.com', ''),
+    }
+
+    def test_pruning_keeps_the_exhaustive_result(self):
+        rows = {pk: duplicates.normalize(*fields) for pk, fields in self.ROWS.items()}
+        expected = []
+        for a, b in combinations(sorted(rows), 2):
+            value, reasons = duplicates.score(rows[a], rows[b])
+            if value >= 0.6:
+                expected.append((value, a, b, reasons))
+        expected.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+        self.assertEqual(duplicates.find_pairs(self.ROWS, 0.6), expected)
+        self.assertTrue(expected)
+
+    def test_page_reads_pairs_computed_by_the_worker(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'secret')
+        organization = create_organization(user)
+        for first_name, last_name, email, phone in self.ROWS.values():
+            Customer.objects.create(first_name=first_name, last_name=last_name, email=email, phone=phone,
+                                    organization=organization, created_by=user)
+        self.client.force_login(user)
+        self.assertContains(self.client.get('/customers/duplicates/'), 'Recherche des doublons en cours')
+        task = Task.objects.get(name=duplicates.scan_duplicates.task_name)
+        self.assertEqual(task.args, [organization.pk])
+
+        duplicates.scan_duplicates(organization.pk)
+        response = self.client.get('/customers/duplicates/')
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertContains(response, 'awa.diallo@example.com')
+        self.assertContains(response, 'Relancer la recherche')
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class SoftDeleteVisibilityTests(TestCase):
+    def test_appointments_of_deleted_customer_are_hidden(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'secret')
+        organization = create_organization(user)
+        customer = Customer.objects.create(first_name='Awa', last_name='Diallo', email='awa@example.com',
+                                           organization=organization, created_by=user)
+        service = Service.objects.create(name='Coupe', duration=timedelta(minutes=30), price=Decimal(1000),
+                                         organization=organization, created_by=user)
+        appointment = Appointment.objects.create(customer=customer, service=service, organization=organization,
+                                                 created_by=user, appointment_date=timezone.now() + timedelta(days=1),
+                                                 duration=service.duration)
+        self.client.force_login(user)
+        self.assertContains(self.client.get('/appointments/'), f'/appointments/{appointment.pk}/edit/')
+
+        customer.soft_delete()
+        self.assertFalse(Appointment.objects.filter(pk=appointment.pk).exists())
+        self.assertTrue(Appointment.all_objects.filter(pk=appointment.pk).exists())
+        self.assertNotContains(self.client.get('/appointments/'), f'/appointments/{appointment.pk}/edit/')
+        # Le masquage ne joint pas les clients et services à chaque lecture
+        self.assertNotIn('JOIN', str(Appointment.objects.all().query))
+
+    def test_admin_lists_soft_deleted_rows_with_estimated_count(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        organization = create_organization(admin_user)
+        customer = Customer.objects.create(first_name='Awa', last_name='Diallo', email='awa@example.com',
+                                           organization=organization, created_by=admin_user)
+        customer.soft_delete()
+        self.client.force_login(admin_user)
+        with patch('appointments.admin.estimate_row_count', return_value=250000):
+            response = self.client.get('/admin/appointments/customer/')
+        self.assertContains(response, 'awa@example.com')
+        self.assertEqual(response.context['cl'].paginator.count, 250000)
+
+
+class SearchCacheTests(TestCase):
+    def test_cache_hits_only_read(self):
+        prefix = search_cache.cache_prefix(987654)
+        awa = {'id': 1, 'name': 'Awa Diallo'}
+        search_cache.store(prefix, 'awa', {'appointments': [], 'customers': [(awa, ['Awa Diallo'])], 'services': []})
+        with patch.object(search_cache.cache, 'set') as cache_set:
+            self.assertEqual(search_cache.lookup(prefix, 'awa')['customers'], [awa])
+            self.assertEqual(search_cache.lookup(prefix, 'awa dia')['customers'], [awa])
+            self.assertEqual(search_cache.lookup(prefix, 'awa x')['customers'], [])
+        cache_set.assert_not_called()
+
+
+class CachedUserTests(TestCase):
+    def test_cached_user_is_an_independent_copy(self):
+        from .auth import EmailBackend, users
+
+        user = User.objects.create_user('owner', 'owner@example.com', 'secret')
+        users.clear()
+        backend = EmailBackend()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            first = backend.get_user(user.pk)
+            first.get_all_permissions()
+            second = backend.get_user(user.pk)
+        self.assertEqual(second.pk, user.pk)
+        self.assertIsNot(first, second)
+        self.assertFalse(hasattr(second, '_perm_cache'))
+
+
+class AuditHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'secret')
+        self.organization = create_organization(self.user)
+        self.customer = Customer.objects.create(first_name='Awa', last_name='Diallo', email='awa@example.com',
+                                                organization=self.organization, created_by=self.user)
+        self.service = Service.objects.create(name='Coupe', duration=timedelta(minutes=30), price=Decimal(1000),
+                                              organization=self.organization, created_by=self.user)
+        self.start = (timezone.now() + timedelta(days=2)).replace(microsecond=0)
+
+    def appointment(self, hours=0):
+        return Appointment.objects.create(customer=self.customer, service=self.service, organization=self.organization,
+                                          created_by=self.user, appointment_date=self.start + timedelta(hours=hours),
+                                          duration=self.service.duration)
+
+    def test_bulk_changes_are_recorded_per_appointment(self):
+        appointments = [self.appointment(hours=i) for i in range(3)]
+        selection = bulk.select(self.organization, ids=[a.pk for a in appointments])
+        bulk.shift(self.organization, selection, timedelta(days=1), self.user)
+        bulk.set_status(self.organization, selection, 'cancelled', self.user)
+        audit.flush()
+        for appointment in appointments:
+            changes = AppointmentChange.objects.filter(appointment_id=appointment.pk)
+            self.assertEqual(changes.count(), 2)
+            self.assertEqual({c.source for c in changes}, {'bulk'})
+            self.assertEqual({c.changed_by_id for c in changes}, {self.user.pk})
+            self.assertEqual({tuple(c.changes) for c in changes}, {('appointment_date',), ('status',)})
+
+    def test_waitlist_booking_is_recorded(self):
+        entry = WaitlistEntry.objects.create(
+            organization=self.organization, customer=self.customer, service=self.service, auto_book=True,
+            window_start=self.start - timedelta(hours=1), window_end=self.start + timedelta(hours=2),
+            created_by=self.user,
+        )
+        appointment = waitlist.book(entry, self.start, 'waiting')
+        audit.flush()
+        change = AppointmentChange.objects.get(appointment_id=appointment.pk)
+        self.assertEqual(change.source, 'waitlist')
+        self.assertIsNone(change.changed_by)
+        self.assertEqual(change.changes['service'], ['', 'Coupe'])
+
+
+class AuditFlushFailureTests(TransactionTestCase):
+    def setUp(self):
+        audit._buffer.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'secret')
+        self.organization = create_organization(self.owner)
+        customer = Customer.objects.create(first_name='Awa', last_name='Diallo', email='awa@example.com',
+                                           organization=self.organization, created_by=self.owner)
+        service = Service.objects.create(name='Coupe', duration=timedelta(minutes=30), price=Decimal(1000),
+                                         organization=self.organization, created_by=self.owner)
+        self.appointment = Appointment.objects.create(
+            customer=customer, service=service, organization=self.organization, created_by=self.owner,
+            appointment_date=timezone.now() + timedelta(days=1), duration=service.duration,
+        )
+
+    def change(self, user, status):
+        before = audit.snapshot(self.appointment)
+        self.appointment.status = status
+        self.appointment.save()
+        audit.record(self.appointment, before, user)
+
+    def test_deleted_author_does_not_block_the_buffer(self):
+        editor = User.objects.create_user('editor', 'editor@example.com', 'secret')
+        self.change(editor, 'confirmed')
+        User.objects.filter(pk=editor.pk).delete()
+        self.assertEqual(audit.flush(), 1)
+        self.assertIsNone(AppointmentChange.objects.get().changed_by)
+        self.change(self.owner, 'completed')
+        self.assertEqual(audit.flush(), 1)
+        self.assertEqual(audit._buffer, [])
+
+    @override_settings(AUDIT_BUFFER_MAX=2)
+    def test_buffer_is_capped_while_the_database_refuses_writes(self):
+        with patch.object(AppointmentChange.objects, 'bulk_create', side_effect=OperationalError('locked')), \
+                self.assertLogs('appointments.audit', 'ERROR') as logs:
+            for status in ('confirmed', 'completed', 'no_show'):
+                self.change(self.owner, status)
+                self.assertEqual(audit.flush(), 0)
+        self.assertEqual(len(audit._buffer), 2)
+        self.assertIn('tampon plein', logs.output[-1])
+        self.assertEqual(audit.flush(), 2)
+        self.assertEqual(AppointmentChange.objects.count(), 2)
+
+
+def forged_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+class ApiCursorTests(TransactionTestCase):
+    BAD_CURSORS = [forged_cursor(['abc', 1]), forged_cursor([[1], 1]), forged_cursor([None, None]),
+                   forged_cursor([1]), 'pas-un-curseur']
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'secret')
+        self.organization = create_organization(self.user)
+        customer = Customer.objects.create(first_name='Awa', last_name='Diallo', email='awa@example.com',
+                                           organization=self.organization, created_by=self.user)
+        service = Service.objects.create(name='Coupe', duration=timedelta(minutes=30), price=Decimal(1000),
+                                         organization=self.organization, created_by=self.user)
+        start = timezone.now() + timedelta(days=1)
+        # Deux rendez-vous à la même heure : le curseur départage par identifiant
+        self.appointments = [
+            Appointment.objects.create(customer=customer, service=service, organization=self.organization,
+                                       created_by=self.user, appointment_date=start + timedelta(hours=i // 2),
+                                       duration=service.duration)
+            for i in range(5)
+        ]
+
+    def test_cursor_walks_every_page_once(self):
+        seen, params = [], {'limit': '2'}
+        while True:
+            page = api.list_resource(self.organization, 'appointments', params)
+            seen += [item['id'] for item in page['results']]
+            if not page['next']:
+                break
+            params['cursor'] = page['next']
+        self.assertEqual(seen, [appointment.pk for appointment in self.appointments])
+
+    def test_bad_cursor_is_a_client_error(self):
+        self.client.force_login(self.user)
+        for cursor in self.BAD_CURSORS:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/v1/appointments/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+
+    def test_bad_cursor_fails_only_its_batch_subrequest(self):
+        self.client.force_login(self.user)
+        body = {'requests': [
+            {'id': 'bad', 'resource': 'appointments', 'params': {'cursor': self.BAD_CURSORS[0]}},
+            {'id': 'good', 'resource': 'services'},
+        ]}
+        response = self.client.post('/api/v1/batch/', json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        statuses = {sub['id']: sub['status'] for sub in response.json()['responses']}
+        self.assertEqual(statuses, {'bad': 400, 'good': 200})
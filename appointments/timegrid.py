@@ -0,0 +1,142 @@
+"""
+Disposition des rendez-vous en grille horaire (vues semaine et jour du calendrier).
+
+Pour chaque jour, les rendez-vous qui se chevauchent sont placés côte à côte
+en colonnes : tri par début, puis balayage avec un tas des fins en cours,
+soit O(n log n). Une colonne libérée est réutilisée (la plus à gauche
+d'abord). Un groupe de chevauchement se ferme quand plus aucun rendez-vous
+n'est en cours ; ses rendez-vous se partagent alors la largeur du jour en
+autant de colonnes que le groupe en a utilisé.
+
+Le placement (``Placement``) ne contient que des clés et des minutes : il est
+mis en cache avec la version de données de l'organisation (``cache_versions``),
+comme les autres données du calendrier. ``attach_blocks`` en déduit la
+géométrie (pourcentages) que les gabarits appliquent telle quelle.
+"""
+import heapq
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .cache_versions import get_data_version
+
+DAY_MINUTES = 24 * 60
+
+
+@dataclass(frozen=True)
+class Placement:
+    # (is_archived, pk) : les rendez-vous archivés ont leur propre table
+    key: tuple
+    # Minutes depuis minuit, heure locale
+    start: int
+    end: int
+    column: int
+    columns: int
+
+
+@dataclass(frozen=True)
+class Block:
+    """Rendez-vous positionné dans la colonne de son jour (valeurs CSS en %)"""
+    appointment: object
+    top: str
+    height: str
+    left: str
+    width: str
+
+    @property
+    def style(self):
+        return f'top: {self.top}%; height: {self.height}%; left: {self.left}%; width: {self.width}%;'
+
+
+def appointment_key(appointment):
+    return (appointment.is_archived, appointment.pk)
+
+
+def minutes(appointment):
+    """``(début, fin)`` en minutes depuis minuit, fin bornée à minuit"""
+    start = timezone.localtime(appointment.appointment_date)
+    start = start.hour * 60 + start.minute
+    duration = max(appointment.duration or timedelta(0), timedelta(minutes=settings.TIMEGRID_MIN_DURATION))
+    return start, min(start + -(-duration // timedelta(minutes=1)), DAY_MINUTES)
+
+
+def layout_day(items):
+    """Placements des ``items`` ``(clé, début, fin)`` d'un jour, triés par début"""
+    placements = []
+    active = []   # tas (fin, colonne) des rendez-vous en cours
+    free = []     # tas des colonnes libérées dans le groupe courant
+    group = []    # (clé, début, fin, colonne) du groupe de chevauchement courant
+    width = 0
+
+    for key, start, end in sorted(items, key=lambda item: (item[1], item[2], item[0])):
+        while active and active[0][0] <= start:
+            heapq.heappush(free, heapq.heappop(active)[1])
+        if not active and group:
+            placements += [Placement(*entry, width) for entry in group]
+            group, free, width = [], [], 0
+        if free:
+            column = heapq.heappop(free)
+        else:
+            column, width = width, width + 1
+        heapq.heappush(active, (end, column))
+        group.append((key, start, end, column))
+
+    placements += [Placement(*entry, width) for entry in group]
+    return placements
+
+
+def day_placements(organization_id, days, appointments_by_date):
+    """``{jour: [Placement, ...]}``, en cache tant que les données de l'organisation n'ont pas changé"""
+    key = (f'appointme:timegrid:{organization_id}:{get_data_version(organization_id)}'
+           f':{days[0]:%Y%m%d}:{len(days)}')
+    placements = cache.get(key)
+    if placements is None:
+        placements = {
+            day: layout_day([(appointment_key(a), *minutes(a)) for a in appointments_by_date.get(day, [])])
+            for day in days
+        }
+        cache.set(key, placements, settings.TIMEGRID_CACHE_TTL)
+    return placements
+
+
+def hour_range(placements, business_hours):
+    """Heures affichées : ouverture la plus tôt à fermeture la plus tardive,
+    élargies aux rendez-vous en dehors"""
+    opened = [hours for hours in business_hours if hours.is_open]
+    first, last = settings.TIMEGRID_DEFAULT_HOURS
+    if opened:
+        first = min(hours.open_time.hour for hours in opened)
+        last = max(hours.close_time.hour + (hours.close_time.minute > 0) for hours in opened)
+    for day in placements.values():
+        for placement in day:
+            first = min(first, placement.start // 60)
+            last = max(last, -(-placement.end // 60))
+    return first, max(last, first + 1)
+
+
+def _percent(value):
+    return f'{value:.4f}'
+
+
+def attach_blocks(days_data, placements, first_hour, last_hour):
+    """Ajoute ``blocks`` (liste de ``Block``) à chaque jour de ``days_data``"""
+    origin, span = first_hour * 60, (last_hour - first_hour) * 60
+    for day in days_data:
+        by_key = {appointment_key(a): a for a in day['appointments']}
+        day_layout = placements.get(day['date'], [])
+        if set(by_key) != {placement.key for placement in day_layout}:
+            # Entrée de cache antérieure à une écriture non versionnée : on recalcule
+            day_layout = layout_day([(key, *minutes(a)) for key, a in by_key.items()])
+        day['blocks'] = [
+            Block(
+                appointment=by_key[placement.key],
+                top=_percent(100 * (placement.start - origin) / span),
+                height=_percent(100 * (placement.end - placement.start) / span),
+                left=_percent(100 * placement.column / placement.columns),
+                width=_percent(100 / placement.columns),
+            )
+            for placement in day_layout
+        ]
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Abandonne un fichier dès qu'il dépasse ``MAX_UPLOAD_SIZE``.
+
+    Placé en tête de ``FILE_UPLOAD_HANDLERS`` : les octets en trop ne sont ni
+    gardés en mémoire ni écrits sur disque, et le nom du champ rejeté est
+    noté dans ``request.rejected_uploads`` pour que la vue puisse le signaler.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_UPLOAD_SIZE:
+            if self.request is not None:
+                rejected = getattr(self.request, 'rejected_uploads', [])
+                rejected.append(self.field_name)
+                self.request.rejected_uploads = rejected
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
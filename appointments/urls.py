@@ -14,9 +14,14 @@ urlpatterns = [
     path('calendar/', views.calendar_view, name='calendar'),
     path('appointments/', views.appointments_view, name='appointments'),
     path('customers/', views.customers_view, name='customers'),
+    path('analytics/', views.analytics_view, name='analytics'),
+    path('analytics/occupancy/', views.occupancy_view, name='occupancy'),
     
     # Gestion des rendez-vous
     path('appointments/create/', views.create_appointment_view, name='create_appointment'),
+    path('appointments/bulk/', views.bulk_appointments_view, name='bulk_appointments'),
+    path('waitlist/', views.waitlist_view, name='waitlist'),
+    path('waitlist/<int:entry_id>/', views.waitlist_entry_view, name='waitlist_entry'),
     path('appointments/<int:appointment_id>/edit/', views.edit_appointment_view, name='edit_appointment'),
     path('appointments/<int:appointment_id>/delete/', views.delete_appointment_view, name='delete_appointment'),
     
@@ -24,6 +29,8 @@ urlpatterns = [
     path('customers/create/', views.create_customer_view, name='create_customer'),
     path('customers/<int:customer_id>/edit/', views.edit_customer_view, name='edit_customer'),
     path('customers/<int:customer_id>/delete/', views.delete_customer_view, name='delete_customer'),
+    path('customers/duplicates/', views.duplicate_customers_view, name='duplicate_customers'),
+    path('customers/merge/', views.merge_customers_view, name='merge_customers'),
     
     # Gestion des services
     path('services/', views.services_view, name='services'),
@@ -34,10 +41,16 @@ urlpatterns = [
     # API
     path('api/appointments/by-date/', views.api_appointments_by_date, name='api_appointments_by_date'),
     path('api/search/', views.global_search, name='global_search'),
+    path('api/analytics/', views.api_analytics, name='api_analytics'),
+    path('api/v1/batch/', views.api_v1_batch, name='api_v1_batch'),
+    path('api/v1/<str:resource>/', views.api_v1_list, name='api_v1_list'),
     
     # Header functionality
     path('notifications/', views.notifications_view, name='notifications'),
     path('profile/', views.profile_view, name='profile'),
     path('password/change/', auth_views.PasswordChangeView.as_view(template_name='appointments/password_change_form.html', success_url='/password/change/done/'), name='password_change'),
     path('password/change/done/', auth_views.PasswordChangeDoneView.as_view(template_name='appointments/password_change_done.html'), name='password_change_done'),
+    
+    # Supervision
+    path('metrics', views.metrics_view, name='metrics'),
 ]
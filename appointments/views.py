@@ -3,15 +3,37 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseForbidden
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
 import calendar as pycalendar
-from django.db.models import Q, Count
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Count, F
+from django.core.paginator import Paginator
 from datetime import datetime, timedelta
+import asyncio
 import json
 
-from .models import Customer, Service, Appointment, BusinessHours, Staff
+from asgiref.sync import sync_to_async
+
+from .models import Customer, Service, Appointment, BusinessHours, Staff, WaitlistEntry
+from . import metrics
+from .async_db import run_query
+from . import search_cache
+from .images import validate_avatar, process_avatar
+from .tasks import defer
+from .archive import appointments_with_archive
+from . import rollups
+from .occupancy import occupancy
+from .duplicates import current_scan, merge as merge_customers
+from .tenancy import create_organization, current_organization
+from . import api, audit, bulk, timegrid, waitlist
+from .auth import users_with_email
+from .catalog import get_catalog
+from .jinja2_env import render_hot
 
 
 def login_view(request):
@@ -23,12 +45,7 @@ def login_view(request):
         email = request.POST.get('email')
         password = request.POST.get('password')
         
-        # Django utilise username par défaut, mais on peut chercher par email
-        try:
-            user = User.objects.get(email=email)
-            user = authenticate(request, username=user.username, password=password)
-        except User.DoesNotExist:
-            user = None
+        user = authenticate(request, email=email, password=password)
         
         if user is not None:
             login(request, user)
@@ -56,22 +73,30 @@ def register_view(request):
             messages.error(request, 'Les mots de passe ne correspondent pas.')
             return render(request, 'appointments/register.html')
         
-        if User.objects.filter(email=email).exists():
+        if users_with_email(email).exists():
             messages.error(request, 'Un compte avec cet email existe déjà.')
             return render(request, 'appointments/register.html')
         
-        # Créer l'utilisateur
-        user = User.objects.create_user(
-            username=email,
-            email=email,
-            password=password,
-            first_name=first_name,
-            last_name=last_name
-        )
+        try:
+            with transaction.atomic():
+                # Créer l'utilisateur
+                user = User.objects.create_user(
+                    username=email,
+                    email=email,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name
+                )
+        except IntegrityError:
+            # Inscription concurrente avec le même email (index auth_user_email_ci)
+            messages.error(request, 'Un compte avec cet email existe déjà.')
+            return render(request, 'appointments/register.html')
         
-        # Créer le profil staff
+        # Créer son organisation et le profil staff
+        organization = create_organization(user)
         Staff.objects.create(
             user=user,
+            organization=organization,
             phone=phone
         )
         
@@ -98,33 +123,33 @@ def dashboard_view(request):
     last_week_start = start_of_week - timedelta(days=7)
     last_week_end = end_of_week - timedelta(days=7)
     
-    # Statistiques (filtrées par créateur)
+    # Statistiques de l'organisation
     today_appointments = Appointment.objects.filter(
         appointment_date__date=today,
-        created_by=request.user
+        organization=request.organization
     ).count()
     
     yesterday_appointments = Appointment.objects.filter(
         appointment_date__date=yesterday,
-        created_by=request.user
+        organization=request.organization
     ).count()
     
     pending_appointments = Appointment.objects.filter(
         status='scheduled',
-        created_by=request.user
+        organization=request.organization
     ).count()
     
     week_appointments = Appointment.objects.filter(
         appointment_date__date__range=[start_of_week, end_of_week],
-        created_by=request.user
+        organization=request.organization
     ).count()
     
     last_week_appointments = Appointment.objects.filter(
         appointment_date__date__range=[last_week_start, last_week_end],
-        created_by=request.user
+        organization=request.organization
     ).count()
     
-    total_customers = Customer.objects.filter(created_by=request.user).count()
+    total_customers = Customer.objects.filter(organization=request.organization).count()
     
     # Calcul des variations
     today_vs_yesterday = today_appointments - yesterday_appointments
@@ -133,16 +158,16 @@ def dashboard_view(request):
     if last_week_appointments > 0:
         week_percentage = round((week_vs_last_week / last_week_appointments) * 100)
     
-    # Rendez-vous récents (filtrés par créateur)
+    # Rendez-vous récents de l'organisation
     recent_appointments = Appointment.objects.filter(
         appointment_date__date=today,
-        created_by=request.user
+        organization=request.organization
     ).select_related('customer', 'service').order_by('appointment_date')[:5]
     
-    # Rendez-vous à venir (filtrés par créateur)
+    # Rendez-vous à venir de l'organisation
     upcoming_appointments = Appointment.objects.filter(
         appointment_date__gte=timezone.now(),
-        created_by=request.user
+        organization=request.organization
     ).select_related('customer', 'service').order_by('appointment_date')[:5]
     
     context = {
@@ -202,17 +227,19 @@ def calendar_view(request):
         next_date = first_day.replace(year=next_month_year[0], month=next_month_year[1], day=1)
         days = [first_day.replace(day=d) for d in range(1, last_day_num + 1)]
 
-    # Récupérer les rendez-vous dans l'intervalle (filtrés par créateur)
-    appointments = Appointment.objects.filter(
+    # Récupérer les rendez-vous de l'organisation dans l'intervalle,
+    # archive comprise pour les périodes anciennes
+    appointments = appointments_with_archive(
+        start_date,
         appointment_date__date__gte=start_date,
         appointment_date__date__lte=end_date,
-        created_by=request.user
-    ).select_related('customer', 'service')
+        organization=request.organization
+    )
 
-    # Grouper par date
+    # Grouper par date (locale, comme le filtre __date)
     appointments_by_date = {}
     for appointment in appointments:
-        date_key = appointment.appointment_date.date()
+        date_key = timezone.localtime(appointment.appointment_date).date()
         appointments_by_date.setdefault(date_key, []).append(appointment)
 
     # Libellés d'en-tête
@@ -227,10 +254,19 @@ def calendar_view(request):
             'appointments': appts,
         })
 
+    # Semaine et jour : grille horaire, rendez-vous simultanés côte à côte
+    grid_hours = []
+    if mode in ('week', 'day'):
+        placements = timegrid.day_placements(request.organization.pk, days, appointments_by_date)
+        first_hour, last_hour = timegrid.hour_range(placements, get_catalog(request.organization).business_hours)
+        timegrid.attach_blocks(days_data, placements, first_hour, last_hour)
+        grid_hours = [f'{hour:02d}:00' for hour in range(first_hour, last_hour)]
+
     context = {
         'mode': mode,
         'ref_date': ref_date,
         'days_data': days_data,
+        'grid_hours': grid_hours,
         'current_month_label': current_month_label,
         'current_year': ref_date.year,
         'current_month': ref_date.strftime('%B'),
@@ -239,40 +275,118 @@ def calendar_view(request):
         'today_date': now.strftime('%Y-%m-%d'),
     }
 
-    return render(request, 'appointments/calendar.html', context)
+    return render_hot(request, 'appointments/calendar.html', context)
 
 
 @login_required
 def appointments_view(request):
     """Vue de gestion des rendez-vous"""
-    appointments = Appointment.objects.filter(created_by=request.user).select_related('customer', 'service').order_by('-appointment_date')
-    
+    filters = {'organization': request.organization}
+    conditions = []
+
     # Filtres
     status_filter = request.GET.get('status')
     if status_filter:
-        appointments = appointments.filter(status=status_filter)
+        filters['status'] = status_filter
     
     search = request.GET.get('search')
     if search:
-        appointments = appointments.filter(
+        conditions.append(
             Q(customer__first_name__icontains=search) |
             Q(customer__last_name__icontains=search) |
             Q(customer__email__icontains=search) |
             Q(service__name__icontains=search)
         )
+
+    if request.GET.get('archives'):
+        # Inclut les rendez-vous archivés (plus d'un an)
+        appointments = appointments_with_archive(None, *conditions, **filters)
+        appointments.reverse()
+    else:
+        appointments = Appointment.objects.filter(*conditions, **filters).select_related('customer', 'service').order_by('-appointment_date')
     
     context = {
         'appointments': appointments,
         'status_choices': Appointment.STATUS_CHOICES,
+        'services': get_catalog(request.organization).active_services,
     }
     
-    return render(request, 'appointments/appointments.html', context)
+    return render_hot(request, 'appointments/appointments.html', context)
+
+
+@login_required
+def bulk_appointments_view(request):
+    """Actions groupées : statut, décalage ou service, sur une sélection ou une période"""
+    if request.method != 'POST':
+        return redirect('appointments')
+    back = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(back, allowed_hosts={request.get_host()}):
+        back = 'appointments'
+
+    try:
+        if request.POST.get('scope') == 'range':
+            start = datetime.strptime(request.POST.get('start', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.POST.get('end') or request.POST.get('start', ''), '%Y-%m-%d').date()
+            if start > end:
+                raise ValueError('start > end')
+            appointments = bulk.select(request.organization, start=start, end=end)
+        else:
+            ids = [int(pk) for pk in request.POST.getlist('ids')]
+            if not ids:
+                messages.error(request, 'Aucun rendez-vous sélectionné.')
+                return redirect(back)
+            appointments = bulk.select(request.organization, ids=ids)
+    except ValueError:
+        messages.error(request, 'Période invalide.')
+        return redirect(back)
+
+    action = request.POST.get('action')
+    if action == 'status':
+        status = request.POST.get('status')
+        if status not in dict(Appointment.STATUS_CHOICES):
+            messages.error(request, 'Statut invalide.')
+            return redirect(back)
+        count = bulk.set_status(request.organization, appointments, status, request.user)
+    elif action == 'shift':
+        try:
+            offset = timedelta(days=int(request.POST.get('shift_days') or 0),
+                               minutes=int(request.POST.get('shift_minutes') or 0))
+        except ValueError:
+            messages.error(request, 'Décalage invalide.')
+            return redirect(back)
+        if not offset:
+            messages.error(request, 'Indiquez un décalage.')
+            return redirect(back)
+        count = bulk.shift(request.organization, appointments, offset, request.user)
+    elif action == 'service':
+        service = Service.objects.filter(
+            pk=request.POST.get('service') or None, organization=request.organization,
+        ).first()
+        if service is None:
+            messages.error(request, 'Service introuvable.')
+            return redirect(back)
+        count = bulk.reassign_service(request.organization, appointments, service, request.user)
+    else:
+        messages.error(request, 'Action inconnue.')
+        return redirect(back)
+
+    messages.success(request, f'{count} rendez-vous modifié(s).')
+    return redirect(back)
+
+
+CUSTOMER_SORTS = {
+    'name': ['last_name', 'first_name'],
+    'last_visit': [F('last_visit').desc(nulls_last=True)],
+    'next_appointment': [F('next_appointment').asc(nulls_last=True)],
+    'visits': ['-visit_count'],
+    'spend': ['-lifetime_spend'],
+}
 
 
 @login_required
 def customers_view(request):
     """Vue de gestion des clients"""
-    customers = Customer.objects.filter(created_by=request.user).order_by('last_name', 'first_name')
+    customers = Customer.objects.filter(organization=request.organization)
     
     # Recherche
     search = request.GET.get('search')
@@ -283,11 +397,35 @@ def customers_view(request):
             Q(email__icontains=search)
         )
     
+    # Filtres sur les statistiques dénormalisées (voir customer_stats)
+    segment = request.GET.get('segment', '')
+    if segment == 'upcoming':
+        customers = customers.filter(next_appointment__isnull=False)
+    elif segment == 'inactive':
+        threshold = timezone.now() - timedelta(days=settings.CUSTOMER_INACTIVE_DAYS)
+        customers = customers.filter(visit_count__gt=0, last_visit__lt=threshold)
+    elif segment == 'never':
+        customers = customers.filter(visit_count=0)
+    
+    sort = request.GET.get('sort', 'name')
+    if sort not in CUSTOMER_SORTS:
+        sort = 'name'
+    customers = customers.order_by(*CUSTOMER_SORTS[sort], 'pk')
+    
+    paginator = Paginator(customers, settings.CUSTOMERS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    
+    params = request.GET.copy()
+    params.pop('page', None)
     context = {
-        'customers': customers,
+        'customers': page,
+        'page': page,
+        'sort': sort,
+        'segment': segment,
+        'query_string': params.urlencode(),
     }
     
-    return render(request, 'appointments/customers.html', context)
+    return render_hot(request, 'appointments/customers.html', context)
 
 
 @login_required
@@ -301,8 +439,10 @@ def create_appointment_view(request):
         notes = request.POST.get('notes', '')
         
         try:
-            customer = Customer.objects.get(id=customer_id)
-            service = Service.objects.get(id=service_id)
+            customer = Customer.objects.get(id=customer_id, organization=request.organization)
+            service = get_catalog(request.organization).service(service_id)
+            if service is None:
+                raise Service.DoesNotExist
             
             # Combiner date et heure
             datetime_str = f"{appointment_date} {appointment_time}"
@@ -311,10 +451,12 @@ def create_appointment_view(request):
             
             appointment = Appointment.objects.create(
                 customer=customer,
-                service=service,
+                service_id=service.id,
                 appointment_date=appointment_datetime,
                 duration=service.duration,
+                price=service.price,
                 notes=notes,
+                organization=request.organization,
                 created_by=request.user
             )
             
@@ -326,8 +468,8 @@ def create_appointment_view(request):
         except ValueError:
             messages.error(request, 'Format de date/heure invalide.')
     
-    customers = Customer.objects.filter(created_by=request.user).order_by('last_name', 'first_name')
-    services = Service.objects.filter(is_active=True, created_by=request.user)
+    customers = Customer.objects.filter(organization=request.organization).order_by('last_name', 'first_name')
+    services = get_catalog(request.organization).active_services
 
     # Pré-remplir la date depuis la query string si fournie
     default_date = request.GET.get('date') or ''
@@ -346,11 +488,19 @@ def create_appointment_view(request):
 @login_required
 def edit_appointment_view(request, appointment_id):
     """Vue de modification de rendez-vous"""
-    appointment = get_object_or_404(Appointment, id=appointment_id, created_by=request.user)
+    appointment = get_object_or_404(Appointment.objects.select_related('customer'),
+                                    id=appointment_id, organization=request.organization)
     
     if request.method == 'POST':
-        appointment.customer_id = request.POST.get('customer')
-        appointment.service_id = request.POST.get('service')
+        before = audit.snapshot(appointment)
+        appointment.customer = get_object_or_404(Customer, id=request.POST.get('customer'), organization=request.organization)
+        service = get_catalog(request.organization).service(request.POST.get('service'))
+        if service is None:
+            raise Http404('Service introuvable')
+        if service.id != appointment.service_id:
+            # Nouveau service : tarif du jour ; sinon le prix réservé est conservé
+            appointment.price = service.price
+        appointment.service_id = service.id
         appointment_date = request.POST.get('appointment_date')
         appointment_time = request.POST.get('appointment_time')
         appointment.status = request.POST.get('status')
@@ -363,20 +513,22 @@ def edit_appointment_view(request, appointment_id):
             appointment.appointment_date = timezone.make_aware(appointment_datetime)
             
             appointment.save()
+            audit.record(appointment, before, request.user)
             messages.success(request, 'Rendez-vous modifié avec succès.')
             return redirect('appointments')
             
         except ValueError:
             messages.error(request, 'Format de date/heure invalide.')
     
-    customers = Customer.objects.filter(created_by=request.user).order_by('last_name', 'first_name')
-    services = Service.objects.filter(is_active=True, created_by=request.user)
+    customers = Customer.objects.filter(organization=request.organization).order_by('last_name', 'first_name')
+    services = get_catalog(request.organization).active_services
     
     context = {
         'appointment': appointment,
         'customers': customers,
         'services': services,
         'status_choices': Appointment.STATUS_CHOICES,
+        'history': audit.history(appointment),
     }
     
     return render(request, 'appointments/edit_appointment.html', context)
@@ -385,7 +537,7 @@ def edit_appointment_view(request, appointment_id):
 @login_required
 def delete_appointment_view(request, appointment_id):
     """Vue de suppression de rendez-vous"""
-    appointment = get_object_or_404(Appointment, id=appointment_id, created_by=request.user)
+    appointment = get_object_or_404(Appointment, id=appointment_id, organization=request.organization)
     
     if request.method == 'POST':
         appointment.delete()
@@ -412,6 +564,7 @@ def create_customer_view(request):
                 email=email,
                 phone=phone,
                 address=address,
+                organization=request.organization,
                 created_by=request.user
             )
             messages.success(request, 'Client créé avec succès.')
@@ -425,7 +578,7 @@ def create_customer_view(request):
 @login_required
 def edit_customer_view(request, customer_id):
     """Vue de modification de client"""
-    customer = get_object_or_404(Customer, id=customer_id, created_by=request.user)
+    customer = get_object_or_404(Customer, id=customer_id, organization=request.organization)
     
     if request.method == 'POST':
         customer.first_name = request.POST.get('first_name')
@@ -447,20 +600,141 @@ def edit_customer_view(request, customer_id):
 @login_required
 def delete_customer_view(request, customer_id):
     """Vue de suppression de client"""
-    customer = get_object_or_404(Customer, id=customer_id, created_by=request.user)
+    customer = get_object_or_404(Customer, id=customer_id, organization=request.organization)
     
     if request.method == 'POST':
-        customer.delete()
+        # Suppression logique : rendez-vous et rappels sont purgés par le worker
+        customer.soft_delete()
         messages.success(request, 'Client supprimé avec succès.')
         return redirect('customers')
     
     return render(request, 'appointments/delete_customer.html', {'customer': customer})
 
 
-# API Views pour AJAX
+@login_required
+def duplicate_customers_view(request):
+    """Vue des clients probablement en double (paires calculées par le worker)"""
+    scan = current_scan(request.organization, refresh=request.method == 'POST')
+    if request.method == 'POST':
+        messages.success(request, 'Recherche des doublons relancée.')
+        return redirect('duplicate_customers')
+    ids = {pk for _, a, b, _ in scan.pairs for pk in (a, b)}
+    # Les clients fusionnés ou supprimés depuis la recherche sont écartés
+    customers = Customer.objects.filter(organization=request.organization).in_bulk(ids)
+    pairs = [
+        # Chaque client de la paire, avec l'autre en doublon à fusionner
+        {'score': round(score * 100), 'reasons': reasons,
+         'sides': [(customers[a], customers[b]), (customers[b], customers[a])]}
+        for score, a, b, reasons in scan.pairs
+        if a in customers and b in customers
+    ]
+    context = {'pairs': pairs[:settings.DUPLICATE_PAGE_SIZE], 'scan': scan}
+    return render(request, 'appointments/duplicate_customers.html', context)
+
+
+@login_required
+def merge_customers_view(request):
+    """Fusionne un doublon dans le client conservé"""
+    if request.method != 'POST':
+        return redirect('duplicate_customers')
+    target = get_object_or_404(Customer, id=request.POST.get('target'), organization=request.organization)
+    duplicate = get_object_or_404(Customer, id=request.POST.get('duplicate'), organization=request.organization)
+    if target.pk == duplicate.pk:
+        messages.error(request, 'Un client ne peut pas être fusionné avec lui-même.')
+    else:
+        moved = merge_customers(target, [duplicate])
+        messages.success(request, f'{duplicate.full_name} fusionné dans {target.full_name} ({moved} rendez-vous rattaché(s)).')
+    return redirect('duplicate_customers')
+
+
+@login_required
+def waitlist_view(request):
+    """Liste d'attente : ajout d'une entrée et suivi des créneaux proposés"""
+    if request.method == 'POST':
+        try:
+            customer = Customer.objects.get(id=request.POST.get('customer'), organization=request.organization)
+            service = Service.objects.get(id=request.POST.get('service'), organization=request.organization)
+            window_start = timezone.make_aware(datetime.strptime(
+                f"{request.POST.get('start_date')} {request.POST.get('start_time') or '00:00'}", '%Y-%m-%d %H:%M'))
+            window_end = timezone.make_aware(datetime.strptime(
+                f"{request.POST.get('end_date')} {request.POST.get('end_time') or '23:59'}", '%Y-%m-%d %H:%M'))
+            if window_end - window_start < service.duration:
+                raise ValueError('fenêtre trop courte')
+            WaitlistEntry.objects.create(
+                organization=request.organization,
+                customer=customer,
+                service=service,
+                window_start=window_start,
+                window_end=window_end,
+                auto_book=request.POST.get('auto_book') == 'on',
+                notes=request.POST.get('notes', ''),
+                created_by=request.user
+            )
+            messages.success(request, "Client ajouté à la liste d'attente.")
+            return redirect('waitlist')
+        except (Customer.DoesNotExist, Service.DoesNotExist):
+            messages.error(request, 'Client ou service introuvable.')
+        except ValueError:
+            messages.error(request, 'Fenêtre horaire invalide.')
+
+    entries = (WaitlistEntry.objects
+               .filter(organization=request.organization, status__in=['waiting', 'offered'])
+               .select_related('customer', 'service')
+               .order_by('-status', 'created_at'))
+    context = {
+        'entries': entries,
+        'customers': Customer.objects.filter(organization=request.organization).order_by('last_name', 'first_name'),
+        'services': get_catalog(request.organization).active_services,
+        'now': timezone.now(),
+    }
+    return render(request, 'appointments/waitlist.html', context)
+
+
+@login_required
+def waitlist_entry_view(request, entry_id):
+    """Accepte ou refuse le créneau proposé, ou retire l'entrée"""
+    entry = get_object_or_404(WaitlistEntry.objects.select_related('service'), id=entry_id,
+                              organization=request.organization)
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'accept':
+            if waitlist.accept_offer(entry, request.user):
+                messages.success(request, 'Rendez-vous réservé.')
+            else:
+                messages.error(request, "Le créneau n'est plus disponible.")
+                waitlist.decline_offer(entry)
+        elif action == 'decline':
+            waitlist.decline_offer(entry)
+            messages.success(request, 'Créneau refusé, le client reste en attente.')
+        elif action == 'remove':
+            WaitlistEntry.objects.filter(pk=entry.pk).update(status='cancelled')
+            messages.success(request, "Client retiré de la liste d'attente.")
+    return redirect('waitlist')
+
+
+# Vues asynchrones : servies nativement via ASGI (appointme_project.asgi), les
+# sous-requêtes indépendantes tournent en parallèle et sont interrompues côté
+# base si le client abandonne la requête.
+def _appointments_for_date(organization, date):
+    appointments = appointments_with_archive(date, appointment_date__date=date, organization=organization)
+
+    data = []
+    for appointment in appointments:
+        data.append({
+            'id': appointment.id,
+            'customer': appointment.customer.full_name,
+            'service': appointment.service.name,
+            'time': appointment.appointment_date.strftime('%H:%M'),
+            'status': appointment.status,
+            'status_display': appointment.get_status_display(),
+            'archived': appointment.is_archived,
+        })
+    return data
+
+
 @login_required
 @csrf_exempt
-def api_appointments_by_date(request):
+async def api_appointments_by_date(request):
     """API pour récupérer les rendez-vous d'une date donnée"""
     date_str = request.GET.get('date')
     if not date_str:
@@ -468,29 +742,87 @@ def api_appointments_by_date(request):
     
     try:
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        appointments = Appointment.objects.filter(
-            appointment_date__date=date,
-            created_by=request.user
-        ).select_related('customer', 'service')
-        
-        data = []
-        for appointment in appointments:
-            data.append({
-                'id': appointment.id,
-                'customer': appointment.customer.full_name,
-                'service': appointment.service.name,
-                'time': appointment.appointment_date.strftime('%H:%M'),
-                'status': appointment.status,
-                'status_display': appointment.get_status_display(),
-            })
-        
-        return JsonResponse({'appointments': data})
     except ValueError:
         return JsonResponse({'error': 'Format de date invalide'}, status=400)
 
+    organization = await sync_to_async(current_organization)(request)
+    data = await run_query(_appointments_for_date, organization, date, view='api_appointments_by_date')
+    return JsonResponse({'appointments': data})
+
+
+def _search_appointments(organization, query):
+    """Recherche dans les rendez-vous de l'organisation"""
+    appointments = Appointment.objects.filter(
+        Q(customer__first_name__icontains=query) |
+        Q(customer__last_name__icontains=query) |
+        Q(customer__email__icontains=query) |
+        Q(service__name__icontains=query) |
+        Q(notes__icontains=query),
+        organization=organization
+    ).select_related('customer', 'service')[:search_cache.SEARCH_LIMIT]
+
+    results = []
+    for appointment in appointments:
+        results.append(({
+            'id': appointment.id,
+            'customer': appointment.customer.full_name,
+            'service': appointment.service.name,
+            'date': appointment.appointment_date.strftime('%d/%m/%Y %H:%M'),
+            'status': appointment.get_status_display(),
+            'url': f'/appointments/{appointment.id}/edit/'
+        }, (
+            appointment.customer.first_name,
+            appointment.customer.last_name,
+            appointment.customer.email,
+            appointment.service.name,
+            appointment.notes or '',
+        )))
+    return results
+
+
+def _search_customers(organization, query):
+    """Recherche dans les clients de l'organisation"""
+    customers = Customer.objects.filter(
+        Q(first_name__icontains=query) |
+        Q(last_name__icontains=query) |
+        Q(email__icontains=query),
+        organization=organization
+    )[:search_cache.SEARCH_LIMIT]
+
+    results = []
+    for customer in customers:
+        results.append(({
+            'id': customer.id,
+            'name': customer.full_name,
+            'email': customer.email,
+            'phone': customer.phone or '',
+            'url': f'/customers/{customer.id}/edit/'
+        }, (customer.first_name, customer.last_name, customer.email)))
+    return results
+
+
+def _search_services(organization, query):
+    """Recherche dans les services de l'organisation"""
+    services = Service.objects.filter(
+        Q(name__icontains=query) |
+        Q(description__icontains=query),
+        organization=organization
+    )[:search_cache.SEARCH_LIMIT]
+
+    results = []
+    for service in services:
+        results.append(({
+            'id': service.id,
+            'name': service.name,
+            'duration': str(service.duration),
+            'price': str(service.price),
+            'url': f'/admin/appointments/service/{service.id}/change/'
+        }, (service.name, service.description or '')))
+    return results
+
 
 @login_required
-def global_search(request):
+async def global_search(request):
     """Recherche globale dans l'application"""
     query = request.GET.get('q', '').strip()
     results = {
@@ -500,62 +832,80 @@ def global_search(request):
     }
     
     if query and len(query) >= 2:
-        # Recherche dans les rendez-vous (filtrés par créateur)
-        appointments = Appointment.objects.filter(
-            Q(customer__first_name__icontains=query) |
-            Q(customer__last_name__icontains=query) |
-            Q(customer__email__icontains=query) |
-            Q(service__name__icontains=query) |
-            Q(notes__icontains=query),
-            created_by=request.user
-        ).select_related('customer', 'service')[:10]
-        
-        for appointment in appointments:
-            results['appointments'].append({
-                'id': appointment.id,
-                'customer': appointment.customer.full_name,
-                'service': appointment.service.name,
-                'date': appointment.appointment_date.strftime('%d/%m/%Y %H:%M'),
-                'status': appointment.get_status_display(),
-                'url': f'/appointments/{appointment.id}/edit/'
-            })
-        
-        # Recherche dans les clients (filtrés par créateur)
-        customers = Customer.objects.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(email__icontains=query),
-            created_by=request.user
-        )[:10]
-        
-        for customer in customers:
-            results['customers'].append({
-                'id': customer.id,
-                'name': customer.full_name,
-                'email': customer.email,
-                'phone': customer.phone or '',
-                'url': f'/customers/{customer.id}/edit/'
-            })
-        
-        # Recherche dans les services (filtrés par créateur)
-        services = Service.objects.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query),
-            created_by=request.user
-        )[:10]
-        
-        for service in services:
-            results['services'].append({
-                'id': service.id,
-                'name': service.name,
-                'duration': str(service.duration),
-                'price': str(service.price),
-                'url': f'/admin/appointments/service/{service.id}/change/'
-            })
+        organization = await sync_to_async(current_organization)(request)
+        # Préfixe lu avant les requêtes : une écriture concurrente rend l'entrée obsolète
+        prefix = await sync_to_async(search_cache.cache_prefix)(organization.pk)
+        cached = await sync_to_async(search_cache.lookup)(prefix, query)
+        if cached is not None:
+            return JsonResponse(cached)
+
+        # Les trois recherches sont indépendantes : on les lance en parallèle
+        appointments, customers, services = await asyncio.gather(
+            run_query(_search_appointments, organization, query, view='global_search'),
+            run_query(_search_customers, organization, query, view='global_search'),
+            run_query(_search_services, organization, query, view='global_search'),
+        )
+        sections = {
+            'appointments': appointments,
+            'customers': customers,
+            'services': services,
+        }
+        await sync_to_async(search_cache.store)(prefix, query, sections)
+        for name, rows in sections.items():
+            results[name] = [item for item, _ in rows]
     
     return JsonResponse(results)
 
 
+@login_required
+async def api_v1_list(request, resource):
+    """API v1 : liste paginée par curseur (?fields=, ?cursor=, ?limit=, filtres)"""
+    if resource not in api.RESOURCES:
+        return JsonResponse({'error': 'Ressource inconnue'}, status=404)
+    organization = await sync_to_async(current_organization)(request)
+    try:
+        data = await run_query(api.list_resource, organization, resource, request.GET.dict(), view='api_v1_list')
+    except api.ApiError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(data)
+
+
+@login_required
+@csrf_exempt
+async def api_v1_batch(request):
+    """API v1 : plusieurs listes en un aller-retour.
+
+    Corps JSON ``{"requests": [{"id": ..., "resource": ..., "params": {...}}]}`` ;
+    les sous-requêtes (lecture seule) s'exécutent en parallèle.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST attendu'}, status=405)
+    try:
+        subrequests = json.loads(request.body)['requests']
+        if not isinstance(subrequests, list) or not all(isinstance(sub, dict) for sub in subrequests):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Corps JSON invalide'}, status=400)
+    if len(subrequests) > settings.API_BATCH_MAX_REQUESTS:
+        return JsonResponse({'error': 'Trop de sous-requêtes'}, status=400)
+
+    organization = await sync_to_async(current_organization)(request)
+
+    async def run(sub):
+        resource = sub.get('resource')
+        if resource not in api.RESOURCES:
+            return {'id': sub.get('id'), 'status': 404, 'body': {'error': 'Ressource inconnue'}}
+        params = {key: str(value) for key, value in (sub.get('params') or {}).items()}
+        try:
+            body = await run_query(api.list_resource, organization, resource, params, view='api_v1_batch')
+        except api.ApiError as e:
+            return {'id': sub.get('id'), 'status': 400, 'body': {'error': str(e)}}
+        return {'id': sub.get('id'), 'status': 200, 'body': body}
+
+    responses = await asyncio.gather(*(run(sub) for sub in subrequests))
+    return JsonResponse({'responses': responses})
+
+
 @login_required
 def notifications_view(request):
     """Vue des notifications"""
@@ -567,7 +917,7 @@ def notifications_view(request):
         appointment_date__date__gte=today,
         appointment_date__date__lte=next_week,
         status__in=['scheduled', 'confirmed'],
-        created_by=request.user
+        organization=request.organization
     ).select_related('customer', 'service').order_by('appointment_date')
     
     # Rendez-vous en retard (non confirmés depuis plus de 24h)
@@ -576,7 +926,7 @@ def notifications_view(request):
         appointment_date__date__lt=today,
         status='scheduled',
         created_at__lt=timezone.now() - timedelta(hours=24),
-        created_by=request.user
+        organization=request.organization
     ).select_related('customer', 'service')
     
     context = {
@@ -597,26 +947,42 @@ def profile_view(request):
         user.first_name = request.POST.get('first_name', user.first_name)
         user.last_name = request.POST.get('last_name', user.last_name)
         user.email = request.POST.get('email', user.email)
+        if users_with_email(user.email).exclude(pk=user.pk).exists():
+            messages.error(request, 'Un compte avec cet email existe déjà.')
+            return redirect('profile')
         user.save()
         
+        # Fichier abandonné en cours d'envoi par SizeLimitUploadHandler
+        if 'photo' in getattr(request, 'rejected_uploads', []):
+            messages.error(request, 'La photo dépasse la taille maximale de 2 Mo.')
+            return redirect('profile')
+        photo = request.FILES.get('photo')
+        if photo is not None:
+            try:
+                validate_avatar(photo)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+                return redirect('profile')
+
         # Mise à jour du profil staff si il existe
         try:
             staff = user.staff_profile
             staff.phone = request.POST.get('phone', staff.phone)
-            # Upload photo
-            if 'photo' in request.FILES:
-                staff.photo = request.FILES['photo']
-            remove_photo = request.POST.get('remove_photo')
-            if remove_photo == 'on':
-                staff.photo = None
-            staff.save()
         except Staff.DoesNotExist:
             # Créer le profil staff si manquant
-            staff = Staff.objects.create(user=user, phone=request.POST.get('phone', ''))
-            if 'photo' in request.FILES:
-                staff.photo = request.FILES['photo']
-                staff.save()
-        
+            staff = Staff.objects.create(user=user, organization=request.organization, phone=request.POST.get('phone', ''))
+        photo_changed = False
+        if photo is not None:
+            staff.photo = photo
+            photo_changed = True
+        if request.POST.get('remove_photo') == 'on':
+            staff.photo = None
+            photo_changed = True
+        staff.save()
+        if photo_changed:
+            # Nettoyage des métadonnées et miniatures générés par le worker
+            defer(process_avatar, staff.pk)
+
         messages.success(request, 'Profil mis à jour avec succès.')
         return redirect('profile')
     
@@ -626,15 +992,16 @@ def profile_view(request):
 @login_required
 def services_view(request):
     """Vue de gestion des services"""
-    services = Service.objects.filter(created_by=request.user).order_by('name')
+    services = get_catalog(request.organization).services
     
-    # Recherche
+    # Recherche (dans l'instantané du catalogue, sans requête)
     search = request.GET.get('search')
     if search:
-        services = services.filter(
-            Q(name__icontains=search) |
-            Q(description__icontains=search)
-        )
+        search = search.casefold()
+        services = [
+            service for service in services
+            if search in service.name.casefold() or search in service.description.casefold()
+        ]
     
     context = {
         'services': services,
@@ -660,6 +1027,7 @@ def create_service_view(request):
                 description=description,
                 duration=duration,
                 price=price,
+                organization=request.organization,
                 created_by=request.user
             )
             messages.success(request, 'Service créé avec succès.')
@@ -673,7 +1041,7 @@ def create_service_view(request):
 @login_required
 def edit_service_view(request, service_id):
     """Vue de modification de service"""
-    service = get_object_or_404(Service, id=service_id, created_by=request.user)
+    service = get_object_or_404(Service, id=service_id, organization=request.organization)
     
     if request.method == 'POST':
         service.name = request.POST.get('name')
@@ -708,11 +1076,144 @@ def edit_service_view(request, service_id):
 @login_required
 def delete_service_view(request, service_id):
     """Vue de suppression de service"""
-    service = get_object_or_404(Service, id=service_id, created_by=request.user)
+    service = get_object_or_404(Service, id=service_id, organization=request.organization)
     
     if request.method == 'POST':
-        service.delete()
+        service.soft_delete()
         messages.success(request, 'Service supprimé avec succès.')
         return redirect('services')
     
-    return render(request, 'appointments/delete_service.html', {'service': service})
\ No newline at end of file
+    return render(request, 'appointments/delete_service.html', {'service': service})
+
+
+def _analytics_period(request):
+    """Période demandée (défaut : les 12 derniers mois), ValueError si invalide"""
+    today = timezone.localdate()
+    start_str = request.GET.get('start')
+    end_str = request.GET.get('end')
+    end = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else today
+    if start_str:
+        start = datetime.strptime(start_str, '%Y-%m-%d').date()
+    else:
+        start = (end.replace(day=1) - timedelta(days=335)).replace(day=1)
+    if start > end:
+        raise ValueError('start > end')
+    return start, end
+
+
+@login_required
+def analytics_view(request):
+    """Vue des statistiques : chiffre d'affaires par mois, service et statut"""
+    try:
+        start, end = _analytics_period(request)
+    except ValueError:
+        messages.error(request, 'Période invalide.')
+        return redirect('analytics')
+
+    # Pivot mois × statut, lu uniquement dans les agrégats quotidiens
+    months = {}
+    for row in rollups.report(request.organization, start, end, group='month'):
+        month = months.setdefault(row['period'], {
+            'period': row['period'], 'count': 0, 'revenue': 0, 'minutes': 0, 'statuses': {},
+        })
+        month['statuses'][row['status']] = row['count']
+        month['count'] += row['count']
+        month['minutes'] += row['minutes']
+        if row['status'] == 'completed':
+            month['revenue'] += row['revenue']
+    months = list(months.values())
+    max_revenue = max([m['revenue'] for m in months] or [0]) or 1
+    for month in months:
+        month['status_counts'] = [month['statuses'].get(value, 0) for value, _ in Appointment.STATUS_CHOICES]
+        month['bar_width'] = round(month['revenue'] * 100 / max_revenue)
+
+    services = {}
+    for row in rollups.report(request.organization, start, end, group='service'):
+        service = services.setdefault(row['service_id'], {
+            'name': row['service__name'], 'count': 0, 'revenue': 0, 'minutes': 0,
+        })
+        service['count'] += row['count']
+        service['minutes'] += row['minutes']
+        if row['status'] == 'completed':
+            service['revenue'] += row['revenue']
+
+    context = {
+        'start': start,
+        'end': end,
+        'months': months,
+        'services': sorted(services.values(), key=lambda s: -s['revenue']),
+        'status_choices': Appointment.STATUS_CHOICES,
+        'total_revenue': sum(m['revenue'] for m in months),
+        'total_count': sum(m['count'] for m in months),
+    }
+    return render(request, 'appointments/analytics.html', context)
+
+
+@login_required
+def occupancy_view(request):
+    """Carte de chaleur du taux d'occupation (jour de la semaine × heure)"""
+    try:
+        start, end = _analytics_period(request)
+    except ValueError:
+        messages.error(request, 'Période invalide.')
+        return redirect('occupancy')
+
+    grid = occupancy(
+        Appointment.objects.filter(organization=request.organization),
+        get_catalog(request.organization).business_hours,
+        start,
+        end,
+    )
+    # Heures affichées : celles où l'on est ouvert ou qui ont des réservations
+    hours = [h for h in range(24) if any(grid[d][h]['open'] or grid[d][h]['booked'] for d in range(7))]
+    rows = []
+    for day, (_, label) in enumerate(BusinessHours.DAY_CHOICES):
+        cells = []
+        for hour in hours:
+            cell = grid[day][hour]
+            ratio = cell['ratio']
+            cells.append({
+                'hour': hour,
+                'percent': None if ratio is None else round(ratio * 100),
+                'opacity': 0 if ratio is None else round(min(ratio, 1), 2),
+                'booked': cell['booked'],
+            })
+        rows.append({'label': label, 'cells': cells})
+
+    context = {
+        'start': start,
+        'end': end,
+        'hours': hours,
+        'rows': rows,
+    }
+    return render(request, 'appointments/occupancy.html', context)
+
+
+@login_required
+def api_analytics(request):
+    """API des statistiques agrégées (?start=&end=&group=day|month|service|status)"""
+    group = request.GET.get('group', 'month')
+    if group not in rollups.GROUPS:
+        return JsonResponse({'error': 'Regroupement invalide'}, status=400)
+    try:
+        start, end = _analytics_period(request)
+    except ValueError:
+        return JsonResponse({'error': 'Période invalide'}, status=400)
+    rows = rollups.report(request.organization, start, end, group=group)
+    for row in rows:
+        if 'period' in row:
+            row['period'] = row['period'].isoformat()
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'group': group,
+        'rows': rows,
+    })
+
+
+def metrics_view(request):
+    """Expose les métriques au format texte Prometheus"""
+    allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    if not allowed and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.generate_latest(), content_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,118 @@
+"""
+Liste d'attente : remplissage des créneaux libérés.
+
+Quand un rendez-vous est annulé ou supprimé, les signaux diffèrent la tâche
+``fill_slot`` (hors requête). Elle cherche les entrées en attente pour le
+même service dont la fenêtre contient le créneau, via l'index partiel
+``waitlist_waiting_windows`` (service, début, fin) : seules les entrées
+compatibles sont lues, jamais toute la liste. La plus ancienne est servie :
+le créneau est réservé directement si l'entrée l'autorise, sinon proposé.
+
+Les annulations groupées (fermeture du cabinet, voir bulk.py) ne libèrent
+pas de créneau.
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import audit
+from .models import Appointment, Service, WaitlistEntry
+from .tasks import defer, task
+
+# Entrées examinées par créneau (les suivantes si une autre tâche les a prises)
+CANDIDATES = 10
+
+
+def slot_is_free(service, start, end):
+    """Aucun rendez-vous actif du service ne chevauche [start, end)"""
+    others = (Appointment.objects
+              .filter(organization_id=service.organization_id, service=service,
+                      appointment_date__lt=end, appointment_date__gte=start - timedelta(days=1))
+              .exclude(status='cancelled')
+              .values_list('appointment_date', 'duration'))
+    return all(date + duration <= start for date, duration in others)
+
+
+def compatible_entries(service_id, start, end, exclude_customer_id=None):
+    """Entrées en attente dont la fenêtre contient [start, end), plus anciennes d'abord"""
+    entries = WaitlistEntry.objects.filter(
+        service_id=service_id, status='waiting', window_start__lte=start, window_end__gte=end,
+    )
+    if exclude_customer_id is not None:
+        entries = entries.exclude(customer_id=exclude_customer_id)
+    return entries.order_by('created_at')
+
+
+def book(entry, start, from_status, user=None):
+    """Crée le rendez-vous de l'entrée au créneau ``start`` ; None si l'entrée
+    n'est plus dans l'état ``from_status`` (déjà servie par une autre requête).
+    ``user`` : qui a accepté la proposition (None pour une réservation automatique)"""
+    with transaction.atomic():
+        claimed = WaitlistEntry.objects.filter(pk=entry.pk, status=from_status).update(
+            status='booked', offered_start=start,
+        )
+        if not claimed:
+            return None
+        appointment = Appointment.objects.create(
+            organization_id=entry.organization_id,
+            customer_id=entry.customer_id,
+            service=entry.service,
+            appointment_date=start,
+            duration=entry.service.duration,
+            price=entry.service.price,
+            notes='Réservé depuis la liste d\'attente',
+            created_by_id=entry.created_by_id,
+        )
+        WaitlistEntry.objects.filter(pk=entry.pk).update(appointment=appointment)
+    audit.record_created(appointment, user)
+    return appointment
+
+
+@task(priority=5)
+def fill_slot(service_id, start, exclude_customer_id=None):
+    """Attribue le créneau libéré ``start`` (ISO 8601) à la première entrée compatible"""
+    service = Service.objects.filter(pk=service_id).first()
+    start = datetime.fromisoformat(start)
+    if service is None or start <= timezone.now():
+        return None
+    end = start + service.duration
+    if not slot_is_free(service, start, end):
+        return None
+
+    for entry in compatible_entries(service_id, start, end, exclude_customer_id).select_related('service')[:CANDIDATES]:
+        # UPDATE conditionnel : une autre tâche a pu servir l'entrée entre-temps
+        if entry.auto_book:
+            served = book(entry, start, 'waiting') is not None
+        else:
+            served = WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(
+                status='offered', offered_start=start,
+            )
+        if served:
+            return entry.pk
+    return None
+
+
+def release_slot(appointment):
+    """Diffère le remplissage du créneau d'un rendez-vous annulé ou supprimé"""
+    if appointment.appointment_date > timezone.now():
+        defer(fill_slot, appointment.service_id, appointment.appointment_date.isoformat(),
+              exclude_customer_id=appointment.customer_id)
+
+
+def accept_offer(entry, user=None):
+    """Réserve le créneau proposé s'il est toujours libre (None sinon)"""
+    start = entry.offered_start
+    if entry.status != 'offered' or start is None or start <= timezone.now():
+        return None
+    if not slot_is_free(entry.service, start, start + entry.service.duration):
+        return None
+    return book(entry, start, 'offered', user)
+
+
+def decline_offer(entry):
+    """Remet l'entrée en attente et propose le créneau à la suivante"""
+    start = entry.offered_start
+    WaitlistEntry.objects.filter(pk=entry.pk, status='offered').update(status='waiting', offered_start=None)
+    if start is not None and start > timezone.now():
+        defer(fill_slot, entry.service_id, start.isoformat(), exclude_customer_id=entry.customer_id)
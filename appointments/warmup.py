@@ -0,0 +1,105 @@
+"""
+Préchauffage d'un worker après un déploiement ou un recyclage.
+
+Sans préchauffage, les premières requêtes paient l'import du URLconf et des
+vues, la compilation des gabarits, le chargement des catalogues de
+traduction ``fr`` et l'ouverture de la connexion. ``warm_up()`` fait ce
+travail d'avance, dans le processus qui servira les requêtes :
+
+- depuis ``wsgi.py``/``asgi.py`` avec ``APPOINTME_WARMUP=1`` (dans chaque
+  worker : avec ``gunicorn --preload``, l'appeler dans ``post_fork`` pour
+  ne pas partager la connexion entre processus) ;
+- ou via ``python manage.py warmup``, qui affiche la durée de chaque étape.
+
+Les caches propres au processus (utilisateurs, organisations, catalogue des
+services et horaires) sont remplis pour les utilisateurs connectés
+récemment (``WARMUP_RECENT_DAYS``, au plus ``WARMUP_MAX_USERS``).
+"""
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver, reverse
+from django.utils import formats, timezone, translation
+
+
+def resolve_urls():
+    """Importe le URLconf (et les vues) et construit les tables de reverse()"""
+    resolver = get_resolver()
+    resolver.url_patterns
+    names = [name for name in resolver.reverse_dict if isinstance(name, str)]
+    for name in ('login', 'dashboard'):
+        resolver.resolve(reverse(name))
+    return len(names)
+
+
+def compile_templates():
+    """Compile les gabarits du projet (chargeur en cache hors DEBUG) ; ceux de
+    l'admin et des paquets installés restent chargés à la demande"""
+    count = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            root = Path(directory)
+            if not root.is_relative_to(settings.BASE_DIR):
+                continue
+            for path in sorted(root.rglob('*.html')):
+                engine.get_template(path.relative_to(root).as_posix())
+                count += 1
+    return count
+
+
+def load_translations():
+    """Charge les catalogues de traduction et formats de LANGUAGE_CODE"""
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Monday')
+        formats.date_format(timezone.now(), 'DATETIME_FORMAT')
+        formats.number_format(1234.5, 2)
+    return 1
+
+
+def open_connections():
+    """Ouvre les connexions aux bases (et charge les modules du pilote)"""
+    for conn in connections.all():
+        conn.ensure_connection()
+    return len(connections.all())
+
+
+def prime_caches():
+    """Remplit les caches du processus pour les utilisateurs actifs récemment"""
+    from . import auth, catalog, tenancy
+
+    since = timezone.now() - timedelta(days=settings.WARMUP_RECENT_DAYS)
+    users = (get_user_model().objects.filter(is_active=True, last_login__gte=since)
+             .order_by('-last_login')[:settings.WARMUP_MAX_USERS])
+    organization_ids = set()
+    for user in users:
+        organization = tenancy.organization_for(user)
+        auth.users.set(user.pk, user)
+        tenancy.organizations.set(user.pk, organization)
+        organization_ids.add(organization.pk)
+    for organization_id in organization_ids:
+        catalog.get_catalog(organization_id)
+    return len(organization_ids)
+
+
+STEPS = [
+    ('URLs', resolve_urls),
+    ('gabarits', compile_templates),
+    ('traductions', load_translations),
+    ('connexions', open_connections),
+    ('caches', prime_caches),
+]
+
+
+def warm_up():
+    """Exécute toutes les étapes ; retourne ``[(étape, nombre, secondes), ...]``"""
+    timings = []
+    for name, step in STEPS:
+        started = time.perf_counter()
+        count = step()
+        timings.append((name, count, time.perf_counter() - started))
+    return timings
@@ -0,0 +1,11 @@
+/** Configuration Tailwind utilisée par « python manage.py build_assets ». */
+module.exports = {
+  content: [
+    './appointments/templates/**/*.html',
+    './appointments/jinja2/**/*.html',
+  ],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};